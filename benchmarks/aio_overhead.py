@@ -0,0 +1,70 @@
+"""
+Per-operation overhead of the callback API compared to the coroutine API
+(Python 3.5+).
+
+Both run against the in-process server from goblin.memory_client, so the
+numbers measure client side overhead (closures, futures and io loop
+iterations), not network or Gremlin Server time::
+
+    python benchmarks/aio_overhead.py -n 2000
+"""
+import argparse
+import asyncio
+import time
+
+from goblin import connection
+from goblin.memory_client import Pool
+from goblin.models import Vertex
+from goblin.properties import Integer, String
+
+
+class BenchVertex(Vertex):
+    label = 'bench_vertex'
+
+    name = String()
+    value = Integer()
+
+
+async def bench(label, operation, n):
+    start = time.perf_counter()
+    for i in range(n):
+        await operation(i)
+    elapsed = time.perf_counter() - start
+    print('{:<28} {:>8.1f} us/op'.format(label, elapsed / n * 1e6))
+
+
+async def main(n):
+    vertex = await BenchVertex.acreate(name='v', value=0)
+
+    async def save(i):
+        vertex.value = i
+        await vertex.save()
+
+    async def asave(i):
+        vertex.value = i
+        await vertex.asave()
+
+    await bench('save (callbacks)', save, n)
+    await bench('asave (coroutine)', asave, n)
+    await bench('get (callbacks, batched)',
+                lambda i: BenchVertex.get(vertex.id), n)
+    await bench('aget (coroutine)',
+                lambda i: BenchVertex.aget(vertex.id), n)
+    await bench('create (callbacks)',
+                lambda i: BenchVertex.create(name='v', value=i), n)
+    await bench('acreate (coroutine)',
+                lambda i: BenchVertex.acreate(name='v', value=i), n)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-n', type=int, default=1000,
+                        help='operations per benchmark')
+    args = parser.parse_args()
+    loop = asyncio.get_event_loop()
+    connection.setup('ws://localhost:8182/', pool_class=Pool,
+                     future_class=asyncio.Future, loop=loop)
+    try:
+        loop.run_until_complete(main(args.n))
+    finally:
+        connection.tear_down()
@@ -0,0 +1,161 @@
+"""
+Cost of saving an exclusive edge from a high-degree vertex (Python 3.5+).
+
+Each save of an ``__exclusive__`` edge first looks for an edge of the same
+label between the two vertices. The edges of both vertices are walked at
+once, so a lookup reads at most twice the edges of the vertex with the fewest,
+whatever the degree of the other one. The lookup used to read every outgoing
+edge of the source with ``outE(elabel).filter(inV().is(target))``.
+
+With ``--url``, the benchmark runs against a Gremlin Server: it times the
+saves of ``_save_edge`` from hubs of growing degree, then the lookup of
+``_save_edge`` against the old one, each sent as a script of its own::
+
+    python benchmarks/exclusive_edges.py --url ws://localhost:8182/ \
+        -n 200 --degrees 10 1000 10000
+
+The vertices and edges it creates are left in the graph. Without ``--url``
+it is a smoke test against the in-process server from goblin.memory_client,
+where a python stand-in replaces each lookup.
+"""
+import argparse
+import asyncio
+import time
+
+from goblin import connection
+from goblin.memory_client import Pool, server
+from goblin.models import Edge, Vertex
+from goblin.models.aio import execute_query, read_all
+from goblin.properties import Integer, String
+
+
+# the lookup of the exclusive branch of _save_edge in edge.groovy
+BOTH_ENDS_LOOKUP = """
+def source = g.V(outV).next()
+def target = g.V(inV).next()
+def e = null
+def out_edges = g.V(source).outE(elabel)
+def in_edges = g.V(target).inE(elabel)
+while (e == null && out_edges.hasNext()) {
+    def candidate = out_edges.next()
+    if (candidate.inVertex().id() == target.id()) {
+        e = candidate
+    } else if (!in_edges.hasNext()) {
+        break
+    } else {
+        candidate = in_edges.next()
+        if (candidate.outVertex().id() == source.id()) {
+            e = candidate
+        }
+    }
+}
+[e?.id()]
+"""
+
+# the lookup _save_edge used before
+SOURCE_SCAN_LOOKUP = """
+def target = g.V(inV).next()
+g.V(outV).outE(elabel).filter(inV().is(target)).id().toList()
+"""
+
+
+class BenchVertex(Vertex):
+    label = 'bench_vertex'
+
+    name = String()
+
+
+class BenchFollows(Edge):
+    label = 'bench_follows'
+    __exclusive__ = True
+
+    weight = Integer()
+
+
+def _source_scan(source, target, elabel, lookup=None):
+    for edge in source.edges('out', [elabel]):
+        if edge.in_vertex is target and server._matches(edge, lookup or {}):
+            return edge
+    return None
+
+
+async def setup_hub(degree, n):
+    hub = await BenchVertex.create(name='hub')
+    leaves = [await BenchVertex.create(name='leaf') for _ in range(n)]
+    others = await BenchVertex.bulk_create([{'name': 'other'}] * degree)
+    await BenchFollows.bulk_create([(hub.id, other, {}) for other in others])
+    return hub, leaves
+
+
+async def bench_saves(label, degree, n):
+    hub, leaves = await setup_hub(degree, n)
+    start = time.perf_counter()
+    for leaf in leaves:
+        # absent: the edge is created
+        await BenchFollows.create(hub, leaf, weight=1)
+    created = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for leaf in leaves:
+        # present: the edge is updated
+        await BenchFollows.create(hub, leaf, weight=2)
+    updated = time.perf_counter() - start
+    print('{:<14} degree {:>7} create {:>9.1f} us/op  update {:>9.1f} us/op'
+          .format(label, degree, created / n * 1e6, updated / n * 1e6))
+    return hub, leaves
+
+
+async def bench_lookup(label, script, hub, leaves, degree):
+    start = time.perf_counter()
+    for leaf in leaves:
+        stream = await execute_query(script, bindings={
+            'outV': hub.id, 'inV': leaf.id,
+            'elabel': BenchFollows.get_label()})
+        found = await read_all(stream)
+        assert found and found[0] is not None, 'the edge was not found'
+    elapsed = time.perf_counter() - start
+    print('{:<14} degree {:>7} lookup {:>9.1f} us/op'.format(
+        label, degree, elapsed / len(leaves) * 1e6))
+
+
+async def main(n, degrees, url=None):
+    if url is not None:
+        for degree in degrees:
+            hub, leaves = await bench_saves('_save_edge', degree, n)
+            await bench_lookup('both ends', BOTH_ENDS_LOOKUP, hub, leaves,
+                               degree)
+            await bench_lookup('source scan', SOURCE_SCAN_LOOKUP, hub,
+                               leaves, degree)
+        return
+    find_edge = server._find_edge
+    for degree in degrees:
+        server._find_edge = find_edge
+        await bench_saves('both ends', degree, n)
+        server._find_edge = _source_scan
+        await bench_saves('source scan', degree, n)
+    server._find_edge = find_edge
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-n', type=int, default=200,
+                        help='saves per benchmark')
+    parser.add_argument('--degrees', type=int, nargs='+',
+                        default=[10, 1000, 10000],
+                        help='out degrees of the hub')
+    parser.add_argument('--url',
+                        help='Gremlin Server to run against, instead of the '
+                             'in-process server')
+    args = parser.parse_args()
+    loop = asyncio.get_event_loop()
+    if args.url is not None:
+        from gremlinclient.aiohttp_client import Pool as ServerPool
+        connection.setup(args.url, pool_class=ServerPool,
+                         future_class=asyncio.Future, loop=loop)
+    else:
+        connection.setup('ws://localhost:8182/', pool_class=Pool,
+                         future_class=asyncio.Future, loop=loop)
+    try:
+        loop.run_until_complete(main(args.n, args.degrees, args.url))
+    finally:
+        connection.tear_down()
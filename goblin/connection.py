@@ -6,7 +6,8 @@ except ImportError:
     from urlparse import urlparse
 
 from goblin.constants import (TORNADO_CLIENT_MODULE, AIOHTTP_CLIENT_MODULE,
-                              SECURE_SCHEMES, INSECURE_SCHEMES)
+                              MEMORY_CLIENT_MODULE, SECURE_SCHEMES,
+                              INSECURE_SCHEMES)
 from goblin.exceptions import GoblinConnectionError
 
 
@@ -21,11 +22,21 @@ _loaded_models = []
 _scheme = None
 _netloc = None
 _client_module = None
+_get_batch_window = 0
+_get_batch_size = 64
+_save_batch_window = None
+_save_batch_size = 64
+_metric_manager = None
+_registered_methods = False
+_element_cache = None
+_missing_cache = None
+_dirty_tracking = False
 
 
 def execute_query(query, bindings=None, pool=None, future_class=None,
                   graph_name=None, traversal_source=None, username="",
-                  password="", handler=None, request_id=None, *args, **kwargs):
+                  password="", handler=None, request_id=None,
+                  singleflight=False, identity_map=None, *args, **kwargs):
     """
     Execute a raw Gremlin query with the given parameters passed in.
 
@@ -42,6 +53,12 @@ def execute_query(query, bindings=None, pool=None, future_class=None,
     :param str password: password for username as definined in the Tinkerpop
         credentials graph
     :param func handler: Handles preprocessing of query results
+    :param bool singleflight: Share the request with the callers running the
+        same read-only query with the same bindings, see
+        :py:mod:`goblin.singleflight`
+    :param identity_map: Identity map the handler deserializes the results
+        into, see :py:mod:`goblin.models.identity`
+    :type identity_map: goblin.models.identity.IdentityMap
 
     :returns: Future
     """
@@ -64,6 +81,46 @@ def execute_query(query, bindings=None, pool=None, future_class=None,
 
     aliases = {"graph": graph_name, "g": traversal_source}
 
+    if identity_map is not None:
+        from goblin.models import identity
+        handler = identity.wrap(identity_map, handler)
+
+    future_stream = None
+    if singleflight:
+        from goblin import singleflight as _singleflight
+        key = _singleflight.request_key(query, bindings, pool, aliases)
+        if key is not None:
+            def send():
+                return _send(pool, future_class, query, bindings, aliases,
+                             None, request_id)
+            future_stream = _singleflight.execute_query(
+                send, key, handler, future_class, pool=pool)
+
+    if future_stream is None:
+        future_stream = _send(pool, future_class, query, bindings, aliases,
+                              handler, request_id)
+    if identity_map is None:
+        return future_stream
+    return _with_identity_map(future_stream, identity_map, future_class)
+
+
+def _with_identity_map(future_stream, identity_map, future_class):
+    from goblin.models.identity import IdentityMapStream
+    future = future_class()
+
+    def on_stream(f):
+        try:
+            stream = f.result()
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(IdentityMapStream(stream, identity_map))
+
+    future_stream.add_done_callback(on_stream)
+    return future
+
+
+def _send(pool, future_class, query, bindings, aliases, handler, request_id):
     future = future_class()
     future_conn = pool.acquire()
 
@@ -93,7 +150,10 @@ def tear_down():
 
 def setup(url, pool_class=None, graph_name='graph', traversal_source='g',
           username='', password='', pool_size=256, future_class=None,
-          ssl_context=None, connector=None, loop=None):
+          ssl_context=None, connector=None, loop=None, get_batch_window=0,
+          get_batch_size=64, metric_manager=None, registered_methods=False,
+          element_cache=None, missing_cache=None, save_batch_window=None,
+          save_batch_size=64, dirty_tracking=False):
     """
     This function is responsible for instantiating the global variables that
     provide :py:mod:`goblin` connection configuration params.
@@ -123,6 +183,33 @@ def setup(url, pool_class=None, graph_name='graph', traversal_source='g',
     :param connector: connector used to establish :py:mod:`gremlinclient`
         connection. Overides ssl_context param.
     :param loop: io loop.
+    :param float get_batch_window: seconds during which concurrent
+        :py:meth:`Element.get<goblin.models.element.BaseElement.get>` calls
+        are collected into a single query. 0 collects the calls made during
+        the current iteration of the io loop
+    :param int get_batch_size: maximum number of ids per batched get query,
+        1 disables batching
+    :param goblin.metrics.manager.MetricManager metric_manager: manager the
+        batching and caching metrics are reported to
+    :param bool registered_methods: Gremlin methods call the Groovy functions
+        registered on the server by the script generated with
+        :py:func:`goblin.gremlin.init_script.write_init_script` instead of
+        sending their bodies
+    :param goblin.models.cache.ElementCache element_cache: cache of the
+        elements loaded by id, in process or shared with
+        :py:class:`SharedElementCache<goblin.models.cache.SharedElementCache>`,
+        None disables caching
+    :param goblin.models.cache.MissingCache missing_cache: cache of the ids
+        lookups by id didn't find, None disables it
+    :param float save_batch_window: seconds during which concurrent
+        :py:meth:`save<goblin.models.vertex.Vertex.save>` calls are committed
+        together by a single script, see :py:mod:`goblin.models.committer`.
+        0 groups the saves made during the current iteration of the io loop,
+        None (the default) saves each element on its own
+    :param int save_batch_size: maximum number of elements per group commit
+    :param bool dirty_tracking: saving an element that exists only sends the
+        properties whose value changed since it was loaded or saved, unless
+        its model sets ``__dirty_tracking__``
     """
     global _connection_pool
     global _graph_name
@@ -130,8 +217,26 @@ def setup(url, pool_class=None, graph_name='graph', traversal_source='g',
     global _scheme
     global _netloc
     global _client_module
+    global _get_batch_window
+    global _get_batch_size
+    global _save_batch_window
+    global _save_batch_size
+    global _metric_manager
+    global _registered_methods
+    global _element_cache
+    global _missing_cache
+    global _dirty_tracking
 
     _graph_name = graph_name
+    _get_batch_window = get_batch_window
+    _get_batch_size = get_batch_size
+    _save_batch_window = save_batch_window
+    _save_batch_size = save_batch_size
+    _metric_manager = metric_manager
+    _registered_methods = registered_methods
+    _element_cache = element_cache
+    _missing_cache = missing_cache
+    _dirty_tracking = dirty_tracking
     _traversal_source = traversal_source
 
     parsed_url = urlparse(url)
@@ -173,7 +278,10 @@ def _get_pool_class():
 
 
 def _get_connector(ssl_context):
-    if _scheme in SECURE_SCHEMES:
+    if _client_module == MEMORY_CLIENT_MODULE:
+        # in-process server, there is no socket to configure
+        connector = None
+    elif _scheme in SECURE_SCHEMES:
         if ssl_context is None:
             raise ValueError("Please pass ssl_context for secure protocol")
 
@@ -221,13 +329,79 @@ def get_future(kwargs):
     return future_class()
 
 
+def call_later(delay, callback, pool=None, future_class=None, **kwargs):
+    """
+    Run ``callback`` on the io loop used by ``pool`` once ``delay`` seconds
+    have passed. A delay of 0 runs it on the next iteration of the loop.
+
+    :param float delay: seconds to wait
+    :param callback: callable taking no arguments
+    :param `gremlinclient.pool.Pool` pool: Pool whose loop should be used
+    """
+    if pool is None:
+        pool = _connection_pool
+    if future_class is None:
+        if pool is None:
+            raise GoblinConnectionError(("Please call connection.setup or "
+                                         "pass pool explicitly"))
+        future_class = pool.future_class
+    loop = getattr(pool, '_loop', None)
+    if loop is None:
+        future_class = getattr(future_class, 'func', future_class)
+        if future_class.__module__.startswith('tornado'):
+            from tornado.ioloop import IOLoop
+            loop = IOLoop.current()
+        else:
+            import asyncio
+            loop = asyncio.get_event_loop()
+    if delay:
+        loop.call_later(delay, callback)
+    elif hasattr(loop, 'add_callback'):
+        loop.add_callback(callback)
+    else:
+        loop.call_soon(callback)
+
+
+def read_all(stream, **kwargs):
+    """
+    Read every message of a response stream.
+
+    :param gremlinclient.connection.Stream stream: The stream to read
+    :returns: Future list of the concatenated results
+    """
+    future = get_future(kwargs)
+    results = []
+
+    def read_next():
+        future_read = stream.read()
+        future_read.add_done_callback(on_read)
+
+    def on_read(f):
+        try:
+            result = f.result()
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            if result is None:
+                future.set_result(results)
+            else:
+                results.extend(result)
+                # the stream only knows it is exhausted once this callback
+                # returns, so read the next message on the next iteration
+                call_later(0, read_next, **kwargs)
+
+    read_next()
+    return future
+
+
 def pop_execute_query_kwargs(keyword_arguments):
     """ pop the optional execute query arguments from arbitrary kwargs;
         return non-None query kwargs in a dict
     """
     query_kwargs = {}
     for key in ('graph_name', 'traversal_source', 'pool',
-                'request_id', 'future_class'):
+                'request_id', 'future_class', 'singleflight',
+                'identity_map'):
         val = keyword_arguments.pop(key, None)
         if val is not None:
             query_kwargs[key] = val
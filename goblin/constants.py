@@ -21,6 +21,7 @@ BETWEEN = "between"
 # Clients
 TORNADO_CLIENT_MODULE = "tornado_client"
 AIOHTTP_CLIENT_MODULE = "aiohttp_client"
+MEMORY_CLIENT_MODULE = "memory_client"
 
 # Schemes
 SECURE_SCHEMES = ["https", "wss"]
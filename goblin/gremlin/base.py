@@ -31,7 +31,8 @@ class BaseGremlinMethod(object):
                  property=False,
                  defaults=None,
                  transaction=True,
-                 imports=None):
+                 imports=None,
+                 singleflight=False):
         """
         Initialize the gremlin method and define how it is attached to class.
 
@@ -54,6 +55,10 @@ class BaseGremlinMethod(object):
         :param imports: Additional imports to include when calling the
             GremlinMethod
         :type imports: list | tuple | str
+        :param singleflight: Share the request between concurrent calls with
+            the same arguments, only for methods that don't modify the graph
+            (False by default)
+        :type singleflight: bool
 
         """
         self.is_configured = False
@@ -64,12 +69,15 @@ class BaseGremlinMethod(object):
         self.property = property
         self.defaults = defaults or {}
         self.transaction = transaction
+        self.singleflight = singleflight
 
         # function
         self.attr_name = None
         self.arg_list = []
         self.function_body = None
         self.function_def = None
+        self.function_call = None
+        self.source_path = None
 
         # imports
         self.imports = None
@@ -142,6 +150,10 @@ class BaseGremlinMethod(object):
 
             self.function_body = gremlin_obj.body
             self.function_def = gremlin_obj.defn
+            # invocation of the function registered by the init script
+            self.function_call = '{}({})'.format(self.method_name,
+                                                 ', '.join(self.arg_list))
+            self.source_path = path
 
             # imports
             self.imports = file_def.imports
@@ -160,6 +172,33 @@ class BaseGremlinMethod(object):
             (optional)
         :type instance: object
 
+        """
+        script, params, query_kwargs = self.build_query(instance, *args,
+                                                        **kwargs)
+
+        # Figure out new method to set context for logging...
+        # try:
+        # if hasattr(instance, 'get_element_type'):
+        #     context = "vertices.{}".format(instance.get_element_type())
+        # elif hasattr(instance, 'get_label'):
+        #     context = "edges.{}".format(instance.get_label())
+        # else:
+        #     context = "other"
+        context = "TODO"
+        context = "{}.{}".format(context, self.method_name)
+        return connection.execute_query(script, bindings=params,
+                                        context=context, **query_kwargs)
+
+    def build_query(self, instance, *args, **kwargs):
+        """
+        Build the script and bindings calling the groovy function with the
+        given arguments.
+
+        :param instance: The class instance the method was called on
+        :type instance: object
+        :returns: The script, its bindings and the optional execute query
+            arguments found in kwargs
+        :rtype: tuple
         """
         self._setup()
 
@@ -167,6 +206,7 @@ class BaseGremlinMethod(object):
         query_kwargs = connection.pop_execute_query_kwargs(kwargs)
         query_kwargs['transaction'] = (query_kwargs.get('transaction') or
                                        self.transaction)
+        query_kwargs.setdefault('singleflight', self.singleflight)
 
         args = list(args)
         if not self.classmethod:
@@ -201,28 +241,22 @@ class BaseGremlinMethod(object):
 
         params = self.transform_params_to_database(params)
 
-        import_list = []
-        for imp in self.imports + self.extra_imports:
-            if imp is not None:
-                for import_string in imp.import_list:
-                    import_list.append(import_string)
-        import_string = '\n'.join(import_list)
-
-        script = '\n'.join([import_string, self.function_body])
+        if connection._registered_methods:
+            # every argument of the invocation must be bound
+            for arg in self.arg_list:
+                params.setdefault(arg, None)
+            script = self.function_call
+        else:
+            import_list = []
+            for imp in self.imports + self.extra_imports:
+                if imp is not None:
+                    for import_string in imp.import_list:
+                        import_list.append(import_string)
+            import_string = '\n'.join(import_list)
 
-        # Figure out new method to set context for logging...
-        # try:
-        # if hasattr(instance, 'get_element_type'):
-        #     context = "vertices.{}".format(instance.get_element_type())
-        # elif hasattr(instance, 'get_label'):
-        #     context = "edges.{}".format(instance.get_label())
-        # else:
-        #     context = "other"
-        context = "TODO"
-        context = "{}.{}".format(context, self.method_name)
-        return connection.execute_query(script, bindings=params,
-                                        context=context, **query_kwargs)
+            script = '\n'.join([import_string, self.function_body])
 
+        return script, params, query_kwargs
 
     def transform_params_to_database(self, params):
         """
@@ -0,0 +1,88 @@
+"""
+Registers the Groovy functions of the loaded models on the Gremlin Server.
+
+By default a :py:class:`GremlinMethod<goblin.gremlin.base.GremlinMethod>`
+sends the imports and the whole body of its function with every call. The
+script written by :func:`write_init_script` defines all of these functions
+once, when the Gremlin Server starts: add it to the ``scripts`` of the
+``GremlinGroovyScriptEngine`` in the server configuration, and call
+``connection.setup(..., registered_methods=True)`` so that each call only
+sends a ``fn(args)`` invocation of the registered function.
+
+The script has to be generated again whenever a Groovy file changes or a
+model with new methods is added.
+"""
+from __future__ import unicode_literals
+from six import print_
+
+from goblin import connection
+from goblin.exceptions import GoblinGremlinException
+
+
+def registered_methods(models=None):
+    """
+    Find the gremlin methods to register on the server
+
+    :param models: The models whose methods are registered, defaults to every
+        loaded model
+    :type models: list
+    :returns: The gremlin methods, keyed by function name
+    :rtype: dict
+    """
+    if models is None:
+        models = connection._loaded_models
+    methods = {}
+    for model in models:
+        for method in getattr(model, '_gremlin_methods', {}).values():
+            method._setup()
+            other = methods.setdefault(method.method_name, method)
+            if other.function_def != method.function_def:
+                raise GoblinGremlinException(
+                    "Groovy function '%s' is defined differently in %s and "
+                    "%s" % (method.method_name, other.source_path,
+                            method.source_path))
+    return methods
+
+
+def generate_init_script(models=None):
+    """
+    Generate a Gremlin Server init script defining the Groovy functions of
+    the gremlin methods
+
+    :param models: The models whose methods are registered, defaults to every
+        loaded model
+    :type models: list
+    :rtype: str
+    """
+    methods = registered_methods(models)
+    import_list = []
+    for name in sorted(methods):
+        method = methods[name]
+        for imp in method.imports + method.extra_imports:
+            if imp is None:
+                continue
+            for import_string in imp.import_list:
+                if import_string not in import_list:
+                    import_list.append(import_string)
+    lines = ['// Generated by goblin, do not edit']
+    lines.extend(import_list)
+    for name in sorted(methods):
+        lines.append('')
+        lines.append(methods[name].function_def.rstrip())
+    return '\n'.join(lines) + '\n'
+
+
+def write_init_script(filename, models=None):  # pragma: no cover
+    """ Generate and write the Gremlin Server init script to file
+
+    :param filename: The file to write to
+    :type filename: basestring
+    :param models: The models whose methods are registered, defaults to every
+        loaded model
+    :type models: list
+    """
+    print_("Generating Gremlin Server init script...")
+    script = generate_init_script(models)
+    print_("Writing init script to File %s ..." % filename)
+    with open(filename, 'w') as f:
+        f.write(script)
@@ -0,0 +1,3 @@
+from .client import Pool, GraphDatabase, Response
+from .graph import MemoryGraph
+from .server import GremlinServer, groovy_function
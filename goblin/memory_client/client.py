@@ -0,0 +1,176 @@
+"""
+:py:mod:`gremlinclient` compatible pool whose connections talk to an
+in-process :class:`GremlinServer<goblin.memory_client.server.GremlinServer>`
+instead of a websocket. Pass :class:`Pool` to
+:py:func:`goblin.connection.setup` to run goblin without a Gremlin Server::
+
+    from goblin import connection
+    from goblin.memory_client import Pool
+
+    connection.setup('ws://localhost:8182/', pool_class=Pool)
+"""
+from __future__ import unicode_literals
+import collections
+import json
+
+from gremlinclient.graph import GraphDatabase
+from gremlinclient.pool import Pool
+from gremlinclient.response import Response
+
+from .server import GremlinServer
+
+
+def _default_future_class():
+    try:
+        from tornado.concurrent import Future
+    except ImportError:  # pragma: no cover
+        from asyncio import Future
+    return Future
+
+
+def _is_tornado_future(future_class):
+    future_class = getattr(future_class, 'func', future_class)
+    return getattr(future_class, '__module__', '').startswith('tornado')
+
+
+class Response(Response):
+    """
+    Stands in for the websocket client connection: requests are handed to
+    the server as soon as they are sent and the response messages are
+    delivered on a later iteration of the io loop, optionally after a
+    simulated network ``latency``.
+
+    :param goblin.memory_client.server.GremlinServer conn: The server
+    :param class future_class: type of Future
+    :param loop: io loop used to deliver responses. Defaults to
+        :py:meth:`tornado.ioloop.IOLoop.current` for tornado futures and
+        :py:func:`asyncio.get_event_loop` otherwise
+    :param float latency: seconds between sending a request and receiving
+        its response messages
+    """
+
+    def __init__(self, conn, future_class, loop=None, latency=0):
+        super(Response, self).__init__(conn, future_class, loop=loop)
+        self._latency = latency
+        self._messages = collections.deque()
+        self._receivers = collections.deque()
+        self._closed = False
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self):
+        self._closed = True
+        future = self._future_class()
+        future.set_result(None)
+        return future
+
+    def send(self, msg, binary=True):
+        mime_len = bytearray(msg[:1])[0]
+        request = json.loads(msg[1 + mime_len:].decode('utf-8'))
+        messages = [json.dumps(m).encode('utf-8')
+                    for m in self._conn.submit(request)]
+        self._schedule(lambda: self._deliver(messages))
+
+    def receive(self, callback=None):
+        future = self._future_class()
+        if callback is not None:
+            future.add_done_callback(callback)
+        if self._messages:
+            future.set_result(self._messages.popleft())
+        else:
+            self._receivers.append(future)
+        return future
+
+    def _deliver(self, messages):
+        self._messages.extend(messages)
+        while self._receivers and self._messages:
+            self._receivers.popleft().set_result(self._messages.popleft())
+
+    def _schedule(self, callback):
+        loop = self._loop
+        if loop is None:
+            if _is_tornado_future(self._future_class):
+                from tornado.ioloop import IOLoop
+                loop = IOLoop.current()
+            else:
+                import asyncio
+                loop = asyncio.get_event_loop()
+        if self._latency:
+            loop.call_later(self._latency, callback)
+        elif hasattr(loop, 'add_callback'):
+            loop.add_callback(callback)
+        else:
+            loop.call_soon(callback)
+
+
+class GraphDatabase(GraphDatabase):
+    """
+    Creates connections to an in-process Gremlin Server.
+
+    :param str url: url for Gremlin Server, only kept for reference
+    :param goblin.memory_client.server.GremlinServer server: the server the
+        connections talk to
+    :param float latency: simulated network latency in seconds
+    """
+
+    def __init__(self, url, server, timeout=None, username="", password="",
+                 loop=None, future_class=None, latency=0):
+        if future_class is None:
+            future_class = _default_future_class()
+        super(GraphDatabase, self).__init__(
+            url, timeout=timeout, username=username, password=password,
+            loop=loop, future_class=future_class)
+        self._server = server
+        self._latency = latency
+
+    def _connect(self, conn_type, session, force_close, force_release,
+                 pool):
+        future = self._future_class()
+        resp = Response(self._server, self._future_class, loop=self._loop,
+                        latency=self._latency)
+        gc = conn_type(resp, self._future_class, self._timeout,
+                       self._username, self._password, self._loop,
+                       force_close, pool, force_release, session)
+        future.set_result(gc)
+        return future
+
+
+class Pool(Pool):
+    """
+    Pool of :py:class:`gremlinclient.connection.Connection` objects connected
+    to an in-process :class:`GremlinServer<goblin.memory_client.server.GremlinServer>`.
+
+    Accepts the same arguments as the :py:mod:`gremlinclient` pools, plus:
+
+    :param goblin.memory_client.server.GremlinServer server: server to
+        connect to. A new server with an empty graph is created by default
+    :param float latency: simulated network latency in seconds
+    """
+
+    def __init__(self, url, graph=None, timeout=None, username="",
+                 password="", maxsize=256, loop=None, force_release=False,
+                 future_class=None, connector=None, server=None, latency=0):
+        if server is None:
+            server = GremlinServer()
+        self._server = server
+        graph = GraphDatabase(url, server,
+                              timeout=timeout,
+                              username=username,
+                              password=password,
+                              future_class=future_class,
+                              loop=loop,
+                              latency=latency)
+        super(Pool, self).__init__(graph, maxsize=maxsize, loop=loop,
+                                   force_release=force_release,
+                                   future_class=future_class)
+
+    @property
+    def server(self):
+        """
+        The in-process server answering this pool's requests
+
+        :returns: :py:class:`goblin.memory_client.server.GremlinServer`
+        """
+        return self._server
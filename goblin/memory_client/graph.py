@@ -0,0 +1,245 @@
+"""In-memory property graph used by the in-process Gremlin Server stand-in"""
+from __future__ import unicode_literals
+import itertools
+from collections import OrderedDict
+
+from goblin._compat import string_types
+
+
+class NoSuchElementException(Exception):
+    """ Mirrors java.util.NoSuchElementException raised by ``next()`` """
+    pass
+
+
+def normalize_id(element_id):
+    """
+    Coerce an element id sent by a client into the type used as graph key.
+
+    Titan accepts numeric ids as longs or strings, so "123" and 123 refer to
+    the same element.
+    """
+    if isinstance(element_id, dict):
+        element_id = element_id.get('id')
+    if isinstance(element_id, string_types) and element_id.isdigit():
+        return int(element_id)
+    return element_id
+
+
+class MemoryElement(object):
+    """Base class for vertices and edges stored in a :class:`MemoryGraph`"""
+
+    type = None
+
+    def __init__(self, graph, element_id, label):
+        self.graph = graph
+        self.id = element_id
+        self.label = label
+        self.properties = OrderedDict()
+
+    def value(self, key):
+        values = self.properties.get(key)
+        if not values:
+            raise KeyError(key)
+        return values[0]
+
+    def values(self, key):
+        return list(self.properties.get(key, []))
+
+    def property(self, key, value):
+        self.graph._record_property(self, key)
+        self.properties[key] = [value]
+
+    def remove_property(self, key):
+        if key in self.properties:
+            self.graph._record_property(self, key)
+            del self.properties[key]
+
+    def __repr__(self):
+        return "{}[{}]".format(self.type[0], self.id)
+
+
+class MemoryVertex(MemoryElement):
+
+    type = 'vertex'
+
+    def __init__(self, graph, element_id, label):
+        super(MemoryVertex, self).__init__(graph, element_id, label)
+        self.out_edges = OrderedDict()
+        self.in_edges = OrderedDict()
+
+    def add_property(self, key, value):
+        """ Add a value for ``key`` without replacing the existing ones """
+        self.graph._record_property(self, key)
+        self.properties.setdefault(key, []).append(value)
+
+    def edges(self, direction, labels=None):
+        if direction == 'out':
+            edges = list(self.out_edges.values())
+        elif direction == 'in':
+            edges = list(self.in_edges.values())
+        else:
+            edges = (list(self.out_edges.values()) +
+                     list(self.in_edges.values()))
+        if labels:
+            edges = [e for e in edges if e.label in labels]
+        return edges
+
+    def to_graphson(self):
+        properties = {}
+        for key, values in self.properties.items():
+            properties[key] = [
+                {'id': '{}-{}'.format(self.id, key), 'value': value}
+                for value in values]
+        return {'id': self.id, 'label': self.label, 'type': self.type,
+                'properties': properties}
+
+
+class MemoryEdge(MemoryElement):
+
+    type = 'edge'
+
+    def __init__(self, graph, element_id, label, out_vertex, in_vertex):
+        super(MemoryEdge, self).__init__(graph, element_id, label)
+        self.out_vertex = out_vertex
+        self.in_vertex = in_vertex
+
+    def other(self, vertex):
+        if vertex is self.out_vertex:
+            return self.in_vertex
+        return self.out_vertex
+
+    def to_graphson(self):
+        properties = dict((k, v[0]) for k, v in self.properties.items())
+        return {'id': self.id, 'label': self.label, 'type': self.type,
+                'outV': self.out_vertex.id,
+                'outVLabel': self.out_vertex.label,
+                'inV': self.in_vertex.id, 'inVLabel': self.in_vertex.label,
+                'properties': properties}
+
+
+class MemoryGraph(object):
+    """
+    A minimal transactional property graph.
+
+    Mutations made between :meth:`begin` and :meth:`commit` are recorded in
+    an undo log so :meth:`rollback` can restore the previous state, which is
+    how the server stand-in honours ``graph.tx().rollback()``.
+    """
+
+    def __init__(self):
+        self.vertices = OrderedDict()
+        self.edges = OrderedDict()
+        self.commits = 0
+        # keep ids clear of small integers, like Titan does
+        self._ids = itertools.count(4096)
+        self._undo = None
+        # writes of other transactions, run one at a time by interleave
+        self.concurrent = []
+
+    def begin(self):
+        self._undo = []
+
+    def commit(self):
+        if self._undo:
+            self.commits += 1
+        self._undo = None
+
+    def rollback(self):
+        if self._undo:
+            for undo in reversed(self._undo):
+                undo()
+        self._undo = None
+
+    def interleave(self):
+        """
+        Run the next queued concurrent write, as if another transaction had
+        committed it while the current one was running. It isn't undone by a
+        rollback of the current transaction.
+        """
+        if not self.concurrent:
+            return
+        undo, self._undo = self._undo, None
+        try:
+            self.concurrent.pop(0)(self)
+        finally:
+            self._undo = undo
+
+    def _record(self, undo):
+        if self._undo is not None:
+            self._undo.append(undo)
+
+    def _record_property(self, element, key):
+        if self._undo is None:
+            return
+        if key in element.properties:
+            previous = list(element.properties[key])
+
+            def undo():
+                element.properties[key] = previous
+        else:
+            def undo():
+                element.properties.pop(key, None)
+        self._undo.append(undo)
+
+    def add_vertex(self, label='vertex'):
+        vertex = MemoryVertex(self, next(self._ids), label)
+        self.vertices[vertex.id] = vertex
+        self._record(lambda: self.vertices.pop(vertex.id, None))
+        return vertex
+
+    def add_edge(self, label, out_vertex, in_vertex):
+        edge = MemoryEdge(self, next(self._ids), label, out_vertex, in_vertex)
+        self._attach_edge(edge)
+        self._record(lambda: self._detach_edge(edge))
+        return edge
+
+    def remove_vertex(self, vertex):
+        for edge in vertex.edges('both'):
+            self.remove_edge(edge)
+        del self.vertices[vertex.id]
+
+        def undo():
+            self.vertices[vertex.id] = vertex
+        self._record(undo)
+
+    def remove_edge(self, edge):
+        if edge.id in self.edges:
+            self._detach_edge(edge)
+            self._record(lambda: self._attach_edge(edge))
+
+    def _attach_edge(self, edge):
+        self.edges[edge.id] = edge
+        edge.out_vertex.out_edges[edge.id] = edge
+        edge.in_vertex.in_edges[edge.id] = edge
+
+    def _detach_edge(self, edge):
+        self.edges.pop(edge.id, None)
+        edge.out_vertex.out_edges.pop(edge.id, None)
+        edge.in_vertex.in_edges.pop(edge.id, None)
+
+    def vertex(self, vertex_id):
+        """ Look up a vertex, raising :class:`NoSuchElementException` """
+        try:
+            return self.vertices[normalize_id(vertex_id)]
+        except (KeyError, TypeError):
+            raise NoSuchElementException()
+
+    def edge(self, edge_id):
+        """ Look up an edge, raising :class:`NoSuchElementException` """
+        try:
+            return self.edges[normalize_id(edge_id)]
+        except (KeyError, TypeError):
+            raise NoSuchElementException()
+
+    def remove(self, element):
+        if isinstance(element, MemoryVertex):
+            self.remove_vertex(element)
+        else:
+            self.remove_edge(element)
+
+    def clear(self):
+        """ Remove all elements and queued writes, reset the commit count """
+        self.vertices.clear()
+        self.edges.clear()
+        self.concurrent = []
+        self.commits = 0
@@ -0,0 +1,579 @@
+"""
+In-process stand-in for the Gremlin Server.
+
+It answers the scripts that goblin generates -- the Groovy functions shipped
+in ``models/vertex.groovy`` and ``models/edge.groovy`` and the plain
+traversals built by :py:meth:`Element.all<goblin.models.element.Element.all>`,
+:py:class:`V<goblin.models.query.V>` and the relationships -- from a
+:class:`MemoryGraph<goblin.memory_client.graph.MemoryGraph>`, and replies with
+GraphSON shaped response messages.
+"""
+from __future__ import unicode_literals
+import collections
+import logging
+import re
+
+from goblin._compat import array_types, integer_types
+from .graph import MemoryElement, MemoryGraph
+from .traversal import ScriptError, Traversal, compile_traversal
+
+
+logger = logging.getLogger(__name__)
+
+# Groovy function implementations, keyed by function name
+_functions = {}
+
+
+def groovy_function(fn):
+    """
+    Register a python implementation for the Groovy function of the same
+    name. Implementations receive the graph and the request bindings as
+    keyword arguments.
+    """
+    _functions[fn.__name__] = fn
+    return fn
+
+
+def traverse(graph, script, **bindings):
+    """ Run a traversal script against ``graph`` and return the results """
+    return Traversal(graph, bindings).run(_compile(script))
+
+
+_compiled_traversals = {}
+
+
+def _compile(script):
+    compiled = _compiled_traversals.get(script)
+    if compiled is None:
+        compiled = _compiled_traversals[script] = compile_traversal(script)
+    return compiled
+
+
+def _to_geoshape(shape):
+    kind, coords = shape
+    if kind == 'point':
+        return {'type': 'Point', 'coordinates': [coords[1], coords[0]]}
+    elif kind == 'circle':
+        return {'type': 'Circle', 'coordinates': [coords[1], coords[0]],
+                'radius': coords[2]}
+    elif kind == 'box':
+        south, west, north, east = coords
+        return {'type': 'Polygon',
+                'coordinates': [[[west, south], [east, south], [east, north],
+                                 [west, north], [west, south]]]}
+    raise ScriptError("Unknown geoshape {}".format(kind))
+
+
+def _set_properties(element, attrs, geo_attrs, multi_properties=True):
+    for key, value in (geo_attrs or {}).items():
+        if value is None:
+            element.remove_property(key)
+        else:
+            element.property(key, _to_geoshape(value))
+    for key, value in (attrs or {}).items():
+        if value is None:
+            element.remove_property(key)
+        elif multi_properties and isinstance(value, array_types):
+            element.remove_property(key)
+            for extra in value:
+                element.add_property(key, extra)
+        else:
+            element.property(key, value)
+
+
+def _check_version(element, version):
+    if version is None:
+        return
+    key, expected = version
+    stored = element.values(key)
+    if (stored[0] if stored else None) != expected:
+        raise ScriptError("Version conflict: {} is not at version {}".format(
+            element, expected))
+
+
+_TRAVERSAL_STEPS = {'inV': 'in', 'outV': 'out', 'inE': 'inE',
+                    'outE': 'outE', 'bothE': 'bothE', 'bothV': 'both'}
+
+
+# vertex.groovy
+
+@groovy_function
+def _save_vertex(graph, vid, vlabel, attrs, geo_attrs, read_back=True,
+                 version=None):
+    if vid is None:
+        vertex = graph.add_vertex(vlabel)
+    else:
+        vertex = graph.vertex(vid)
+        _check_version(vertex, version)
+    _set_properties(vertex, attrs, geo_attrs)
+    return vertex if read_back else vertex.id
+
+
+@groovy_function
+def _bulk_save_vertices(graph, vlabel, elements):
+    ids = []
+    for attrs, geo_attrs in elements:
+        vertex = graph.add_vertex(vlabel)
+        _set_properties(vertex, attrs, geo_attrs)
+        ids.append(vertex.id)
+    return [ids]
+
+
+@groovy_function
+def _flush_session(graph, vertices, edges):
+    saved = []
+    for vid, vlabel, attrs, geo_attrs, version in vertices:
+        if vid is None:
+            vertex = graph.add_vertex(vlabel)
+        else:
+            vertex = graph.vertex(vid)
+            _check_version(vertex, version)
+        _set_properties(vertex, attrs, geo_attrs)
+        saved.append(vertex)
+
+    def endpoint(ref):
+        vid, index = ref
+        return saved[index] if vid is None else graph.vertex(vid)
+
+    edge_ids = []
+    for eid, outV, inV, elabel, attrs, geo_attrs, exclusive, version in \
+            edges:
+        edge = None
+        if eid is None:
+            source = endpoint(outV)
+            target = endpoint(inV)
+            if exclusive:
+                edge = _find_edge(source, target, elabel)
+            if edge is None:
+                edge = graph.add_edge(elabel, source, target)
+        else:
+            edge = graph.edge(eid)
+            _check_version(edge, version)
+        _set_properties(edge, attrs, geo_attrs, multi_properties=False)
+        edge_ids.append(edge.id)
+    return [[[v.id for v in saved], edge_ids]]
+
+
+def _increment(element, key, delta):
+    try:
+        value = element.value(key) + delta
+    except KeyError:
+        value = delta
+    element.property(key, value)
+    return value
+
+
+def _matches(element, lookup):
+    return all(element.values(key)[:1] == [value]
+               for key, value in lookup.items())
+
+
+def _upsert(element, created, attrs, geo_attrs, updates, geo_updates,
+            version, multi_properties=True):
+    if not created:
+        attrs, geo_attrs = updates, geo_updates
+        if updates is not None and version is not None:
+            _increment(element, version, 1)
+    if attrs is not None:
+        _set_properties(element, attrs, geo_attrs,
+                        multi_properties=multi_properties)
+    return [[element, created]]
+
+
+@groovy_function
+def _upsert_vertex(graph, vlabel, lookup, attrs, geo_attrs, updates,
+                   geo_updates, version):
+    existing = [v for v in traverse(graph, 'g.V().hasLabel(vlabel)',
+                                    vlabel=vlabel) if _matches(v, lookup)]
+    vertex = existing[0] if existing else graph.add_vertex(vlabel)
+    return _upsert(vertex, not existing, attrs, geo_attrs, updates,
+                   geo_updates, version)
+
+
+def _value_or_zero(element, key):
+    try:
+        return element.value(key)
+    except KeyError:
+        return 0
+
+
+@groovy_function
+def _increment_property(graph, vid, key, delta, version, attempts):
+    vertex = graph.vertex(vid)
+    for _ in range(attempts):
+        read = _value_or_zero(vertex, key)
+        # a write committed meanwhile fails the lock on key at commit
+        graph.interleave()
+        if _value_or_zero(vertex, key) == read:
+            value = _increment(vertex, key, delta)
+            stored = None
+            if version is not None:
+                stored = _increment(vertex, version, 1)
+            return [[value, stored]]
+    raise ScriptError(
+        "IllegalStateException: Lock conflict: {} of vertex {} changed in "
+        "each of {} attempts".format(key, vid, attempts))
+
+
+@groovy_function
+def _delete_vertex(graph, vid):
+    graph.remove_vertex(graph.vertex(vid))
+
+
+@groovy_function
+def _traversal(graph, vid, operation, labels, start, end, element_types):
+    if operation not in _TRAVERSAL_STEPS:
+        raise ScriptError("NamingException")
+    script = 'g.V(vid).{}(*labels)'.format(_TRAVERSAL_STEPS[operation])
+    if start is not None and end is not None:
+        script += '.range(start, end)'
+    if element_types is not None:
+        script += '.hasLabel(*element_types)'
+    return traverse(graph, script, vid=vid, labels=labels or [],
+                    start=start, end=end, element_types=element_types)
+
+
+def _sort_key(element_id):
+    if isinstance(element_id, integer_types):
+        return element_id
+    return str(element_id)
+
+
+_EDGE_STEPS = {'inV': 'inE', 'outV': 'outE', 'bothV': 'bothE',
+               'inE': 'inE', 'outE': 'outE', 'bothE': 'bothE'}
+
+
+def _indexed_value(edge, sort_key):
+    try:
+        return edge.value(sort_key)
+    except KeyError:
+        raise ScriptError("IllegalStateException: edge {} has no {}".format(
+            edge.id, sort_key))
+
+
+@groovy_function
+def _traversal_page(graph, vid, operation, labels, element_types, sort_key,
+                    after, page_limit):
+    if operation not in _TRAVERSAL_STEPS:
+        raise ScriptError("NamingException")
+    if sort_key is not None:
+        # the edges come sorted on the key, like from a vertex-centric index
+        source = graph.vertex(vid)
+        edges = traverse(graph, 'g.V(vid).{}(*labels)'.format(
+            _EDGE_STEPS[operation]), vid=vid, labels=labels or [])
+        edges.sort(key=lambda e: _indexed_value(e, sort_key))
+        rows = []
+        for edge in edges:
+            value = edge.value(sort_key)
+            element = edge.other(source) if operation.endswith('V') \
+                else edge
+            if (after is None or value >= after) and (
+                    element_types is None or element.label in element_types):
+                rows.append([element, value])
+        return rows[:page_limit]
+    script = 'g.V(vid).{}(*labels)'.format(_TRAVERSAL_STEPS[operation])
+    if element_types is not None:
+        script += '.hasLabel(*element_types)'
+    results = traverse(graph, script, vid=vid, labels=labels or [],
+                       element_types=element_types)
+    if after is not None:
+        results = [r for r in results if _sort_key(r.id) > after]
+    results.sort(key=lambda r: _sort_key(r.id))
+    return results[:page_limit]
+
+
+@groovy_function
+def _delete_related(graph, vid, operation, lbs):
+    steps = {'inV': 'in', 'outV': 'out', 'inE': 'inE', 'outE': 'outE'}
+    if operation not in steps:
+        raise ScriptError("NamingException")
+    script = 'g.V(vid).{}(*lbs)'.format(steps[operation])
+    for element in traverse(graph, script, vid=vid, lbs=lbs or []):
+        graph.remove(element)
+
+
+@groovy_function
+def _find_vertex_by_value(graph, value_type, vlabel, field, val):
+    return traverse(graph, 'g.V().hasLabel(vlabel).has(field, val)',
+                    vlabel=vlabel, field=field, val=val)
+
+
+@groovy_function
+def _id_bounds(graph, vlabel):
+    ids = [v.id for v in traverse(graph, 'g.V().hasLabel(vlabel)',
+                                  vlabel=vlabel)]
+    if not ids:
+        return [[]]
+    return [[min(ids), max(ids)]]
+
+
+@groovy_function
+def _scan_vertices(graph, vlabel, lower, upper):
+    return [v for v in traverse(graph, 'g.V().hasLabel(vlabel)',
+                                vlabel=vlabel)
+            if (lower is None or v.id >= lower) and
+            (upper is None or v.id < upper)]
+
+
+_RELATIONSHIP_STEPS = {'out': 'outE(*elabels).inV()',
+                       'in': 'inE(*elabels).outV()',
+                       'both': 'bothE(*elabels).otherV()'}
+
+
+@groovy_function
+def _prefetch_relationships(graph, relationships):
+    vertices = collections.OrderedDict()
+    rows = []
+    for index, (vids, direction, elabels, vlabels) in enumerate(
+            relationships):
+        script = 'g.V(vid).{}.hasLabel(*vlabels)'.format(
+            _RELATIONSHIP_STEPS.get(direction, _RELATIONSHIP_STEPS['both']))
+        for position, vid in enumerate(vids):
+            for vertex in traverse(graph, script, vid=vid, elabels=elabels,
+                                   vlabels=vlabels):
+                vertices[vertex.id] = vertex
+                rows.append([index, position, vertex.id])
+    return [[list(vertices.values()), rows]]
+
+
+# edge.groovy
+
+def _find_edge(source, target, elabel, lookup=None):
+    """
+    The first edge of the label from source to target matching lookup,
+    found like the groovy functions do: walking the edges of both vertices
+    at once, so only the edges of the vertex with the fewest are all read
+    """
+    def matching(edges):
+        return (e for e in edges
+                if e.label == elabel and _matches(e, lookup or {}))
+
+    in_edges = matching(target.in_edges.values())
+    for candidate in matching(source.out_edges.values()):
+        if candidate.in_vertex is target:
+            return candidate
+        candidate = next(in_edges, None)
+        if candidate is None:
+            return None
+        if candidate.out_vertex is source:
+            return candidate
+    return None
+
+
+@groovy_function
+def _save_edge(graph, eid, outV, inV, elabel, attrs, geo_attrs, exclusive,
+               read_back=True, version=None):
+    if eid is None:
+        source = graph.vertex(outV)
+        target = graph.vertex(inV)
+        edge = None
+        if exclusive:
+            edge = _find_edge(source, target, elabel)
+        if edge is None:
+            edge = graph.add_edge(elabel, source, target)
+    else:
+        edge = graph.edge(eid)
+        _check_version(edge, version)
+    _set_properties(edge, attrs, geo_attrs, multi_properties=False)
+    return edge if read_back else edge.id
+
+
+@groovy_function
+def _bulk_save_edges(graph, elabel, elements, exclusive):
+    ids = []
+    for outV, inV, attrs, geo_attrs in elements:
+        source = graph.vertex(outV)
+        target = graph.vertex(inV)
+        edge = None
+        if exclusive:
+            edge = _find_edge(source, target, elabel)
+        if edge is None:
+            edge = graph.add_edge(elabel, source, target)
+        _set_properties(edge, attrs, geo_attrs, multi_properties=False)
+        ids.append(edge.id)
+    return [ids]
+
+
+@groovy_function
+def _upsert_edge(graph, out_v, in_v, elabel, lookup, attrs, geo_attrs, updates,
+                 geo_updates, version):
+    source = graph.vertex(out_v)
+    target = graph.vertex(in_v)
+    edge = _find_edge(source, target, elabel, lookup)
+    created = edge is None
+    if created:
+        edge = graph.add_edge(elabel, source, target)
+    return _upsert(edge, created, attrs, geo_attrs, updates, geo_updates,
+                   version, multi_properties=False)
+
+
+@groovy_function
+def _delete_edge(graph, eid):
+    graph.remove_edge(graph.edge(eid))
+
+
+@groovy_function
+def _get_edges_between(graph, out_v, in_v, elabel, page_num, per_page):
+    source = graph.vertex(out_v)
+    target = graph.vertex(in_v)
+    results = [e for e in source.edges('out', [elabel])
+               if e.in_vertex is target]
+    if page_num is not None and per_page is not None:
+        start = (page_num - 1) * per_page
+        return results[start:start + per_page]
+    return results
+
+
+@groovy_function
+def _find_edge_by_value(graph, value_type, elabel, field, val):
+    return traverse(graph, 'g.E().hasLabel(elabel).has(field, val)',
+                    elabel=elabel, field=field, val=val)
+
+
+def serialize(result):
+    """ Convert a result into its GraphSON representation """
+    if isinstance(result, MemoryElement):
+        return result.to_graphson()
+    elif isinstance(result, dict):
+        return dict((k, serialize(v)) for k, v in result.items())
+    elif isinstance(result, array_types):
+        return [serialize(r) for r in result]
+    return result
+
+
+class GremlinServer(object):
+    """
+    Answers request messages sent by :py:mod:`gremlinclient` connections.
+
+    Every request is evaluated in its own transaction against
+    :py:attr:`graph`, which is rolled back if evaluation fails.
+
+    :param graph: The graph to serve, a new empty graph by default
+    :type graph: goblin.memory_client.graph.MemoryGraph
+    :param int batch_size: Number of results per response message, mirrors
+        ``resultIterationBatchSize`` in the server configuration
+    """
+
+    _import_line = re.compile(r'^\s*import\s[^\n]*\n?', re.MULTILINE)
+    # invocation of a function registered by the init script
+    _function_call = re.compile(r'^(\w+)\([\w\s,]*\)$')
+
+    def __init__(self, graph=None, batch_size=64):
+        self.graph = graph if graph is not None else MemoryGraph()
+        self.batch_size = batch_size
+        self.functions = dict(_functions)
+        self.script_counts = collections.Counter()
+        self._function_bodies = {}
+
+    @property
+    def requests(self):
+        """ Number of requests received so far """
+        return sum(self.script_counts.values())
+
+    def register_function(self, name, function):
+        """
+        Answer calls to the Groovy function ``name`` with ``function``
+
+        :param str name: Name of the function in the groovy file
+        :param function: Callable receiving the graph and the bindings as
+            keyword arguments
+        """
+        self.functions[name] = function
+
+    def reset_stats(self):
+        """ Forget the scripts received so far """
+        self.script_counts.clear()
+
+    def submit(self, request):
+        """
+        Evaluate a request message and return the response messages.
+
+        :param dict request: Decoded request message
+        :rtype: list
+        """
+        request_id = request.get('requestId')
+        args = request.get('args', {})
+        script = args.get('gremlin', '')
+        self.script_counts[script] += 1
+        try:
+            results = self.evaluate(script, args.get('bindings') or {})
+        except Exception as e:
+            logger.debug("Script evaluation failed: %s", e)
+            message = "{}: {}".format(e.__class__.__name__, e)
+            return [self._message(request_id, 597, message=message)]
+
+        results = serialize(self._iterate(results))
+        if not results:
+            return [self._message(request_id, 204)]
+        messages = []
+        for start in range(0, len(results), self.batch_size):
+            batch = results[start:start + self.batch_size]
+            code = 206 if start + self.batch_size < len(results) else 200
+            messages.append(self._message(request_id, code, batch))
+        return messages
+
+    def evaluate(self, script, bindings):
+        """
+        Evaluate a script in a transaction
+
+        :param str script: Groovy function body or invocation, or traversal
+        :param dict bindings: Script bindings
+        """
+        self.graph.begin()
+        try:
+            function = self._find_function(script)
+            if function is not None:
+                result = function(self.graph, **bindings)
+            else:
+                result = Traversal(self.graph, bindings).run(_compile(script))
+        except Exception:
+            self.graph.rollback()
+            raise
+        self.graph.commit()
+        return result
+
+    @staticmethod
+    def _iterate(results):
+        if results is None:
+            return []
+        if isinstance(results, array_types):
+            return list(results)
+        return [results]
+
+    @staticmethod
+    def _message(request_id, code, data=None, message=''):
+        return {'requestId': request_id,
+                'status': {'code': code, 'message': message,
+                           'attributes': {}},
+                'result': {'data': data, 'meta': {}}}
+
+    def _find_function(self, script):
+        body = self._import_line.sub('', script).strip()
+        call = self._function_call.match(body)
+        if call is not None and call.group(1) in self.functions:
+            return self.functions[call.group(1)]
+        if body not in self._function_bodies:
+            self._load_function_bodies()
+            self._function_bodies.setdefault(body, None)
+        name = self._function_bodies[body]
+        if name is None:
+            if not body.startswith(('g.V(', 'g.E(')):
+                raise ScriptError(
+                    "script is not supported by the in-memory server")
+            return None
+        try:
+            return self.functions[name]
+        except KeyError:
+            raise ScriptError(
+                "no in-memory implementation for {}()".format(name))
+
+    def _load_function_bodies(self):
+        from goblin import connection
+        for model in connection._loaded_models:
+            for method in getattr(model, '_gremlin_methods', {}).values():
+                try:
+                    method._setup()
+                except Exception:  # pragma: no cover
+                    continue
+                self._function_bodies[method.function_body.strip()] = \
+                    method.method_name
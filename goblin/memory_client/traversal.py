@@ -0,0 +1,388 @@
+"""
+Interpreter for the subset of Gremlin traversal scripts that goblin emits,
+e.g. ``g.V(*eids).hasLabel(x)`` or ``g.V(vid).has('name', eq(b0)).out(*b1)``
+"""
+from __future__ import unicode_literals
+import re
+
+from goblin._compat import array_types
+from .graph import (MemoryElement, MemoryVertex, NoSuchElementException,
+                    normalize_id)
+
+
+class ScriptError(Exception):
+    """ Raised when a script can't be compiled or evaluated """
+    pass
+
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?)|
+        (?P<string>'[^']*'|"[^"]*")|
+        (?P<name>[A-Za-z_]\w*)|
+        (?P<punct>[.(),*])
+    )""", re.VERBOSE)
+
+
+def _tokenize(script):
+    tokens = []
+    position = 0
+    script = script.strip()
+    while position < len(script):
+        match = _TOKEN.match(script, position)
+        if match is None:
+            raise ScriptError(
+                "unexpected input at {}: {!r}".format(position, script))
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+
+class _Parser(object):
+
+    def __init__(self, script):
+        self.tokens = _tokenize(script)
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None, None
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if (token[0] is None or (kind and token[0] != kind) or
+                (value and token[1] != value)):
+            raise ScriptError("unexpected token {!r}".format(token[1]))
+        self.position += 1
+        return token[1]
+
+    def parse(self):
+        source = self.take('name')
+        steps = []
+        while self.peek()[0] is not None:
+            self.take('punct', '.')
+            steps.append(self.call())
+        return source, steps
+
+    def call(self):
+        name = self.take('name')
+        self.take('punct', '(')
+        args = []
+        while self.peek()[1] != ')':
+            args.append(self.argument())
+            if self.peek()[1] == ',':
+                self.take()
+        self.take('punct', ')')
+        return name, args
+
+    def argument(self):
+        kind, value = self.peek()
+        if value == '*':
+            self.take()
+            return 'spread', self.take('name')
+        if kind == 'number':
+            self.take()
+            return 'literal', float(value) if '.' in value else int(value)
+        if kind == 'string':
+            self.take()
+            return 'literal', value[1:-1]
+        if kind == 'name':
+            if (self.position + 1 < len(self.tokens) and
+                    self.tokens[self.position + 1][1] == '('):
+                return ('call',) + self.call()
+            self.take()
+            return 'name', value
+        raise ScriptError("unexpected token {!r}".format(value))
+
+
+def compile_traversal(script):
+    """
+    Compile a traversal script into ``(source, steps)``.
+
+    :param script: The Gremlin script, e.g. ``g.V(vid).outE(*labels)``
+    :type script: str
+    :rtype: tuple
+    """
+    return _Parser(script).parse()
+
+
+class P(object):
+    """ Gremlin predicate """
+
+    def __init__(self, name, values):
+        self.name = name
+        self.values = values
+
+    def test(self, value):
+        name, values = self.name, self.values
+        try:
+            if name == 'eq':
+                return value == values[0]
+            if name == 'neq':
+                return value != values[0]
+            if name == 'gt':
+                return value > values[0]
+            if name == 'gte':
+                return value >= values[0]
+            if name == 'lt':
+                return value < values[0]
+            if name == 'lte':
+                return value <= values[0]
+            if name == 'within':
+                return value in values
+            if name == 'without':
+                return value not in values
+            if name == 'inside':
+                return values[0] < value < values[1]
+            if name == 'outside':
+                return value < values[0] or value > values[1]
+            if name == 'between':
+                return values[0] <= value < values[1]
+        except TypeError:
+            return False
+        raise ScriptError("unknown predicate {}".format(name))
+
+
+_CONSTANTS = {'null': None, 'true': True, 'false': False,
+              'incr': 'incr', 'decr': 'decr'}
+_PREDICATES = ('eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'within', 'without',
+               'inside', 'outside', 'between')
+
+
+class Traversal(object):
+    """ Evaluates compiled traversals against a :class:`MemoryGraph` """
+
+    def __init__(self, graph, bindings):
+        self.graph = graph
+        self.bindings = bindings or {}
+
+    def evaluate_args(self, args):
+        values = []
+        for arg in args:
+            kind, value = arg[0], arg[1]
+            if kind == 'literal':
+                values.append(value)
+            elif kind == 'spread':
+                spread = self.binding(value)
+                if spread is None:
+                    spread = []
+                values.extend(spread)
+            elif kind == 'name':
+                if value in self.bindings:
+                    values.append(self.bindings[value])
+                elif value in _CONSTANTS:
+                    values.append(_CONSTANTS[value])
+                else:
+                    raise ScriptError(
+                        "No such property: {} for class: Script".format(
+                            value))
+            elif kind == 'call' and value in _PREDICATES:
+                values.append(P(value, self.evaluate_args(arg[2])))
+            else:
+                raise ScriptError("unsupported argument {!r}".format(arg))
+        return values
+
+    def binding(self, name):
+        try:
+            return self.bindings[name]
+        except KeyError:
+            raise ScriptError(
+                "No such property: {} for class: Script".format(name))
+
+    def run(self, compiled):
+        source, steps = compiled
+        if source != 'g' or not steps or steps[0][0] not in ('V', 'E'):
+            raise ScriptError("traversals must start from g.V() or g.E()")
+        start, args = steps[0]
+        ids = self.evaluate_args(args)
+        if start == 'V':
+            if ids:
+                results = [self.graph.vertices.get(normalize_id(i))
+                           for i in ids]
+            else:
+                results = list(self.graph.vertices.values())
+        else:
+            if ids:
+                results = [self.graph.edges.get(normalize_id(i))
+                           for i in ids]
+            else:
+                results = list(self.graph.edges.values())
+        results = [(r, None) for r in results if r is not None]
+        index = 1
+        while index < len(steps):
+            name, args = steps[index]
+            modulators = []
+            while (index + 1 < len(steps) and
+                   steps[index + 1][0] == 'by'):
+                index += 1
+                modulators.append(self.evaluate_args(steps[index][1]))
+            step = getattr(self, 'step_' + name, None)
+            if step is None:
+                raise ScriptError("unsupported step {}()".format(name))
+            results = step(results, self.evaluate_args(args), *modulators)
+            index += 1
+        return [r[0] for r in results]
+
+    # filters
+    def step_hasLabel(self, results, labels):
+        return [r for r in results if r[0].label in labels]
+
+    def step_hasId(self, results, ids):
+        ids = set(normalize_id(i) for i in ids)
+        return [r for r in results if r[0].id in ids]
+
+    def step_has(self, results, args):
+        if len(args) == 3:
+            label, key, predicate = args
+            results = self.step_hasLabel(results, [label])
+        elif len(args) == 2:
+            key, predicate = args
+        else:
+            key, predicate = args[0], None
+        if predicate is not None and not isinstance(predicate, P):
+            predicate = P('eq', [predicate])
+        filtered = []
+        for result in results:
+            values = result[0].values(key)
+            if not values:
+                continue
+            if predicate is None or any(predicate.test(v) for v in values):
+                filtered.append(result)
+        return filtered
+
+    def step_hasNot(self, results, args):
+        return [r for r in results if not r[0].values(args[0])]
+
+    # vertex steps
+    def _adjacent(self, results, direction, labels, edges_only=False):
+        adjacent = []
+        for element, _ in results:
+            for edge in element.edges(direction, labels):
+                if edges_only:
+                    adjacent.append((edge, element))
+                else:
+                    adjacent.append((edge.other(element), element))
+        return adjacent
+
+    def step_out(self, results, labels):
+        return self._adjacent(results, 'out', labels)
+
+    def step_in(self, results, labels):
+        return self._adjacent(results, 'in', labels)
+
+    def step_both(self, results, labels):
+        return self._adjacent(results, 'both', labels)
+
+    def step_outE(self, results, labels):
+        return self._adjacent(results, 'out', labels, edges_only=True)
+
+    def step_inE(self, results, labels):
+        return self._adjacent(results, 'in', labels, edges_only=True)
+
+    def step_bothE(self, results, labels):
+        return self._adjacent(results, 'both', labels, edges_only=True)
+
+    def step_outV(self, results, args):
+        return [(e.out_vertex, e) for e, _ in results]
+
+    def step_inV(self, results, args):
+        return [(e.in_vertex, e) for e, _ in results]
+
+    def step_bothV(self, results, args):
+        both = []
+        for edge, _ in results:
+            both.extend([(edge.out_vertex, edge), (edge.in_vertex, edge)])
+        return both
+
+    def step_otherV(self, results, args):
+        return [(e.other(previous) if isinstance(previous, MemoryVertex)
+                 else e.in_vertex, e) for e, previous in results]
+
+    # maps and ranges
+    def step_id(self, results, args):
+        return [(r[0].id, r[0]) for r in results]
+
+    def step_label(self, results, args):
+        return [(r[0].label, r[0]) for r in results]
+
+    def step_values(self, results, keys):
+        values = []
+        for element, _ in results:
+            for key in keys or element.properties.keys():
+                values.extend((v, element) for v in element.values(key))
+        return values
+
+    def step_dedup(self, results, args):
+        seen = set()
+        deduped = []
+        for result in results:
+            key = (result[0].type, result[0].id) if isinstance(
+                result[0], MemoryElement) else result[0]
+            if key not in seen:
+                seen.add(key)
+                deduped.append(result)
+        return deduped
+
+    def step_limit(self, results, args):
+        return results[:args[0]]
+
+    def step_range(self, results, args):
+        low, high = args
+        if high < 0:
+            return results[low:]
+        return results[low:high]
+
+    def step_count(self, results, args):
+        return [(len(results), None)]
+
+    def step_order(self, results, args, *modulators):
+        keys = []
+        for modulator in modulators or [[]]:
+            key = modulator[0] if modulator else None
+            descending = len(modulator) > 1 and modulator[1] == 'decr'
+            keys.append((key, descending))
+        for key, descending in reversed(keys):
+            results = sorted(
+                results, key=lambda r, k=key: self._sort_key(r, k),
+                reverse=descending)
+        return results
+
+    @staticmethod
+    def _sort_key(result, key):
+        element = result[0]
+        if key is None:
+            value = element.id if isinstance(element, MemoryElement) \
+                else element
+        elif key == 'id':
+            value = element.id
+        else:
+            values = element.values(key)
+            if not values:
+                # like the server, elements missing the key can't be ordered
+                raise ScriptError(
+                    "IllegalArgumentException: The provided traverser does "
+                    "not map to a value: {}->{}".format(element.id, key))
+            value = values[0]
+        return (value is not None, value)
+
+    def step_fold(self, results, args):
+        return [([r[0] for r in results], None)]
+
+    def step_unfold(self, results, args):
+        unfolded = []
+        for value, previous in results:
+            if isinstance(value, array_types):
+                unfolded.extend((v, previous) for v in value)
+            else:
+                unfolded.append((value, previous))
+        return unfolded
+
+    def step_next(self, results, args):
+        if not results:
+            raise NoSuchElementException()
+        return results[:1]
+
+    def step_toList(self, results, args):
+        return results
@@ -0,0 +1,405 @@
+"""
+Native coroutine API for the models, Python 3.5+ only.
+
+The methods of :class:`AsyncVertexMixin` and :class:`AsyncEdgeMixin` mirror
+the callback based methods of :py:class:`Vertex<goblin.models.vertex.Vertex>`
+and :py:class:`Edge<goblin.models.edge.Edge>`, but await the connection
+pool and the response stream directly instead of chaining
+``add_done_callback`` closures and allocating a future per hop::
+
+    v = await MyVertex.aget(vid)
+    async for v in MyVertex.aall():
+        print(v)
+
+:func:`iterate` streams the results of the callback based methods
+(``all``, :py:meth:`V.get<goblin.models.query.V.get>`, traversals,
+relationships) the same way, reading a bounded number of response messages
+ahead of the consumer.
+
+Traversals and relationships have no coroutine versions: with
+``future_class=asyncio.Future`` the futures they return are awaited
+directly::
+
+    stream = await v.outV(MyEdge)
+    edge, vertex = await v.related.create()
+
+They work with any pool whose futures can be awaited by the running loop,
+typically :py:class:`gremlinclient.aiohttp_client.Pool` with asyncio.
+"""
+import collections
+
+from goblin import connection
+from goblin.constants import VERTEX_TRAVERSAL, EDGE_TRAVERSAL
+from goblin.exceptions import GoblinConnectionError, GoblinQueryError
+from goblin.models import cache, identity
+
+
+async def execute_query(query, bindings=None, pool=None, graph_name=None,
+                        traversal_source=None, request_id=None, handler=None,
+                        identity_map=None, **kwargs):
+    """
+    Send a raw Gremlin query and return the response stream.
+
+    Takes the same arguments as :py:func:`goblin.connection.execute_query`.
+
+    :returns: :py:class:`gremlinclient.connection.Stream`
+    """
+    if pool is None:
+        pool = connection._connection_pool
+        if pool is None:
+            raise GoblinConnectionError(("Please call connection.setup or "
+                                         "pass pool explicitly"))
+    aliases = {"graph": graph_name or connection._graph_name or "graph",
+               "g": (traversal_source or connection._traversal_source or
+                     "g")}
+    conn = await pool.acquire()
+    return conn.send(query, bindings=bindings, aliases=aliases,
+                     handler=identity.wrap(identity_map, handler),
+                     request_id=request_id)
+
+
+async def read_all(stream):
+    """
+    Read every message of a response stream.
+
+    :returns: list of the concatenated results
+    """
+    results = []
+    while True:
+        message = await stream.read()
+        if message is None:
+            return results
+        results.extend(message.data or [])
+
+
+class ResultIterator(object):
+    """
+    Asynchronous iterator over the results of a response stream, yielded
+    as the server sends them, one response message at a time.
+
+    At most ``max_buffered`` messages are read ahead of the consumer. The
+    next message is only read once the consumer has caught up, so memory
+    use is bounded by the batch size of the server
+    (``resultIterationBatchSize``), not by the size of the result set.
+    The connection goes back to the pool once the response has been read
+    to the end, call :meth:`aclose` when leaving the loop early.
+
+    :param future_stream: Future or awaitable response stream, as returned
+        by :py:func:`goblin.connection.execute_query` and the model methods
+        built on it
+    :param int max_buffered: Maximum number of messages read ahead
+    :param handler: Applied to each result when it is yielded
+    """
+
+    def __init__(self, future_stream, max_buffered=1, handler=None,
+                 **kwargs):
+        if max_buffered < 1:
+            raise ValueError("max_buffered must be at least 1")
+        self._future_stream = future_stream
+        self._max_buffered = max_buffered
+        self._handler = handler
+        self._kwargs = dict((k, v) for k, v in kwargs.items()
+                            if k in ('pool', 'future_class'))
+        self._stream = None
+        self._messages = collections.deque()
+        self._items = collections.deque()
+        self._reading = False
+        self._exhausted = False
+        self._discard = False
+        self._error = None
+        self._waiter = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._items:
+            if self._messages:
+                self._items.extend(self._messages.popleft())
+                self._fill()
+            elif self._error is not None:
+                error, self._error = self._error, None
+                raise error
+            elif self._exhausted:
+                self._finish()
+                raise StopAsyncIteration
+            else:
+                await self._wait()
+        result = self._items.popleft()
+        if self._handler is not None:
+            result = self._handler(result)
+        return result
+
+    async def aclose(self):
+        """ Read and discard the rest of the response """
+        self._discard = True
+        self._messages.clear()
+        self._items.clear()
+        while not self._exhausted:
+            await self._wait()
+        self._error = None
+
+    async def _wait(self):
+        if self._stream is None:
+            self._stream = await self._open()
+        waiter = self._waiter = connection.get_future(self._kwargs)
+        self._fill()
+        await waiter
+
+    def _open(self):
+        """ Awaitable response stream """
+        return self._future_stream
+
+    def _fill(self):
+        if (self._stream is None or self._reading or self._exhausted or
+                len(self._messages) >= self._max_buffered):
+            return
+        self._reading = True
+        future_read = self._stream.read()
+        future_read.add_done_callback(self._on_read)
+
+    def _on_read(self, f):
+        self._reading = False
+        try:
+            message = f.result()
+        except Exception as e:
+            self._error = e
+            self._exhausted = True
+        else:
+            if message is None:
+                self._exhausted = True
+            elif not self._discard:
+                # raw messages when the stream has no handlers
+                data = getattr(message, 'data', message)
+                self._messages.append(data or [])
+        waiter, self._waiter = self._waiter, None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+        if not self._exhausted:
+            # the stream only knows it is exhausted once this callback
+            # returns, so read ahead on the next iteration
+            connection.call_later(0, self._fill, **self._kwargs)
+
+    def _finish(self):
+        """ Called once every result has been yielded """
+
+
+def iterate(future_stream, max_buffered=1, **kwargs):
+    """
+    Iterate asynchronously over a response stream::
+
+        async for v in iterate(MyVertex.all()):
+            print(v)
+        async for v in iterate(vertex.outV()):
+            print(v)
+
+    :param future_stream: Future response stream
+    :param int max_buffered: Maximum number of messages read ahead
+    :rtype: ResultIterator
+    """
+    return ResultIterator(future_stream, max_buffered=max_buffered, **kwargs)
+
+
+class ElementIterator(ResultIterator):
+    """
+    :class:`ResultIterator` sending a query and deserializing the elements
+    it returns.
+
+    :param str query: The Gremlin query
+    :param dict bindings: Bindings for the query
+    :param int expected: Number of elements that must be returned, if any
+    :param exception: Exception class raised when no element is found
+    :param int max_buffered: Maximum number of messages read ahead
+    """
+
+    def __init__(self, query, bindings, expected=None, exception=None,
+                 max_buffered=1, **kwargs):
+        super(ElementIterator, self).__init__(
+            None, max_buffered=max_buffered,
+            handler=identity.wrap(kwargs.get('identity_map'),
+                                  self._deserialize), **kwargs)
+        self._query = query
+        self._bindings = bindings
+        self._query_kwargs = kwargs
+        self._expected = expected
+        self._exception = exception
+        self._count = 0
+
+    def _open(self):
+        return execute_query(self._query, bindings=self._bindings,
+                             **self._query_kwargs)
+
+    async def aclose(self):
+        if self._stream is None:
+            # the query was never sent
+            self._exhausted = True
+            return
+        await super(ElementIterator, self).aclose()
+
+    def _deserialize(self, data):
+        from goblin.models.element import Element
+        self._count += 1
+        return Element.deserialize(data)
+
+    def _finish(self):
+        if self._expected is None:
+            return
+        if not self._count:
+            raise self._exception
+        if self._count != self._expected:
+            raise GoblinQueryError(
+                "the number of results don't match the number of " +
+                "ids requested")
+
+
+class AsyncElementMixin(object):
+
+    @classmethod
+    async def aget(cls, id, **kwargs):
+        """
+        Coroutine version of :py:meth:`get<goblin.models.element.BaseElement.get>`
+
+        :param id: The ID of the element
+        :rtype: goblin.models.element.Element
+        """
+        if id is None:
+            raise cls.DoesNotExist
+        results = []
+        async for result in cls.aall([id], **kwargs):
+            results.append(result)
+        result = results[0]
+        if not isinstance(result, cls):
+            raise cls.WrongElementType(
+                '%s is not an instance or subclass of %s' % (
+                    result.__class__.__name__, cls.__name__))
+        return result
+
+    @classmethod
+    def aall(cls, ids=None, allow_missing=False, max_buffered=1, **kwargs):
+        """
+        Iterate asynchronously over the elements with the given ids, or over
+        every element of this type when no ids are given.
+
+        :param ids: A list of titan ids
+        :type ids: list
+        :param allow_missing: Skip the ids that don't exist instead of
+            raising
+        :type allow_missing: boolean
+        :param max_buffered: Maximum number of response messages read ahead
+        :type max_buffered: int
+        :rtype: ElementIterator
+        """
+        from goblin.models.element import _all_scripts
+        ids = ids or []
+        expected = len(ids) if ids and not allow_missing else None
+        kwargs = connection.pop_execute_query_kwargs(kwargs)
+        return ElementIterator(
+            _all_scripts[cls._element_traversal],
+            {'eids': ids, 'x': cls.get_label()}, expected=expected,
+            exception=cls.DoesNotExist, max_buffered=max_buffered, **kwargs)
+
+    @classmethod
+    async def acreate(cls, *args, **kwargs):
+        """ Coroutine version of :py:meth:`create` """
+        query_kwargs = connection.pop_execute_query_kwargs(kwargs)
+        return await cls(*args, **kwargs).asave(**query_kwargs)
+
+    async def _acall(self, method_name, *args, **kwargs):
+        """ Call a gremlin method and return its deserialized results """
+        from goblin.gremlin import GremlinMethod
+        method = self._gremlin_methods[method_name]
+        script, bindings, query_kwargs = method.build_query(self, *args,
+                                                            **kwargs)
+        deserialize = identity.wrap(query_kwargs.pop('identity_map', None),
+                                    GremlinMethod._deserialize)
+        stream = await execute_query(script, bindings=bindings,
+                                     **query_kwargs)
+        return deserialize(await read_all(stream))
+
+
+class AsyncVertexMixin(AsyncElementMixin):
+
+    _element_traversal = VERTEX_TRAVERSAL
+
+    async def asave(self, **kwargs):
+        """ Coroutine version of :py:meth:`save<goblin.models.vertex.Vertex.save>` """
+        from goblin.models.element import BaseElement, save_error
+        BaseElement.save(self)
+        read_back = kwargs.pop('read_back', self.__read_back__)
+        params, geo_params = self.as_save_params()
+        cache.invalidate(VERTEX_TRAVERSAL, self._id)
+        try:
+            results = await self._acall('_save_vertex', self.get_label(),
+                                        params, geo_params,
+                                        read_back=read_back,
+                                        version=self.version_condition(),
+                                        **kwargs)
+        except Exception as e:
+            raise save_error(e)
+        finally:
+            cache.invalidate(VERTEX_TRAVERSAL, self._id)
+        if not read_back:
+            self._id = results[0]
+            cache.forget_missing(VERTEX_TRAVERSAL, self._id)
+            self._mark_saved(params, geo_params)
+            return self
+        result = results[0]
+        self._id = result._id
+        cache.forget_missing(VERTEX_TRAVERSAL, self._id)
+        for k, v in self._values.items():
+            v.previous_value = result._values[k].previous_value
+        return result
+
+    async def adelete(self, **kwargs):
+        """ Coroutine version of :py:meth:`delete<goblin.models.vertex.Vertex.delete>` """
+        if self.__abstract__:
+            raise GoblinQueryError('Cant delete abstract elements')
+        if self._id is None:  # pragma: no cover
+            return self
+        try:
+            return await self._acall('_delete_vertex', **kwargs)
+        finally:
+            cache.invalidate(VERTEX_TRAVERSAL, self._id)
+            cache.invalidate_edges(self._id)
+
+
+class AsyncEdgeMixin(AsyncElementMixin):
+
+    _element_traversal = EDGE_TRAVERSAL
+
+    async def asave(self, **kwargs):
+        """ Coroutine version of :py:meth:`save<goblin.models.edge.Edge.save>` """
+        from goblin.models.element import BaseElement, save_error
+        BaseElement.save(self)
+        read_back = kwargs.pop('read_back', self.__read_back__)
+        attrs, geo_attrs = self.as_save_params()
+        cache.invalidate(EDGE_TRAVERSAL, self._id)
+        try:
+            results = await self._acall('_save_edge', self._outV, self._inV,
+                                        self.get_label(), attrs, geo_attrs,
+                                        exclusive=self.__exclusive__,
+                                        read_back=read_back,
+                                        version=self.version_condition(),
+                                        **kwargs)
+        except Exception as e:
+            raise save_error(e)
+        finally:
+            cache.invalidate(EDGE_TRAVERSAL, self._id)
+        result = results[0]
+        if not read_back:
+            self._id = result
+            self._mark_saved(attrs, geo_attrs)
+            result = self
+        cache.forget_missing(EDGE_TRAVERSAL, result._id)
+        return result
+
+    async def adelete(self, **kwargs):
+        """ Coroutine version of :py:meth:`delete<goblin.models.edge.Edge.delete>` """
+        if self.__abstract__:  # pragma: no cover
+            raise GoblinQueryError('cant delete abstract elements')
+        if self._id is None:
+            return self
+        try:
+            return await self._acall('_delete_edge', **kwargs)
+        finally:
+            cache.invalidate(EDGE_TRAVERSAL, self._id)
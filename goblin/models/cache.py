@@ -0,0 +1,486 @@
+"""
+Read-through cache of the elements loaded by id.
+
+When ``connection.setup(element_cache=...)`` is given a cache,
+:py:meth:`get<goblin.models.element.BaseElement.get>` and
+:py:meth:`all<goblin.models.element.BaseElement.all>` with ids only ask the
+server for the ids that aren't cached. The cache keeps the pickle state of
+the elements (``__getstate__``) and builds a new element from it on each
+hit (``__setstate__``), so callers never share instances.
+
+:class:`ElementCache` keeps the elements in process, in a LRU of ``maxsize``
+elements. :class:`SharedElementCache` keeps them in a
+:py:class:`CacheBackend<goblin.models.cache_backends.CacheBackend>` shared by
+several processes, such as the workers of a pre-fork server.
+
+Entries expire after the ``__cache_ttl__`` seconds of their model, or the
+``ttl`` of the cache. Saving or deleting an element through goblin
+invalidates it. Hits, misses and evictions are counted on the cache and
+reported to the metric manager given to ``connection.setup`` as
+``goblin.element_cache.*`` counters.
+
+:class:`MissingCache` is the negative counterpart: when
+``connection.setup(missing_cache=...)`` is given one, the ids a lookup didn't
+find are remembered for a while, and looking them up again raises
+``DoesNotExist`` without a round trip. Saving an element through goblin
+forgets its id. Its metrics are reported as ``goblin.missing_cache.*``.
+"""
+from __future__ import unicode_literals
+import copy
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from goblin import connection
+from goblin.constants import VERTEX_TRAVERSAL, EDGE_TRAVERSAL
+from goblin.models.loader import _id_key
+from .cache_backends import encode_state, decode_state
+
+
+logger = logging.getLogger(__name__)
+
+
+def _element_from_state(source, label, state):
+    from goblin.models.element import vertex_types, edge_types
+    types = vertex_types if source == VERTEX_TRAVERSAL else edge_types
+    element_class = types.get(label)
+    if element_class is None:
+        return None
+    element = element_class.__new__(element_class)
+    element.__setstate__(state)
+    return element
+
+
+def _endpoints(state):
+    return _id_key(state.get('outV')), _id_key(state.get('inV'))
+
+
+class ElementCache(object):
+    """
+    In-process LRU cache of elements with a time to live
+
+    :param int maxsize: Maximum number of elements
+    :param float ttl: Default number of seconds an element is kept, None to
+        keep it until it is evicted
+    :param clock: Callable returning the current time in seconds
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, clock=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        # vertex id -> {key: label} of the cached edges of the vertex
+        self._vertex_edges = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, source, element_id, label):
+        """
+        Look up an element
+
+        :param str source: The element traversal, 'V' or 'E'
+        :param element_id: The id of the element
+        :param str label: The label the element must have
+        :returns: A new element, or None
+        """
+        key = self._key(source, element_id)
+        entry = self._load(key)
+        if entry is not None and entry[2] is not None and \
+                entry[2] <= self.clock():
+            self._discard(key)
+            entry = None
+        element = None
+        if entry is not None and entry[0] == label:
+            element = _element_from_state(source, entry[0], entry[1])
+        if element is None:
+            self.misses += 1
+            _count('element_cache', 'misses')
+        else:
+            self.hits += 1
+            _count('element_cache', 'hits')
+        return element
+
+    def put(self, source, element, ttl=None):
+        """
+        Store an element
+
+        :param str source: The element traversal, 'V' or 'E'
+        :param element: The vertex or edge
+        :type element: goblin.models.element.Element
+        :param float ttl: Seconds the element is kept, defaults to the ttl of
+            the cache
+        """
+        if ttl is None:
+            ttl = self.ttl
+        if ttl is not None and ttl <= 0:
+            return
+        expires = self.clock() + ttl if ttl is not None else None
+        entry = (element.get_label(), element.__getstate__(), expires)
+        evicted = self._save(self._key(source, element.id), entry)
+        self.evictions += evicted
+        for _ in range(evicted):
+            _count('element_cache', 'evictions')
+
+    def invalidate(self, source, element_id):
+        """
+        Drop an element
+
+        :param str source: The element traversal, 'V' or 'E'
+        :param element_id: The id of the element
+        """
+        self._discard(self._key(source, element_id))
+
+    def invalidate_edges(self, vertex_id, labels=None):
+        """
+        Drop the edges of a vertex
+
+        :param vertex_id: The id of the vertex
+        :param labels: Only drop the edges with these labels
+        :type labels: list
+        """
+        edges = self._vertex_edges.get(_id_key(vertex_id), {})
+        for key, label in list(edges.items()):
+            if not labels or label in labels:
+                self._discard(key)
+
+    def clear(self):
+        """ Drop every element """
+        self._entries.clear()
+        self._vertex_edges.clear()
+
+    # storage of the (label, state, expires) entries
+
+    def _key(self, source, element_id):
+        return source, _id_key(element_id)
+
+    def _load(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            # move to the most recently used end
+            del self._entries[key]
+            self._entries[key] = entry
+            entry = (entry[0], copy.deepcopy(entry[1]), entry[2])
+        return entry
+
+    def _save(self, key, entry):
+        self._discard(key)
+        self._entries[key] = entry
+        if key[0] == EDGE_TRAVERSAL:
+            for vertex_key in _endpoints(entry[1]):
+                self._vertex_edges.setdefault(vertex_key, {})[key] = entry[0]
+        evicted = 0
+        while len(self._entries) > self.maxsize:
+            self._discard(next(iter(self._entries)))
+            evicted += 1
+        return evicted
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None or key[0] != EDGE_TRAVERSAL:
+            return
+        for vertex_key in _endpoints(entry[1]):
+            edges = self._vertex_edges.get(vertex_key)
+            if edges is not None:
+                edges.pop(key, None)
+                if not edges:
+                    del self._vertex_edges[vertex_key]
+
+
+class SharedElementCache(ElementCache):
+    """
+    Cache of elements kept in a store shared by several processes, with a
+    time to live. The pickle state of the elements is stored with the
+    compact binary encoding of
+    :py:func:`encode_state<goblin.models.cache_backends.encode_state>`.
+
+    The edges of a vertex are invalidated by storing a new token for the
+    vertex, and for each label given. A cached edge keeps the tokens of its
+    vertices and is dropped when it is read with other tokens, so no process
+    has to find the edges of the vertex in the store.
+
+    :param backend: The shared store
+    :type backend: goblin.models.cache_backends.CacheBackend
+    :param float ttl: Default number of seconds an element is kept, None to
+        keep it until it is evicted
+    :param clock: Callable returning the current time in seconds
+    """
+
+    def __init__(self, backend, ttl=None, clock=time.time):
+        super(SharedElementCache, self).__init__(ttl=ttl, clock=clock)
+        self.backend = backend
+
+    def __len__(self):
+        return len([key for key in self.backend.keys()
+                    if not key.startswith('G:')])
+
+    def invalidate_edges(self, vertex_id, labels=None):
+        token = os.urandom(8)
+        for label in labels or [None]:
+            self.backend.set(self._token_key(_id_key(vertex_id), label),
+                             token)
+
+    def clear(self):
+        self.backend.clear()
+
+    def _key(self, source, element_id):
+        return '{}:{}'.format(source, _id_key(element_id))
+
+    @staticmethod
+    def _token_key(vertex_key, label):
+        if label is None:
+            return 'G:{}'.format(vertex_key)
+        return 'G:{}:{}'.format(vertex_key, label)
+
+    def _tokens(self, entry):
+        # a token evicted from the store only turns its edges into misses
+        return [self.backend.get(self._token_key(vertex_key, label))
+                for vertex_key in _endpoints(entry[1])
+                for label in (None, entry[0])]
+
+    def _load(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            return None
+        try:
+            entry = tuple(decode_state(value))
+        except ValueError:
+            logger.warning("Can't decode the cached element %s", key)
+            return None
+        if len(entry) > 3:
+            if list(entry[3]) != self._tokens(entry):
+                self._discard(key)
+                return None
+            entry = entry[:3]
+        return entry
+
+    def _save(self, key, entry):
+        if key.startswith('{}:'.format(EDGE_TRAVERSAL)):
+            entry = tuple(entry) + (self._tokens(entry),)
+        try:
+            value = encode_state(list(entry))
+        except TypeError as e:
+            logger.debug("Can't encode the state of %s: %s", key, e)
+            return 0
+        return self.backend.set(key, value, entry[2])
+
+    def _discard(self, key):
+        self.backend.delete(key)
+
+
+class MissingCache(object):
+    """
+    In-process cache of the ids that weren't found, with a time to live
+
+    An id is only missing for the label it was looked up with, since
+    ``get`` doesn't find an element of another label either.
+
+    :param int maxsize: Maximum number of ids
+    :param float ttl: Number of seconds an id is remembered, None to
+        remember it until it is evicted or saved
+    :param clock: Callable returning the current time in seconds
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, clock=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (source, id) -> {label: expires}
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def is_missing(self, source, element_id, label):
+        """
+        Whether an id was recently found missing
+
+        :param str source: The element traversal, 'V' or 'E'
+        :param element_id: The id of the element
+        :param str label: The label it was looked up with
+        :rtype: bool
+        """
+        key = (source, _id_key(element_id))
+        labels = self._entries.get(key)
+        missing = False
+        if labels is not None and label in labels:
+            expires = labels[label]
+            if expires is not None and expires <= self.clock():
+                del labels[label]
+                if not labels:
+                    del self._entries[key]
+            else:
+                missing = True
+        if missing:
+            self.hits += 1
+            _count('missing_cache', 'hits')
+        else:
+            self.misses += 1
+            _count('missing_cache', 'misses')
+        return missing
+
+    def add(self, source, element_id, label):
+        """
+        Remember that an id wasn't found
+
+        :param str source: The element traversal, 'V' or 'E'
+        :param element_id: The id of the element
+        :param str label: The label it was looked up with
+        """
+        if self.ttl is not None and self.ttl <= 0:
+            return
+        key = (source, _id_key(element_id))
+        labels = self._entries.pop(key, {})
+        labels[label] = (self.clock() + self.ttl
+                         if self.ttl is not None else None)
+        self._entries[key] = labels
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+            _count('missing_cache', 'evictions')
+
+    def invalidate(self, source, element_id):
+        """
+        Forget that an id wasn't found, whatever its label
+
+        :param str source: The element traversal, 'V' or 'E'
+        :param element_id: The id of the element
+        """
+        self._entries.pop((source, _id_key(element_id)), None)
+
+    def clear(self):
+        """ Forget every id """
+        self._entries.clear()
+
+
+def _count(cache_name, name):
+    manager = connection._metric_manager
+    if manager is None:
+        return
+    for counter in manager.counters(
+            'goblin.{}.{}'.format(cache_name, name)):
+        counter.inc()
+
+
+class CachedStream(object):
+    """
+    Response stream returning the cached elements, then the messages of the
+    query sent for the others, if any
+
+    :param list cached: The cached elements
+    :param list handlers: The handlers applied to the cached elements
+    :param stream: The stream of the query sent for the other elements
+    """
+
+    def __init__(self, cached, handlers, stream=None, **kwargs):
+        self._cached = cached or None
+        self._handlers = list(handlers)
+        self._stream = stream
+        self._kwargs = kwargs
+
+    def add_handler(self, handler):
+        self._handlers.append(handler)
+        if self._stream is not None:
+            self._stream.add_handler(handler)
+
+    def read(self):
+        if self._cached is None and self._stream is not None:
+            return self._stream.read()
+        future = connection.get_future(self._kwargs)
+        results, self._cached = self._cached, None
+        if results is not None:
+            try:
+                for handler in self._handlers:
+                    results = handler(results)
+            except Exception as e:
+                future.set_exception(e)
+                return future
+        future.set_result(results)
+        return future
+
+
+class MissingIdsStream(object):
+    """
+    Response stream of a lookup by id, remembering the ids it didn't return
+    in a :class:`MissingCache` once it has been read to the end
+
+    :param stream: The stream of the lookup
+    :param missing_cache: The cache of the missing ids
+    :type missing_cache: MissingCache
+    :param str source: The element traversal, 'V' or 'E'
+    :param str label: The label looked up
+    :param list ids: The ids looked up
+    :param exception: Exception class raised by the handlers when no element
+        was found
+    """
+
+    def __init__(self, stream, missing_cache, source, label, ids, exception):
+        self._stream = stream
+        self._missing_cache = missing_cache
+        self._source = source
+        self._label = label
+        self._ids = ids
+        self._exception = exception
+        self._found = set()
+        self._done = False
+        # sees the raw results, before the handlers that raise
+        stream.add_handler(self._found_handler)
+
+    def _found_handler(self, results):
+        for result in results or []:
+            self._found.add(_id_key(result['id']))
+        return results
+
+    def add_handler(self, handler):
+        self._stream.add_handler(handler)
+
+    def read(self):
+        future = self._stream.read()
+        future.add_done_callback(self._on_read)
+        return future
+
+    def _on_read(self, f):
+        try:
+            finished = f.result() is None
+        except self._exception:
+            finished = True
+        except Exception:
+            finished = False
+        if finished and not self._done:
+            self._done = True
+            for element_id in self._ids:
+                if _id_key(element_id) not in self._found:
+                    self._missing_cache.add(self._source, element_id,
+                                            self._label)
+
+
+def forget_missing(source, element_id):
+    """ Drop an id from the configured missing ids cache, if any """
+    if connection._missing_cache is not None and element_id is not None:
+        connection._missing_cache.invalidate(source, element_id)
+
+
+def invalidate(source, element_id):
+    """ Drop an element from the configured cache, if any """
+    if connection._element_cache is not None and element_id is not None:
+        connection._element_cache.invalidate(source, element_id)
+
+
+def invalidate_edges(vertex_id, labels=None):
+    """ Drop the edges of a vertex from the configured cache, if any """
+    if connection._element_cache is not None:
+        connection._element_cache.invalidate_edges(vertex_id, labels)
+
+
+def clear():
+    """ Drop every element from the configured cache, if any """
+    if connection._element_cache is not None:
+        connection._element_cache.clear()
@@ -0,0 +1,306 @@
+"""
+Stores for the elements of a
+:py:class:`SharedElementCache<goblin.models.cache.SharedElementCache>`.
+
+The elements are kept as their pickle state, encoded by :func:`encode_state`
+in a compact binary format: a one byte tag per value, variable length
+integers, and no field names beyond the keys of the dicts.
+"""
+from __future__ import unicode_literals
+import mmap
+import os
+import struct
+import time
+import zlib
+
+from goblin._compat import integer_types, string_types
+
+
+_FLOAT = struct.Struct('>d')
+
+
+def _write_varint(out, value):
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Truncated integer")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return result, pos
+
+
+def _encode(out, value):
+    if value is None:
+        out.append(0x4e)  # N
+    elif value is True:
+        out.append(0x54)  # T
+    elif value is False:
+        out.append(0x46)  # F
+    elif isinstance(value, integer_types):
+        out.append(0x69)  # i, zigzag encoded
+        _write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+    elif isinstance(value, float):
+        out.append(0x64)  # d
+        out.extend(_FLOAT.pack(value))
+    elif isinstance(value, (bytes, bytearray)):
+        out.append(0x62)  # b
+        _write_varint(out, len(value))
+        out.extend(value)
+    elif isinstance(value, string_types):
+        data = value.encode('utf-8')
+        out.append(0x73)  # s
+        _write_varint(out, len(data))
+        out.extend(data)
+    elif isinstance(value, list):
+        out.append(0x6c)  # l
+        _write_varint(out, len(value))
+        for item in value:
+            _encode(out, item)
+    elif isinstance(value, tuple):
+        out.append(0x74)  # t
+        _write_varint(out, len(value))
+        for item in value:
+            _encode(out, item)
+    elif isinstance(value, dict):
+        out.append(0x6d)  # m
+        _write_varint(out, len(value))
+        for key, item in value.items():
+            _encode(out, key)
+            _encode(out, item)
+    else:
+        raise TypeError("Can't encode {!r}".format(value))
+
+
+def _decode(data, pos):
+    if pos >= len(data):
+        raise ValueError("Truncated state")
+    tag = data[pos]
+    pos += 1
+    if tag == 0x4e:
+        return None, pos
+    elif tag == 0x54:
+        return True, pos
+    elif tag == 0x46:
+        return False, pos
+    elif tag == 0x69:
+        value, pos = _read_varint(data, pos)
+        return (value >> 1 if not value & 1 else -((value + 1) >> 1)), pos
+    elif tag == 0x64:
+        if pos + _FLOAT.size > len(data):
+            raise ValueError("Truncated float")
+        return _FLOAT.unpack_from(bytes(data[pos:pos + _FLOAT.size]))[0], \
+            pos + _FLOAT.size
+    elif tag in (0x62, 0x73):
+        length, pos = _read_varint(data, pos)
+        if pos + length > len(data):
+            raise ValueError("Truncated string")
+        value = bytes(data[pos:pos + length])
+        if tag == 0x73:
+            value = value.decode('utf-8')
+        return value, pos + length
+    elif tag in (0x6c, 0x74):
+        length, pos = _read_varint(data, pos)
+        items = []
+        for _ in range(length):
+            item, pos = _decode(data, pos)
+            items.append(item)
+        return (items if tag == 0x6c else tuple(items)), pos
+    elif tag == 0x6d:
+        length, pos = _read_varint(data, pos)
+        value = {}
+        for _ in range(length):
+            key, pos = _decode(data, pos)
+            value[key], pos = _decode(data, pos)
+        return value, pos
+    raise ValueError("Unknown tag {}".format(tag))
+
+
+def encode_state(state):
+    """
+    Encode the pickle state of an element
+
+    :param state: The state, made of None, booleans, numbers, strings, lists,
+        tuples and dicts
+    :rtype: bytes
+    :raises TypeError: when the state holds another type
+    """
+    out = bytearray()
+    _encode(out, state)
+    return bytes(out)
+
+
+def decode_state(data):
+    """
+    Decode a state encoded by :func:`encode_state`
+
+    :param bytes data: The encoded state
+    :raises ValueError: when the data isn't a valid state
+    """
+    data = bytearray(data)
+    value, pos = _decode(data, 0)
+    if pos != len(data):
+        raise ValueError("Trailing data")
+    return value
+
+
+class CacheBackend(object):
+    """
+    Interface of the stores of a
+    :py:class:`SharedElementCache<goblin.models.cache.SharedElementCache>`.
+    Keys are strings, values are bytes.
+    """
+
+    def get(self, key):
+        """
+        Read a value
+
+        :returns: The value, or None if it is missing or expired
+        :rtype: bytes
+        """
+        raise NotImplementedError
+
+    def set(self, key, value, expires=None):
+        """
+        Store a value
+
+        :param str key: The key
+        :param bytes value: The value
+        :param float expires: Time after which the value is dropped, None to
+            keep it until it is evicted
+        :returns: The number of other values evicted to store it
+        :rtype: int
+        """
+        raise NotImplementedError
+
+    def delete(self, key):
+        """ Drop a value """
+        raise NotImplementedError
+
+    def keys(self):
+        """ Iterate over the keys of the values stored """
+        raise NotImplementedError
+
+    def clear(self):
+        """ Drop every value """
+        raise NotImplementedError
+
+
+class MmapCacheBackend(CacheBackend):
+    """
+    Store in a memory mapped local file, shared by the processes that open
+    the same file.
+
+    The file is split in ``slots`` slots of ``slot_size`` bytes and each key
+    is stored in the slot its hash points to, replacing the value of another
+    key when they collide. Values that don't fit in a slot aren't stored.
+    Each slot is checksummed, so a slot that is read while another process
+    writes it is seen as missing.
+
+    :param str path: The file, created if it doesn't exist
+    :param int slots: The number of slots
+    :param int slot_size: The size of a slot in bytes
+    :param clock: Callable returning the current time in seconds
+    """
+
+    # checksum, key length, value length, expiry time (0 if none)
+    _header = struct.Struct('>IHId')
+
+    def __init__(self, path, slots=4096, slot_size=1024, clock=time.time):
+        if slot_size <= self._header.size:
+            raise ValueError("slot_size must be larger than {}".format(
+                self._header.size))
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.clock = clock
+        size = slots * slot_size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        """ Unmap the file """
+        self._mmap.close()
+
+    def _slot(self, key):
+        return (zlib.crc32(key.encode('utf-8')) & 0xffffffff) % self.slots
+
+    def _read(self, slot):
+        """ Returns the key, value and expiry time stored in a slot """
+        offset = slot * self.slot_size
+        checksum, key_len, value_len, expires = self._header.unpack_from(
+            self._mmap, offset)
+        if not key_len:
+            return None
+        start = offset + self._header.size
+        end = start + key_len + value_len
+        if end > offset + self.slot_size:
+            return None
+        body = self._mmap[start:end]
+        header = self._header.pack(0, key_len, value_len, expires)
+        if zlib.crc32(header + body) & 0xffffffff != checksum:
+            return None
+        key = body[:key_len].decode('utf-8')
+        if expires and expires <= self.clock():
+            return None
+        return key, body[key_len:], expires or None
+
+    def get(self, key):
+        found = self._read(self._slot(key))
+        if found is None or found[0] != key:
+            return None
+        return found[1]
+
+    def set(self, key, value, expires=None):
+        key_data = key.encode('utf-8')
+        if self._header.size + len(key_data) + len(value) > self.slot_size:
+            return 0
+        slot = self._slot(key)
+        found = self._read(slot)
+        evicted = 1 if found is not None and found[0] != key else 0
+        header = self._header.pack(0, len(key_data), len(value),
+                                   expires or 0)
+        checksum = zlib.crc32(header + key_data + value) & 0xffffffff
+        data = self._header.pack(checksum, len(key_data), len(value),
+                                 expires or 0) + key_data + value
+        offset = slot * self.slot_size
+        self._mmap[offset:offset + len(data)] = data
+        return evicted
+
+    def delete(self, key):
+        slot = self._slot(key)
+        found = self._read(slot)
+        if found is not None and found[0] == key:
+            offset = slot * self.slot_size
+            self._mmap[offset:offset + self._header.size] = \
+                b'\0' * self._header.size
+
+    def keys(self):
+        for slot in range(self.slots):
+            found = self._read(slot)
+            if found is not None:
+                yield found[0]
+
+    def clear(self):
+        empty = b'\0' * self._header.size
+        for slot in range(self.slots):
+            offset = slot * self.slot_size
+            self._mmap[offset:offset + self._header.size] = empty
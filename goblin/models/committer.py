@@ -0,0 +1,168 @@
+"""
+Group commit of concurrent :py:meth:`save<goblin.models.vertex.Vertex.save>`
+calls.
+
+When ``connection.setup(save_batch_window=...)`` is set, the saves made
+within ``save_batch_window`` seconds (0 for the current iteration of the io
+loop) are sent together, at most ``save_batch_size`` at a time, as a single
+script run in a single transaction, so their commits are paid once. Each
+caller gets the element it saved, updated in place with its id.
+
+If the group fails, its saves are retried one by one, so an invalid save
+only fails its own caller.
+"""
+from __future__ import unicode_literals
+import logging
+
+from goblin import connection
+from .loader import _BATCHABLE_KWARGS
+from .session import save_elements
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Group(object):
+
+    def __init__(self, kwargs):
+        self.kwargs = kwargs
+        # id(element) -> [element, params, geo_params, futures]
+        self.entries = {}
+        self.order = []
+
+    def add(self, element, params, geo_params, future):
+        entry = self.entries.get(id(element))
+        if entry is None:
+            entry = self.entries[id(element)] = [element, None, None, []]
+            self.order.append(entry)
+        # a later save of the same element sends its latest values
+        entry[1], entry[2] = params, geo_params
+        entry[3].append(future)
+
+    def __len__(self):
+        return len(self.order)
+
+
+class GroupCommitter(object):
+    """
+    Collects the saves made by concurrent callers and commits them with a
+    single script.
+    """
+
+    def __init__(self):
+        self._groups = {}
+
+    @staticmethod
+    def accepts(kwargs):
+        """
+        Whether a save with the given kwargs can be grouped
+
+        :param dict kwargs: Keyword arguments passed to ``save``
+        :rtype: bool
+        """
+        if connection._save_batch_window is None:
+            return False
+        return all(k in _BATCHABLE_KWARGS for k in kwargs)
+
+    def save(self, element, params, geo_params, **kwargs):
+        """
+        Save an element along with the other saves of the current window
+
+        :param element: The validated vertex or edge
+        :type element: goblin.models.element.Element
+        :param dict params: Its save params
+        :param dict geo_params: Its geo save params
+        :returns: Future element
+        """
+        try:
+            key = tuple(sorted(kwargs.items()))
+            hash(key)
+        except TypeError:  # pragma: no cover
+            key = id(kwargs)
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _Group(kwargs)
+            connection.call_later(
+                connection._save_batch_window,
+                lambda: self._flush(key, group, 'window'), **kwargs)
+        future = connection.get_future(kwargs)
+        group.add(element, params, geo_params, future)
+        if len(group) >= connection._save_batch_size:
+            self._flush(key, group, 'full')
+        return future
+
+    def _flush(self, key, group, reason):
+        if self._groups.get(key) is not group:
+            # already sent because it was full
+            return
+        del self._groups[key]
+        self._report(group, reason)
+        self._dispatch(group.order, group.kwargs)
+
+    def _dispatch(self, entries, kwargs):
+        """ Returns a future set once the callers have their result """
+        future = connection.get_future(kwargs)
+        future_saved = save_elements(
+            [(element, params, geo_params)
+             for element, params, geo_params, _ in entries], **kwargs)
+
+        def on_saved(f):
+            try:
+                f.result()
+            except Exception as e:
+                self._fail(entries, kwargs, e)
+            else:
+                for element, _, _, futures in entries:
+                    for caller in futures:
+                        caller.set_result(element)
+            future.set_result(None)
+
+        future_saved.add_done_callback(on_saved)
+        return future
+
+    def _fail(self, entries, kwargs, exc):
+        if len(entries) == 1:
+            for future in entries[0][3]:
+                future.set_exception(exc)
+            return
+        # don't let a single bad save fail the whole group
+        logger.debug("Group commit failed, retrying saves one by one: %s",
+                     exc)
+        for counter in self._counters('retries'):
+            counter.inc()
+        from goblin.models.vertex import Vertex
+        # one at a time and vertices first, so the new vertices an edge of
+        # the group points to are saved before it
+        entries = ([e for e in entries if isinstance(e[0], Vertex)] +
+                   [e for e in entries if not isinstance(e[0], Vertex)])
+
+        def retry_next(f=None):
+            if entries:
+                future_saved = self._dispatch([entries.pop(0)], kwargs)
+                future_saved.add_done_callback(retry_next)
+
+        retry_next()
+
+    @staticmethod
+    def _counters(name):
+        manager = connection._metric_manager
+        if manager is None:
+            return []
+        return manager.counters('goblin.group_commit.{}'.format(name))
+
+    def _report(self, group, reason):
+        manager = connection._metric_manager
+        if manager is None:
+            return
+        for counter in self._counters('batches'):
+            counter.inc()
+        for counter in self._counters(reason):
+            counter.inc()
+        calls = sum(len(entry[3]) for entry in group.order)
+        for counter in self._counters('calls'):
+            counter.inc(calls)
+        for histogram in manager.histograms('goblin.group_commit.size'):
+            histogram.add(len(group))
+
+
+committer = GroupCommitter()
@@ -0,0 +1,64 @@
+"""
+Keyset (cursor) pagination.
+
+Paginated traversals resume after the last element of the previous page
+rather than skipping an offset. Given a ``sort_key``, the pages are read in
+the order of the vertex-centric index of the edge labels on that property,
+from the key of the last element, so each page only reads its own edges.
+Otherwise they are ordered by element id, which the server can only do by
+sorting every adjacent element for each page.
+"""
+from __future__ import unicode_literals
+import base64
+import binascii
+import json
+
+from goblin.exceptions import GoblinQueryError
+
+
+def encode_cursor(element_id):
+    """
+    Encode the id of the last element of a page as an opaque cursor
+
+    :param element_id: The id of the element
+    :rtype: str
+    """
+    data = json.dumps(element_id).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor returned by :func:`encode_cursor`
+
+    :param str cursor: The cursor
+    :returns: The id of the last element of the previous page
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor.encode('ascii'))
+        return json.loads(data.decode('utf-8'))
+    except (AttributeError, TypeError, ValueError, binascii.Error):
+        raise GoblinQueryError("Invalid cursor: {!r}".format(cursor))
+
+
+class Page(list):
+    """
+    The elements of a page, along with the cursor of the next page
+
+    :param results: The elements found, at most ``page_size + 1``
+    :param int page_size: The number of elements per page
+    :param str next_cursor: The cursor of the next page, by default the id
+        of the last element of this one
+    """
+
+    def __init__(self, results, page_size, next_cursor=None):
+        super(Page, self).__init__(results[:page_size])
+        #: cursor to pass as ``after`` to get the next page, None on the
+        #: last page
+        self.cursor = None
+        if len(results) > page_size:
+            self.cursor = next_cursor or encode_cursor(self[-1]._id)
+
+    @property
+    def has_next(self):
+        return self.cursor is not None
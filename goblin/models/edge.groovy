@@ -1,28 +1,52 @@
 
-def _save_edge(eid, outV, inV, elabel, attrs, geo_attrs, exclusive) {
+def _save_edge(eid, outV, inV, elabel, attrs, geo_attrs, exclusive, read_back, version) {
 	/**
 	 * Saves an edge between two vertices
 	 * :param id: edge id, if null, a new vertex is created
 	 * :param inV: edge inv id
 	 * :param outV: edge outv id
 	 * :param attrs: map of parameters to set on the edge
-	 * :param exclusive: if true, this will check for an existing edge of the same label and modify it, instead of creating another edge
+	 * :param exclusive: if true, this will check for an existing edge of the same label and modify it, instead of creating another edge. The
+	 *     edge is looked up from the vertex with the fewest edges of the label
+	 * :param read_back: if true, returns the saved edge, otherwise only its id
+	 * :param version: null, or [key, version]: the edge is only saved if its
+	 *     stored version is the given one. The check and the write are only
+	 *     atomic if key is defined with ConsistencyModifier.LOCK, otherwise
+	 *     two saves may both pass it
 	 */
 	graph.tx().rollback()
 	try{
+	  def e = null
 	  if (eid == null) {
-			source = g.V(outV).next()
-			target = g.V(inV).next()
+			def source = g.V(outV).next()
+			def target = g.V(inV).next()
 			if (exclusive) {
-				existing = g.V(source).outE(elabel).filter(inV().is(target))
-				if(existing.size()) {
-					e = existing.first()
+				// walk the edges of the label of both vertices at once: the
+				// search ends once the vertex with the fewest is exhausted
+				def out_edges = g.V(source).outE(elabel)
+				def in_edges = g.V(target).inE(elabel)
+				while (e == null && out_edges.hasNext()) {
+					def candidate = out_edges.next()
+					if (candidate.inVertex().id() == target.id()) {
+						e = candidate
+					} else if (!in_edges.hasNext()) {
+						break
+					} else {
+						candidate = in_edges.next()
+						if (candidate.outVertex().id() == source.id()) {
+							e = candidate
+						}
+					}
 				}
-			} else {
+			}
+			if (e == null) {
 				e = source.addEdge(elabel, target)
 			}
 		} else {
 			e = g.E(eid).next()
+			if (version != null && e.property(version[0]).orElse(null) != version[1]) {
+				throw new IllegalStateException("Version conflict: edge " + eid + " is not at version " + version[1])
+			}
 		}
 		for (item in geo_attrs.entrySet()) {
 				if (item.value == null) {
@@ -43,7 +67,7 @@ def _save_edge(eid, outV, inV, elabel, attrs, geo_attrs, exclusive) {
       }
 		}
 		graph.tx().commit()
-		return g.E(e.id()).next()
+		return read_back ? g.E(e.id()).next() : e.id()
 	} catch (err) {
 		graph.tx().rollback()
 		throw(err)
@@ -51,6 +75,162 @@ def _save_edge(eid, outV, inV, elabel, attrs, geo_attrs, exclusive) {
 }
 
 
+def _bulk_save_edges(elabel, elements, exclusive) {
+    /**
+     * Creates edges in a single transaction
+     *
+     * :param elabel: label of the new edges
+     * :param elements: list of [outV, inV, attrs, geo_attrs], one per edge
+     * :param exclusive: if true, an existing edge of the same label between
+     *     the two vertices is updated instead of creating another edge
+     * :returns: the edge ids, in the order of elements
+     */
+    graph.tx().rollback()
+    try {
+        def ids = []
+        for (element in elements) {
+            def source = g.V(element[0]).next()
+            def target = g.V(element[1]).next()
+            def e = null
+            if (exclusive) {
+                // walk the edges of the label of both vertices at once: the
+                // search ends once the vertex with the fewest is exhausted
+                def out_edges = g.V(source).outE(elabel)
+                def in_edges = g.V(target).inE(elabel)
+                while (e == null && out_edges.hasNext()) {
+                    def candidate = out_edges.next()
+                    if (candidate.inVertex().id() == target.id()) {
+                        e = candidate
+                    } else if (!in_edges.hasNext()) {
+                        break
+                    } else {
+                        candidate = in_edges.next()
+                        if (candidate.outVertex().id() == source.id()) {
+                            e = candidate
+                        }
+                    }
+                }
+            }
+            if (e == null) {
+                e = source.addEdge(elabel, target)
+            }
+            for (item in element[3].entrySet()) {
+                if (item.value == null) {
+                    e.property(item.key).remove()
+                } else if (item.value[0] == 'point') {
+                    e.property(item.key, Geoshape.point(*item.value[1]))
+                } else if (item.value[0] == 'circle') {
+                    e.property(item.key, Geoshape.circle(*item.value[1]))
+                } else if (item.value[0] == 'box') {
+                    e.property(item.key, Geoshape.box(*item.value[1]))
+                }
+            }
+            for (item in element[2].entrySet()) {
+                if (item.value == null) {
+                    e.property(item.key).remove()
+                } else {
+                    e.property(item.key, item.value)
+                }
+            }
+            ids.add(e.id())
+        }
+        graph.tx().commit()
+        // wrapped so the ids come back as a single result
+        return [ids]
+    } catch (err) {
+        graph.tx().rollback()
+        throw(err)
+    }
+}
+
+
+def _upsert_edge(out_v, in_v, elabel, lookup, attrs, geo_attrs, updates, geo_updates, version) {
+    /**
+     * Gets, updates or creates the edge between two vertices with the given
+     * property values
+     *
+     * :param out_v: edge outv id
+     * :param in_v: edge inv id
+     * :param elabel: label of the edge
+     * :param lookup: map of the property values identifying the edge, if
+     *     empty any edge of the label between the vertices matches
+     * :param attrs: map of parameters to set on a new edge
+     * :param geo_attrs: map of geo parameters to set on a new edge
+     * :param updates: map of parameters to set on an existing edge, if null
+     *     the edge is left as is
+     * :param geo_updates: map of geo parameters to set on an existing edge
+     * :param version: null, or the key of a version property incremented
+     *     when an existing edge is updated
+     * :returns: the edge and whether it was created
+     */
+    graph.tx().rollback()
+    try {
+        def source = g.V(out_v).next()
+        def target = g.V(in_v).next()
+        // walk the matching edges of both vertices at once: the search ends
+        // once the vertex with the fewest is exhausted, and the has() steps
+        // can be served by a vertex-centric index
+        def out_edges = g.V(source).outE(elabel)
+        def in_edges = g.V(target).inE(elabel)
+        for (item in lookup.entrySet()) {
+            out_edges = out_edges.has(item.key, item.value)
+            in_edges = in_edges.has(item.key, item.value)
+        }
+        def e = null
+        while (e == null && out_edges.hasNext()) {
+            def candidate = out_edges.next()
+            if (candidate.inVertex().id() == target.id()) {
+                e = candidate
+            } else if (!in_edges.hasNext()) {
+                break
+            } else {
+                candidate = in_edges.next()
+                if (candidate.outVertex().id() == source.id()) {
+                    e = candidate
+                }
+            }
+        }
+        def created = e == null
+        if (created) {
+            e = source.addEdge(elabel, target)
+        } else {
+            attrs = updates
+            geo_attrs = geo_updates
+            if (updates != null && version != null) {
+                e.property(version, e.property(version).orElse(0) + 1)
+            }
+        }
+
+        if (attrs != null) {
+            for (item in geo_attrs.entrySet()) {
+                if (item.value == null) {
+                    e.property(item.key).remove()
+                } else if (item.value[0] == 'point') {
+                    e.property(item.key, Geoshape.point(*item.value[1]))
+                } else if (item.value[0] == 'circle') {
+                    e.property(item.key, Geoshape.circle(*item.value[1]))
+                } else if (item.value[0] == 'box') {
+                    e.property(item.key, Geoshape.box(*item.value[1]))
+                }
+            }
+
+            for (item in attrs.entrySet()) {
+                if (item.value == null) {
+                    e.property(item.key).remove()
+                } else {
+                    e.property(item.key, item.value)
+                }
+            }
+        }
+        graph.tx().commit()
+        return [[g.E(e.id()).next(), created]]
+    } catch (err) {
+        graph.tx().rollback()
+        throw(err)
+    }
+}
+
+
 def _delete_edge(eid) {
     /**
      * Deletes an edge
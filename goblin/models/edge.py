@@ -4,16 +4,30 @@ import logging
 from goblin import connection
 from goblin.constants import EDGE_TRAVERSAL
 from goblin._compat import (
-    array_types, integer_types, float_types, string_types, add_metaclass)
+    array_types, integer_types, float_types, string_types, add_metaclass,
+    PY35)
 from goblin.exceptions import (
     ElementDefinitionException, GoblinQueryError, ValidationError)
 from goblin.gremlin import GremlinMethod
-from .element import Element, ElementMetaClass, edge_types
+from . import cache
+from .committer import committer
+from .element import Element, ElementMetaClass, edge_types, save_error
 from .query import V
 
 
+if PY35:
+    from .aio import AsyncEdgeMixin
+else:  # pragma: no cover
+    AsyncEdgeMixin = object
+
+
 logger = logging.getLogger(__name__)
 
+_traversal_scripts = {'inV': 'g.E(id).inV()',
+                      'outV': 'g.E(id).outV()',
+                      'bothV': 'g.E(id).bothV()'}
+_endpoints_script = 'g.V(*vids)'
+
 
 class EdgeMetaClass(ElementMetaClass):
     """Metaclass for edges."""
@@ -42,7 +56,7 @@ class EdgeMetaClass(ElementMetaClass):
 
 
 @add_metaclass(EdgeMetaClass)
-class Edge(Element):
+class Edge(Element, AsyncEdgeMixin):
     """Base class for all edges."""
 
     # __metaclass__ = EdgeMetaClass
@@ -56,10 +70,13 @@ class Edge(Element):
 
     gremlin_path = 'edge.groovy'
 
-    _save_edge = GremlinMethod()
+    _save_edge = GremlinMethod(defaults={'read_back': True,
+                                         'version': None})
     _delete_edge = GremlinMethod()
     _get_edges_between = GremlinMethod(classmethod=True)
     _find_edge_by_value = GremlinMethod(classmethod=True)
+    _bulk_save_edges = GremlinMethod(classmethod=True)
+    _upsert_edge = GremlinMethod(classmethod=True)
 
     FACTORY_CLASS = None
     # edge id
@@ -89,17 +106,25 @@ class Edge(Element):
             getattr(self, '_manual_values', {}))
 
     def __getstate__(self):
-        state = {u'_id': self.id,
+        # the endpoints are either ids or vertices
+        out_v = getattr(self._outV, 'id', self._outV)
+        in_v = getattr(self._inV, 'id', self._inV)
+        properties, geo_properties = self.as_state_params()
+        state = {u'id': self.id,
                  u'_type': u'edge',
-                 u'_outV': str(self.outV().id),
-                 u'_inV': str(self.inV().id),
-                 u'_label': self.get_label(),
-                 u'_properties': self.as_save_params()}
+                 u'outV': out_v,
+                 u'inV': in_v,
+                 u'label': self.get_label(),
+                 u'properties': properties,
+                 u'geo_properties': geo_properties}
         return state
 
     def __setstate__(self, state):
-        data = self.translate_db_fields(state)
-        self.__init__(state['_outV'], state['_inV'], **data)
+        data = dict(state)
+        data['properties'] = self._state_properties(
+            state['properties'], state.get('geo_properties'))
+        data = self.translate_db_fields(data)
+        self.__init__(state['outV'], state['inV'], **data)
         return self
 
     @classmethod
@@ -204,24 +229,52 @@ class Edge(Element):
     def save(self, *args, **kwargs):
         """
         Save this edge to the graph database.
+
+        With ``connection.setup(save_batch_window=...)``, concurrent saves are
+        committed together, see :py:mod:`goblin.models.committer`, and the
+        edge itself is returned.
+
+        An edge of a ``__versioned__`` model is only saved if its stored
+        version is the one loaded, otherwise the save fails with
+        :class:`VersionConflict<goblin.models.element.BaseElement.VersionConflict>`.
+        The check is only atomic if the version key is defined with
+        ``ConsistencyModifier.LOCK``.
+
+        :param read_back: Return the edge read back from the graph, or only
+            read back its id and return this edge, updated in place.
+            Defaults to the ``__read_back__`` of the model
+        :type read_back: bool
         """
         super(Edge, self).save()
-        future = connection.get_future(kwargs)
+        read_back = kwargs.pop('read_back', self.__read_back__)
         attrs, geo_attrs = self.as_save_params()
+        if committer.accepts(kwargs):
+            return committer.save(self, attrs, geo_attrs, **kwargs)
+        future = connection.get_future(kwargs)
+        cache.invalidate(EDGE_TRAVERSAL, self._id)
         future_result = self._save_edge(self._outV,
                                         self._inV,
                                         self.get_label(),
                                         attrs,
                                         geo_attrs,
                                         exclusive=self.__exclusive__,
+                                        read_back=read_back,
+                                        version=self.version_condition(),
                                         **kwargs)
 
         def on_read(f2):
+            # reads sent while saving may have cached the previous values
+            cache.invalidate(EDGE_TRAVERSAL, self._id)
             try:
                 result = f2.result()[0]
             except Exception as e:
-                future.set_exception(e)
+                future.set_exception(save_error(e))
             else:
+                if not read_back:
+                    self._id = result
+                    self._mark_saved(attrs, geo_attrs)
+                    result = self
+                cache.forget_missing(EDGE_TRAVERSAL, result._id)
                 future.set_result(result)
 
         def on_save(f):
@@ -290,6 +343,96 @@ class Edge(Element):
         edge = super(Edge, cls).create(outV, inV, *args, **kwargs)
         return edge
 
+    @classmethod
+    def bulk_create(cls, edges, chunk_size=500, **kwargs):
+        """
+        Create many edges of this type, sending ``chunk_size`` edges per
+        script. Each chunk is saved in a single transaction.
+
+        :param edges: ``(outV, inV, values)`` of each edge, where the vertices
+            are Vertex instances or ids
+        :type edges: iterable of tuple
+        :param chunk_size: Maximum number of edges created per script
+        :type chunk_size: int
+        :rtype: list of the edge ids, in the order of edges
+
+        """
+        params = []
+        for outV, inV, values in edges:
+            edge = cls(outV, inV, **values)
+            super(Edge, edge).save()
+            attrs, geo_attrs = edge.as_save_params()
+            params.append([outV, inV, attrs, geo_attrs])
+        label = cls.get_label()
+
+        def save_chunk(chunk):
+            return cls._bulk_save_edges(label, chunk, cls.__exclusive__,
+                                        **kwargs)
+
+        return cls._save_in_chunks(save_chunk, params, chunk_size, **kwargs)
+
+    @classmethod
+    def get_or_create(cls, outV, inV, lookup=None, defaults=None, **kwargs):
+        """
+        Get the edge of this type from outV to inV with the given property
+        values, or create it with these values and the defaults, with a
+        single script. Without lookup, any edge of this type between the
+        vertices matches, like for ``__exclusive__`` edges.
+
+        :param outV: The vertex the edge is coming out of
+        :type outV: Vertex | id
+        :param inV: The vertex the edge is going into
+        :type inV: Vertex | id
+        :param lookup: The property values identifying the edge
+        :type lookup: dict
+        :param defaults: The other properties of a new edge
+        :type defaults: dict
+        :returns: Future (edge, created) pair
+        """
+        lookup = lookup or {}
+        values = dict(defaults or {})
+        values.update(lookup)
+        return cls._upsert(outV, inV, values, lookup, None, True, **kwargs)
+
+    @classmethod
+    def upsert(cls, outV, inV, key_fields=(), **values):
+        """
+        Update the edge of this type from outV to inV whose ``key_fields``
+        have the given values, or create it, with a single script. Only the
+        given values are set on an existing edge. Without key fields, any
+        edge of this type between the vertices is updated, like for
+        ``__exclusive__`` edges.
+
+        :param outV: The vertex the edge is coming out of
+        :type outV: Vertex | id
+        :param inV: The vertex the edge is going into
+        :type inV: Vertex | id
+        :param key_fields: The names of the properties identifying the edge
+        :type key_fields: str | list
+        :param values: The properties of the edge, including the key fields
+        :returns: Future edge
+        """
+        query_kwargs = connection.pop_execute_query_kwargs(values)
+        if isinstance(key_fields, string_types):
+            key_fields = [key_fields]
+        missing = [name for name in key_fields if name not in values]
+        if missing:
+            raise GoblinQueryError(
+                'No value given for the key fields {}'.format(missing))
+        lookup = dict((name, values[name]) for name in key_fields)
+        return cls._upsert(outV, inV, values, lookup, list(values), False,
+                           **query_kwargs)
+
+    @classmethod
+    def _upsert(cls, outV, inV, values, lookup, update_names, with_created,
+                **kwargs):
+        params = cls._upsert_params((outV, inV), values, lookup,
+                                    update_names)
+        future_result = cls._upsert_edge(outV, inV, cls.get_label(), *params,
+                                         **kwargs)
+        return cls._read_upsert(future_result, EDGE_TRAVERSAL, with_created,
+                                **kwargs)
+
     def delete(self, **kwargs):
         """
         Delete the current edge from the graph.
@@ -303,6 +446,7 @@ class Edge(Element):
         future_result = self._delete_edge()
 
         def on_read(f2):
+            cache.invalidate(EDGE_TRAVERSAL, self._id)
             try:
                 result = f2.result()
             except Exception as e:
@@ -341,7 +485,7 @@ class Edge(Element):
             return data
 
         future_results = connection.execute_query(
-            'g.E(id).%s()' % operation, {'id': self.id},
+            _traversal_scripts[operation], {'id': self.id},
             handler=edge_traversal_handler, **kwargs)
 
         return future_results
@@ -353,97 +497,184 @@ class Edge(Element):
         :rtype: Vertex
 
         """
-        from goblin.models.vertex import Vertex
-        future = connection.get_future(kwargs)
-        if self._inV is None:
-            future_results = self._simple_traversal('inV', **kwargs)
+        return self._endpoint('inV', **kwargs)
 
-            def on_traversal(f):
-                try:
-                    result = f.result()
-                except Exception as e:
-                    future.set_exception(e)
-                else:
-                    self._inV = result[0]
-                    if isinstance(self._inV, string_types + integer_types):
-                        future_results = V(self._inV).get(**kwargs)
-
-                        def on_get(f2):
-                            try:
-                                result = f2.result()
-                            except Exception as e:
-                                future.set_exception(e)
-                            else:
-                                self._inV = result
-
-                        future_results.add_done_callback(on_get)
-                    future.set_result(self._inV)
-                future_results.add_done_callback(on_traversal)
-
-        elif isinstance(self._inV, string_types + integer_types):
-            future_results = V(self._inV).get(**kwargs)
-
-            def on_get(f2):
-                try:
-                    result = f2.result()
-                except Exception as e:
-                    future.set_exception(e)
-                else:
-                    self._inV = result
-                    future.set_result(self._inV)
+    def outV(self, *args, **kwargs):
+        """
+        Return the vertex that this edge comes out of.
 
-            future_results.add_done_callback(on_get)
-        else:
-            future.set_result(self._inV)
-        return future
+        :rtype: Vertex
 
-    def outV(self, *args, **kwargs):
         """
-        Return the vertex that this edge goes into.
+        return self._endpoint('outV', **kwargs)
+
+    def _endpoint(self, operation, **kwargs):
+        """
+        Return the vertex at one end of this edge, only reading it when it
+        isn't known yet.
 
+        :param operation: 'inV' or 'outV'
+        :type operation: str
         :rtype: Vertex
 
         """
-        from goblin.models.vertex import Vertex
+        attribute = '_' + operation
+        endpoint = getattr(self, attribute)
         future = connection.get_future(kwargs)
-        if self._inV is None:
-            future_results = self._simple_traversal('outV', **kwargs)
 
-            def on_traversal(f):
-                try:
-                    result = f.result()
-                except Exception as e:
-                    future.set_exception(e)
+        def on_get(f2):
+            try:
+                result = f2.result()
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                setattr(self, attribute, result)
+                future.set_result(result)
+
+        def on_read(f2):
+            try:
+                result = f2.result()
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                if not result:
+                    future.set_exception(GoblinQueryError("Does not exist"))
                 else:
-                    self._outV = result[0]
-                    if isinstance(self._outV, string_types + integer_types):
-                        future_results = V(self._outV).get(**kwargs)
-
-                        def on_get(f2):
-                            try:
-                                result = f2.result()
-                            except Exception as e:
-                                future.set_exception(e)
-                            else:
-                                self._outV = result
-
-                        future_results.add_done_callback(on_get)
-                    future.set_result(self._outV)
-                future_results.add_done_callback(on_traversal)
-
-        elif isinstance(self._outV, string_types + integer_types):
-            future_results = V(self._outV).get(**kwargs)
-
-            def on_get(f2):
+                    setattr(self, attribute, result[0])
+                    future.set_result(result[0])
+
+        def on_traversal(f):
+            try:
+                stream = f.result()
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future_read = stream.read()
+                future_read.add_done_callback(on_read)
+
+        if endpoint is None:
+            future_results = self._simple_traversal(operation, **kwargs)
+            future_results.add_done_callback(on_traversal)
+        elif isinstance(endpoint, string_types + integer_types):
+            future_results = V(endpoint).get(**kwargs)
+            future_results.add_done_callback(on_get)
+        else:
+            future.set_result(endpoint)
+        return future
+
+
+def resolve_endpoints(edges, vertices=None, **kwargs):
+    """
+    Read the vertices at both ends of the given edges with a single query,
+    and set them on the edges so that their inV and outV don't query the
+    server again.
+
+    :param edges: The edges
+    :type edges: list[Edge]
+    :param vertices: Vertices already loaded, set on the edges without
+        being read again
+    :type vertices: list[goblin.models.Vertex]
+    :rtype: Future list of the given edges
+
+    """
+    edges = list(edges)
+    kwargs = connection.pop_execute_query_kwargs(kwargs)
+    future = connection.get_future(kwargs)
+    known = dict((vertex._id, vertex) for vertex in vertices or [])
+    vids = []
+    seen = set(known)
+    for edge in edges:
+        for vid in (edge._outV, edge._inV):
+            if isinstance(vid, string_types + integer_types) and \
+                    vid not in seen:
+                seen.add(vid)
+                vids.append(vid)
+
+    def endpoint(found, vid):
+        if isinstance(vid, string_types + integer_types):
+            return found.get(vid, vid)
+        return vid
+
+    def set_endpoints(found):
+        found.update(known)
+        for edge in edges:
+            edge._outV = endpoint(found, edge._outV)
+            edge._inV = endpoint(found, edge._inV)
+        future.set_result(edges)
+
+    if not vids:
+        set_endpoints({})
+        return future
+
+    def on_read(f2):
+        try:
+            results = f2.result()
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            set_endpoints(dict((vertex._id, vertex) for vertex in results))
+
+    def on_query(f):
+        try:
+            stream = f.result()
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future_read = connection.read_all(stream, **kwargs)
+            future_read.add_done_callback(on_read)
+
+    def result_handler(results):
+        return [Element.deserialize(r) for r in results or []]
+
+    future_results = connection.execute_query(
+        _endpoints_script, bindings={'vids': vids}, handler=result_handler,
+        **kwargs)
+    future_results.add_done_callback(on_query)
+    return future
+
+
+class EndpointsStream(object):
+    """
+    Response stream of edges resolving the endpoints of the edges of each
+    message it reads, with one query per message
+
+    :param stream: The stream of the edges
+    :param vertices: Vertices already loaded, see :func:`resolve_endpoints`
+    :type vertices: list[goblin.models.Vertex]
+    """
+
+    def __init__(self, stream, vertices=None, **kwargs):
+        self._stream = stream
+        self._vertices = vertices
+        self._kwargs = kwargs
+
+    def add_handler(self, handler):
+        self._stream.add_handler(handler)
+
+    def read(self):
+        future = connection.get_future(self._kwargs)
+
+        def on_read(f):
+            try:
+                results = f.result()
+            except Exception as e:
+                future.set_exception(e)
+                return
+            if not results:
+                future.set_result(results)
+                return
+
+            def on_resolve(f2):
                 try:
-                    result = f2.result()
+                    f2.result()
                 except Exception as e:
                     future.set_exception(e)
                 else:
-                    self._outV = result
-                    future.set_result(self._outV)
+                    future.set_result(results)
 
-            future_results.add_done_callback(on_get)
-        else:
-            future.set_result(self._outV)
+            future_resolve = resolve_endpoints(results, self._vertices,
+                                               **self._kwargs)
+            future_resolve.add_done_callback(on_resolve)
+
+        self._stream.read().add_done_callback(on_read)
         return future
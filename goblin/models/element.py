@@ -6,6 +6,7 @@ import inflection
 from collections import OrderedDict
 
 from goblin import connection
+from goblin.constants import VERTEX_TRAVERSAL, EDGE_TRAVERSAL
 from goblin._compat import string_types, print_, add_metaclass
 from goblin.tools import import_string
 from goblin import properties
@@ -15,6 +16,8 @@ from goblin.exceptions import (
 from goblin.gremlin import BaseGremlinMethod
 from goblin.properties.base import BaseValueManager
 from goblin.properties.properties import Point, Circle, Box
+from . import identity
+from .cache import CachedStream, MissingIdsStream
 
 
 logger = logging.getLogger(__name__)
@@ -23,6 +26,33 @@ logger = logging.getLogger(__name__)
 vertex_types = {}
 edge_types = {}
 
+# scripts are fixed texts so the server compiles each of them only once
+_all_scripts = {VERTEX_TRAVERSAL: 'g.V(*eids).hasLabel(x)',
+                EDGE_TRAVERSAL: 'g.E(*eids).hasLabel(x)'}
+
+# start of the error thrown by the save scripts when the stored version of a
+# versioned element is not the loaded one
+VERSION_CONFLICT = 'Version conflict'
+
+# start of the error thrown by a script that gave up retrying a transaction
+# whose commit kept failing on a lock
+LOCK_CONFLICT = 'Lock conflict'
+
+
+def save_error(exc):
+    """
+    The exception to raise for a failed save: a
+    :class:`VersionConflict<BaseElement.VersionConflict>` when the save
+    script found a stale version, a
+    :class:`LockConflict<BaseElement.LockConflict>` when it couldn't commit
+    for concurrent writes, ``exc`` otherwise
+    """
+    if VERSION_CONFLICT in str(exc):
+        return BaseElement.VersionConflict(str(exc))
+    if LOCK_CONFLICT in str(exc):
+        return BaseElement.LockConflict(str(exc))
+    return exc
+
 
 class BaseElement(object):
     """
@@ -32,6 +62,21 @@ class BaseElement(object):
     # __enum_id_only__ = True
     FACTORY_CLASS = None
 
+    # if set to False, save only reads back the id of the element and
+    # updates the instance in place, instead of returning the element read
+    # back from the graph
+    __read_back__ = True
+
+    # if set to True, saving an element that exists only sends the
+    # properties whose value changed since it was loaded or saved. None
+    # follows connection.setup(dirty_tracking=...)
+    __dirty_tracking__ = None
+
+    # if set to True, the element keeps a ``version`` property, incremented
+    # by each save, and a save fails with VersionConflict when the stored
+    # version isn't the one that was loaded
+    __versioned__ = False
+
     class DoesNotExist(GoblinException):
         """
         Object not found in database
@@ -50,6 +95,18 @@ class BaseElement(object):
         """
         pass
 
+    class VersionConflict(GoblinException):
+        """
+        Versioned element changed in the database since it was loaded
+        """
+        pass
+
+    class LockConflict(GoblinException):
+        """
+        Locked property kept changing while the script tried to write it
+        """
+        pass
+
     def __init__(self, **values):
         """
         Initialize the element with the given properties.
@@ -83,6 +140,34 @@ class BaseElement(object):
                 self._manual_values[kwarg] = BaseValueManager(
                     None, values.get(kwarg))
 
+    def _refresh_values(self, values):
+        """
+        Refresh the properties whose stored value differs from the given
+        values, keeping the local changes that weren't saved yet.
+
+        :param values: The translated values loaded from the database
+        :type values: dict
+
+        """
+        for name, prop in self._properties.items():
+            value = values.get(name, None)
+            if value is not None:
+                value = prop.to_python(value)
+            value_mngr = self._values[name]
+            if value_mngr.previous_value == value:
+                continue
+            if value_mngr.value == value_mngr.previous_value:
+                value_mngr.value = value
+            value_mngr.previous_value = value
+
+        for kwarg in set(values.keys()).difference(
+                set(self._properties.keys())):
+            if kwarg not in ('id', 'inV', 'outV', 'label'):
+                value_mngr = self._manual_values.get(kwarg)
+                if value_mngr is None or value_mngr.value != values[kwarg]:
+                    self._manual_values[kwarg] = BaseValueManager(
+                        None, values[kwarg])
+
     @property
     def label(self):
         return self._label
@@ -168,23 +253,42 @@ class BaseElement(object):
         values['id'] = self.id
         return values
 
+    @classmethod
+    def tracks_dirty_values(cls):
+        """
+        Whether saves only send the properties that changed, see
+        ``__dirty_tracking__``
+
+        :rtype: bool
+        """
+        if cls.__dirty_tracking__ is None:
+            return connection._dirty_tracking
+        return cls.__dirty_tracking__
+
     def as_save_params(self):
         """
         Returns a map of property names to cleaned values containing only the
         properties which should be persisted on save.
 
+        With dirty tracking, the properties of an element that exists are
+        only checked against their save strategy if their value changed
+        since the element was loaded or saved.
+
         :rtype: dict
 
         """
         values = {}
         geo_values = {}
         was_saved = self._id is not None
+        dirty_only = was_saved and self.tracks_dirty_values()
         for name, prop in self._properties.items():
             # Determine the save strategy for this column
             prop_strategy = prop.get_save_strategy()
 
             # Enforce the save strategy
             vm = self._values[name]
+            if dirty_only and vm.value == vm.previous_value:
+                continue
             should_save = prop_strategy.condition(
                 previous_value=vm.previous_value, value=vm.value,
                 has_changed=vm.changed, first_save=was_saved,
@@ -192,24 +296,15 @@ class BaseElement(object):
 
             if should_save:
                 # print_("Saving %s to database for name %s" % (prop.db_field_name or name, name))
-                if isinstance(prop, Point):
-                    geo_values[prop.db_field_name or name] = ('point',
-                        prop.to_database(vm.value))
-                elif isinstance(prop, Circle):
-                    geo_values[prop.db_field_name or name] = ('circle',
-                        prop.to_database(vm.value))
-                elif isinstance(prop, Box):
-                    geo_values[prop.db_field_name or name] = ('box',
-                        prop.to_database(vm.value))
-                else:
-                    values[prop.db_field_name or name] = prop.to_database(
-                        vm.value)
+                self._add_param(name, prop, vm.value, values, geo_values)
 
         # manual values
         for name, prop in self._manual_values.items():
             if prop is None:
                 # Remove this property entirely
                 values[name] = None
+            elif dirty_only and prop.value == prop.previous_value:
+                continue
             else:
                 # Determine the save strategy
                 prop_strategy = prop.strategy
@@ -222,6 +317,108 @@ class BaseElement(object):
 
         return values, geo_values
 
+    def _mark_saved(self, params, geo_params):
+        """
+        Record the values sent by a save as the saved values
+
+        :param dict params: The params returned by :meth:`as_save_params`
+        :param dict geo_params: The geo params returned by
+            :meth:`as_save_params`
+        """
+        for name, prop in self._properties.items():
+            key = prop.db_field_name or name
+            if key in params or key in geo_params:
+                vm = self._values[name]
+                vm.previous_value = vm.value
+        for name, vm in list(self._manual_values.items()):
+            if vm is None:
+                # the property was removed
+                del self._manual_values[name]
+            elif name in params:
+                vm.previous_value = vm.value
+
+    def _bump_version(self):
+        """ Set the version a save of a versioned element stores """
+        if self.__versioned__:
+            vm = self._values['version']
+            vm.value = (vm.previous_value or 0) + 1
+
+    def version_condition(self):
+        """
+        The ``[key, version]`` the save scripts check the stored version of
+        this element against, None if the element is new or not versioned
+
+        :rtype: list | None
+        """
+        if not self.__versioned__ or self._id is None:
+            return None
+        return [self._properties['version'].db_field_name,
+                self._values['version'].previous_value]
+
+    @staticmethod
+    def _add_param(name, prop, value, values, geo_values):
+        if isinstance(prop, Point):
+            geo_values[prop.db_field_name or name] = ('point',
+                prop.to_database(value))
+        elif isinstance(prop, Circle):
+            geo_values[prop.db_field_name or name] = ('circle',
+                prop.to_database(value))
+        elif isinstance(prop, Box):
+            geo_values[prop.db_field_name or name] = ('box',
+                prop.to_database(value))
+        else:
+            values[prop.db_field_name or name] = prop.to_database(value)
+
+    def as_state_params(self):
+        """
+        Returns the values of every property, whatever their save strategy,
+        in the format of :meth:`as_save_params`. This is the pickled state of
+        the element.
+
+        :rtype: tuple of dict
+
+        """
+        values = {}
+        geo_values = {}
+        for name, prop in self._properties.items():
+            value = self._values[name].value
+            if value is not None:
+                self._add_param(name, prop, value, values, geo_values)
+        for name, value_mngr in self._manual_values.items():
+            if value_mngr is not None and value_mngr.value is not None:
+                values[name] = value_mngr.value
+        return values, geo_values
+
+    @classmethod
+    def _state_properties(cls, properties, geo_properties):
+        """
+        Returns the GraphSON properties of the params returned by
+        :meth:`as_state_params`, to be passed to :meth:`translate_db_fields`
+
+        :rtype: dict
+
+        """
+        properties = dict(properties)
+        for key, (kind, coords) in (geo_properties or {}).items():
+            if coords is None:
+                continue
+            if kind == 'point':
+                lat, lng = coords
+                properties[key] = {'type': 'Point', 'coordinates': [lng, lat]}
+            elif kind == 'circle':
+                lat, lng, radius = coords
+                properties[key] = {'type': 'Circle',
+                                   'coordinates': [lng, lat],
+                                   'radius': radius}
+            elif kind == 'box':
+                south, west, north, east = coords
+                properties[key] = {
+                    'type': 'Polygon',
+                    'coordinates': [[[west, south], [east, south],
+                                     [east, north], [west, north],
+                                     [west, south]]]}
+        return properties
+
     @classmethod
     def translate_db_fields(cls, data):
         """
@@ -254,24 +451,26 @@ class BaseElement(object):
         with the given vid was not found. Raises a MultipleObjectsReturned
         exception if the vid corresponds to more than one vertex in the graph.
 
+        Concurrent calls are batched into a single query, see
+        :py:mod:`goblin.models.loader`.
+
         :param id: The ID of the vertex
         :type id: str
         :rtype: goblin.models.Vertex
 
         """
+        from goblin.models.loader import loader
         if id is None:
             raise cls.DoesNotExist
 
-        future_results = cls.all([id], **kwargs)
         future = connection.get_future(kwargs)
 
-        def on_read(f2):
+        def on_load(f2):
             try:
                 result = f2.result()
             except Exception as e:
                 future.set_exception(e)
             else:
-                result = result[0]
                 if not isinstance(result, cls):
                     e = cls.WrongElementType(
                         '%s is not an instance or subclass of %s' % (
@@ -287,10 +486,16 @@ class BaseElement(object):
             except Exception as e:
                 future.set_exception(e)
             else:
+                stream.add_handler(lambda results: results[0])
                 future_read = stream.read()
-                future_read.add_done_callback(on_read)
+                future_read.add_done_callback(on_load)
 
-        future_results.add_done_callback(on_get)
+        if loader.accepts(kwargs):
+            future_result = loader.load(cls, id, **kwargs)
+            future_result.add_done_callback(on_load)
+        else:
+            future_results = cls.all([id], **kwargs)
+            future_results.add_done_callback(on_get)
 
         return future
 
@@ -302,10 +507,18 @@ class BaseElement(object):
         return a dictionary containing ids as keys and vertices found as
         values.
 
+        The elements found in the :py:mod:`cache<goblin.models.cache>`
+        configured by :py:func:`setup<goblin.connection.setup>`, if any,
+        aren't requested again, nor are the ids its missing ids cache
+        recently found missing.
+
         :param ids: A list of titan ids
         :type ids: list
         :param as_dict: Toggle whether to return a dictionary or list
         :type as_dict: boolean
+        :param allow_missing: Return the elements found instead of raising
+            when some of the ids don't exist
+        :type allow_missing: boolean
         :rtype: dict | list
 
         """
@@ -314,15 +527,46 @@ class BaseElement(object):
             ids = []
 
         deserialize = kwargs.pop('deserialize', True)
+        allow_missing = kwargs.pop('allow_missing', False)
         handlers = []
         future = connection.get_future(kwargs)
 
-        if ids:
+        # only the ids that aren't cached are sent to the server
+        element_cache = connection._element_cache
+        if not (ids and deserialize):
+            element_cache = None
+        missing_cache = connection._missing_cache if ids else None
+        label = cls.get_label()
+        cached = []
+        query_ids = ids
+        if missing_cache is not None:
+            query_ids = [element_id for element_id in ids
+                         if not missing_cache.is_missing(source, element_id,
+                                                         label)]
+            if len(query_ids) != len(ids) and not allow_missing:
+                if not query_ids:
+                    future.set_exception(cls.DoesNotExist(
+                        'No {} with ids {}'.format(cls.__name__, ids)))
+                else:
+                    future.set_exception(GoblinQueryError(
+                        "the number of results don't match the number of " +
+                        "ids requested"))
+                return future
+        if element_cache is not None:
+            lookup_ids, query_ids = query_ids, []
+            for element_id in lookup_ids:
+                element = element_cache.get(source, element_id, label)
+                if element is None:
+                    query_ids.append(element_id)
+                else:
+                    cached.append(element)
+
+        if query_ids and not allow_missing:
 
             def id_handler(results):
                 if not results:
                     raise cls.DoesNotExist
-                if len(results) != len(ids):
+                if len(results) != len(query_ids):
                     raise GoblinQueryError(
                         "the number of results don't match the number of " +
                         "ids requested")
@@ -330,30 +574,50 @@ class BaseElement(object):
 
             handlers.append(id_handler)
 
+        def dict_handler(results):
+            if as_dict:  # pragma: no cover
+                results = {v._id: v for v in results}
+            return results
+
         def result_handler(results):
             if results:
                 if deserialize:
                     results = [Element.deserialize(r) for r in results]
-                if as_dict:  # pragma: no cover
-                    results = {v._id: v for v in results}
+                if element_cache is not None:
+                    ttl = getattr(cls, '__cache_ttl__', None)
+                    for element in results:
+                        element_cache.put(source, element, ttl)
+                results = dict_handler(results)
             else:
                 results = []
             return results
 
         handlers.append(result_handler)
 
+        if ids and not query_ids:
+            # every id is cached, or known to be missing
+            future.set_result(CachedStream(cached, [dict_handler], **kwargs))
+            return future
+
         def on_all(f):
             try:
                 stream = f.result()
             except Exception as e:
                 future.set_exception(e)
             else:
+                if missing_cache is not None:
+                    stream = MissingIdsStream(stream, missing_cache, source,
+                                              label, query_ids,
+                                              cls.DoesNotExist)
                 [stream.add_handler(h) for h in handlers]
+                if cached:
+                    stream = CachedStream(cached, [dict_handler], stream,
+                                          **kwargs)
                 future.set_result(stream)
 
         future_results = connection.execute_query(
-            'g.%s(*eids).hasLabel(x)' % source,
-            bindings={'eids': ids, "x": cls.get_label()}, **kwargs)
+            _all_scripts[source],
+            bindings={'eids': query_ids, "x": label}, **kwargs)
 
         future_results.add_done_callback(on_all)
 
@@ -364,8 +628,148 @@ class BaseElement(object):
         """Create a new element with the given information."""
         # pop the optional execute query arguments from kwargs
         query_kwargs = connection.pop_execute_query_kwargs(kwargs)
+        if 'read_back' in kwargs:
+            query_kwargs['read_back'] = kwargs.pop('read_back')
         return cls(*args, **kwargs).save(**query_kwargs)
 
+    @classmethod
+    def _save_in_chunks(cls, save_chunk, params, chunk_size, **kwargs):
+        """
+        Send the save params of many elements ``chunk_size`` elements at a
+        time, waiting for each chunk to be committed before the next one is
+        sent.
+
+        :param save_chunk: Callable sending one chunk of params, returns a
+            future stream whose single result is the list of element ids
+        :type save_chunk: callable
+        :param params: The save params of each element
+        :type params: list
+        :param chunk_size: Maximum number of elements saved per script
+        :type chunk_size: int
+        :rtype: list of ids in the order of params
+
+        """
+        if chunk_size < 1:
+            raise GoblinException('chunk_size must be a positive integer')
+        chunks = [params[i:i + chunk_size]
+                  for i in range(0, len(params), chunk_size)]
+        future = connection.get_future(kwargs)
+        ids = []
+
+        def on_read(f2):
+            try:
+                result = f2.result()
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                ids.extend(result[0])
+                save_next()
+
+        def on_save(f):
+            try:
+                stream = f.result()
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future_read = stream.read()
+                future_read.add_done_callback(on_read)
+
+        def save_next():
+            if not chunks:
+                future.set_result(ids)
+            else:
+                future_result = save_chunk(chunks.pop(0))
+                future_result.add_done_callback(on_save)
+
+        save_next()
+        return future
+
+    @classmethod
+    def _upsert_params(cls, args, values, lookup, update_names):
+        """
+        Validate the element an upsert creates when none matches, and return
+        the params of the upsert script.
+
+        :param args: The positional arguments of the element, its vertices
+            for an edge
+        :type args: tuple
+        :param values: The properties of the element to create
+        :type values: dict
+        :param lookup: The property values identifying the element, also
+            in values
+        :type lookup: dict
+        :param update_names: The properties set on a matching element, or
+            None to leave it as is
+        :type update_names: iterable | None
+        :returns: The lookup params, the params and geo params to create the
+            element with, the params and geo params to update a matching
+            element with, and the key of the version property
+        :rtype: tuple
+        """
+        if cls.__abstract__:
+            raise GoblinException('cant save abstract elements')
+        instance = cls(*args, **values)
+        instance.pre_update(**values)
+        BaseElement.save(instance)
+        lookup_params = {}
+        for name in lookup:
+            prop = cls._properties[name]
+            value = getattr(instance, name)
+            if isinstance(prop, (Point, Circle, Box)) or value is None:
+                raise GoblinQueryError(
+                    "Can't look up elements by '{}'".format(name))
+            cls._add_param(name, prop, value, lookup_params, {})
+        params, geo_params = instance.as_save_params()
+        updates = geo_updates = None
+        if update_names is not None:
+            updates, geo_updates = {}, {}
+            for name in update_names:
+                cls._add_param(name, cls._properties[name],
+                               getattr(instance, name), updates, geo_updates)
+        version = None
+        if cls.__versioned__:
+            version = cls._properties['version'].db_field_name
+        return (lookup_params, params, geo_params, updates, geo_updates,
+                version)
+
+    @staticmethod
+    def _read_upsert(future_result, source, with_created, **kwargs):
+        """
+        Read the ``[element, created]`` pair returned by an upsert script
+
+        :param future_result: Future stream of the upsert script
+        :param source: VERTEX_TRAVERSAL or EDGE_TRAVERSAL
+        :param with_created: Return the pair, or only the element
+        :type with_created: bool
+        """
+        from . import cache
+        future = connection.get_future(kwargs)
+
+        def on_read(f2):
+            try:
+                element, created = f2.result()[0]
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                if created:
+                    cache.forget_missing(source, element._id)
+                else:
+                    cache.invalidate(source, element._id)
+                future.set_result((element, created) if with_created
+                                  else element)
+
+        def on_upsert(f):
+            try:
+                stream = f.result()
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future_read = stream.read()
+                future_read.add_done_callback(on_read)
+
+        future_result.add_done_callback(on_upsert)
+        return future
+
     def pre_save(self):
         """Pre-save hook which is run before saving an element"""
         self.validate()
@@ -377,6 +781,7 @@ class BaseElement(object):
         if self.__abstract__:
             raise GoblinException('cant save abstract elements')
         self.pre_save()
+        self._bump_version()
         return self
 
     def pre_update(self, **values):
@@ -400,7 +805,7 @@ class BaseElement(object):
                 if k in self._properties:
                     raise ModelException("Cannot manually add property that "
                                          "already exists")
-                self._manual_values[k] = BaseValueManager(None, v)
+                self[k] = v
 
         self.pre_update(**values)
 
@@ -489,13 +894,16 @@ class BaseElement(object):
             setattr(self, key, value)
         else:
             # manual entry
-            if key in self._manual_values:
+            value_mngr = self._manual_values.get(key)
+            if value_mngr is not None:
                 # manual entry already exists, update
-                self._manual_values[key].setval(value)
+                value_mngr.setval(value)
             else:
-                # manual entry doesn't exist, create
+                # manual entry doesn't exist, create it as not saved yet
                 from goblin.properties.base import BaseValueManager
-                self._manual_values[key] = BaseValueManager(None, value)
+                value_mngr = BaseValueManager(None, value)
+                value_mngr.previous_value = None
+                self._manual_values[key] = value_mngr
 
     def __delitem__(self, key):
         prop = self._properties.get(key, None)
@@ -600,6 +1008,12 @@ class ElementMetaClass(type):
             else:  # pragma: no cover
                 body[prop_name] = property(_get, _set)
 
+        # versioned elements keep the version of their saved values
+        versioned = body.get('__versioned__', any(
+            getattr(base, '__versioned__', False) for base in bases))
+        if versioned and 'version' not in body and 'version' not in prop_dict:
+            body['version'] = properties.Integer()
+
         property_definitions = [(k, v) for k, v in body.items() if
                                 isinstance(v, properties.GraphProperty)]
         property_definitions = sorted(property_definitions,  # cmp=lambda x, y: cmp(x[1].position, y[1].position),
@@ -645,8 +1059,9 @@ class ElementMetaClass(type):
                 body[k] = property(method)
         body['_relationships'] = relationship_dict
 
-        # auto link gremlin methods
-        gremlin_methods = {}
+        # auto link gremlin methods, the ones already linked when the class
+        # is recreated by add_metaclass are kept
+        gremlin_methods = dict(body.get('_gremlin_methods', {}))
 
         # get inherited gremlin methods
         for base in bases:
@@ -695,7 +1110,12 @@ class Element(BaseElement):
 
     @classmethod
     def deserialize(cls, data):
-        """ Deserializes rexpro response into vertex or edge objects """
+        """
+        Deserializes rexpro response into vertex or edge objects, reusing
+        the live elements of the current
+        :py:class:`IdentityMap<goblin.models.identity.IdentityMap>`
+        """
+        identity_map = identity.current()
         dtype = data.get('type')
         data_id = data.get('id')
         properties = data.get('properties')
@@ -716,6 +1136,9 @@ class Element(BaseElement):
                     'Vertex "%s" not defined' % label)
 
             translated_data = vertex_types[label].translate_db_fields(data)
+            if identity_map is not None:
+                return identity_map.load(dtype, vertex_types[label],
+                                         translated_data)
             v = vertex_types[label](**translated_data)
             return v
 
@@ -725,6 +1148,10 @@ class Element(BaseElement):
                     'Edge "%s" not defined' % label)
 
             translated_data = edge_types[label].translate_db_fields(data)
+            if identity_map is not None:
+                return identity_map.load(dtype, edge_types[label],
+                                         translated_data, data['outV'],
+                                         data['inV'])
             return edge_types[label](data['outV'], data['inV'],
                                      **translated_data)
 
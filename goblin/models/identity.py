@@ -0,0 +1,177 @@
+"""
+Identity map of the deserialized elements.
+
+Inside an :class:`IdentityMap`, the results that have the id of a live
+element are deserialized into that element instead of a new instance::
+
+    with IdentityMap():
+        v1 = yield MyVertex.get(vid)
+        stream = yield other.outV()
+        v2 = (yield stream.read())[0]
+        assert v1 is v2
+
+The map only holds weak references: an element leaves the map as soon as
+nothing else refers to it.
+
+The map is current for the thread that entered it until it is left. All the
+coroutines of the IOLoop run on that thread, so a ``with`` block that spans
+a ``yield`` lends the map to the other requests handled meanwhile. To keep a
+map per request, pass it to each query with the ``identity_map`` keyword
+instead, it is then only current while the results of that query are
+deserialized::
+
+    identity_map = IdentityMap()
+    v1 = yield MyVertex.get(vid, identity_map=identity_map)
+    stream = yield other.outV(identity_map=identity_map)
+    v2 = (yield stream.read())[0]
+    assert v1 is v2
+"""
+from __future__ import unicode_literals
+import threading
+import weakref
+
+
+_local = threading.local()
+
+
+def current():
+    """
+    The innermost identity map entered by this thread
+
+    :rtype: IdentityMap | None
+    """
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else None
+
+
+def wrap(identity_map, handler):
+    """
+    Wrap a handler of query results so the identity map is current while it
+    runs. The handler doesn't yield, so the map isn't lent to other requests.
+
+    :param identity_map: The map of the query, if any
+    :type identity_map: IdentityMap | None
+    :param handler: The handler of the results, if any
+    :type handler: func | None
+    :rtype: func | None
+    """
+    if identity_map is None or handler is None:
+        return handler
+
+    def handle(results):
+        with identity_map:
+            return handler(results)
+
+    return handle
+
+
+def _element_type(element):
+    from goblin.models.vertex import Vertex
+    return 'vertex' if isinstance(element, Vertex) else 'edge'
+
+
+def _key(element_type, element_id):
+    if element_id is None:
+        return None
+    if isinstance(element_id, dict):
+        # titan relation ids
+        element_id = tuple(sorted(element_id.items()))
+    try:
+        hash(element_id)
+    except TypeError:
+        return None
+    return element_type, element_id
+
+
+class IdentityMap(object):
+    """
+    Maps the ids of the elements deserialized in its scope to a single live
+    instance per id
+    """
+
+    def __init__(self):
+        self._elements = weakref.WeakValueDictionary()
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _local.stack.remove(self)
+
+    def __len__(self):
+        return len(self._elements)
+
+    def __contains__(self, element):
+        key = _key(_element_type(element), element._id)
+        return key is not None and self._elements.get(key) is element
+
+    def get(self, element_type, element_id):
+        """
+        Find the live element with the given id
+
+        :param str element_type: 'vertex' or 'edge'
+        :param element_id: The id of the element
+        :rtype: goblin.models.element.Element | None
+        """
+        key = _key(element_type, element_id)
+        return self._elements.get(key) if key is not None else None
+
+    def add(self, element):
+        """
+        Map the id of the element to it
+
+        :param element: The vertex or edge
+        :type element: goblin.models.element.Element
+        """
+        key = _key(_element_type(element), element._id)
+        if key is not None:
+            self._elements[key] = element
+
+    def clear(self):
+        """ Forget every element """
+        self._elements.clear()
+
+    def load(self, element_type, element_class, values, *args):
+        """
+        Return the live element with the id found in values, refreshed with
+        the values, or a new element when there is none
+
+        :param str element_type: 'vertex' or 'edge'
+        :param element_class: The class of the element
+        :param values: The translated values of the element
+        :type values: dict
+        :param args: Positional arguments of a new element
+        :rtype: goblin.models.element.Element
+        """
+        element = self.get(element_type, values.get('id'))
+        if element is None or type(element) is not element_class:
+            element = element_class(*args, **values)
+            self.add(element)
+        else:
+            element._refresh_values(values)
+        return element
+
+
+class IdentityMapStream(object):
+    """
+    Response stream running the handlers added to it with its identity map
+    current
+
+    :param stream: The stream of the query
+    :param identity_map: The identity map of the query
+    :type identity_map: IdentityMap
+    """
+
+    def __init__(self, stream, identity_map):
+        self._stream = stream
+        self._identity_map = identity_map
+
+    def add_handler(self, handler):
+        self._stream.add_handler(wrap(self._identity_map, handler))
+
+    def read(self):
+        return self._stream.read()
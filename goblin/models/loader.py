@@ -0,0 +1,167 @@
+"""
+Coalesces concurrent :py:meth:`get<goblin.models.element.BaseElement.get>`
+calls into a single :py:meth:`all<goblin.models.element.BaseElement.all>`
+query, the way DataLoader does for GraphQL resolvers.
+
+Calls made within ``connection.setup(get_batch_window=...)`` seconds (by
+default, during the current iteration of the io loop) for the same element
+class are sent together as one ``g.V(*eids)``/``g.E(*eids)`` query of at most
+``get_batch_size`` ids.
+"""
+from __future__ import unicode_literals
+import logging
+from collections import OrderedDict
+
+from goblin import connection
+from goblin._compat import iteritems
+
+
+logger = logging.getLogger(__name__)
+
+# query kwargs that can be shared by every call in a batch
+_BATCHABLE_KWARGS = ('pool', 'future_class', 'graph_name', 'traversal_source')
+
+
+def _id_key(element_id):
+    """ Key matching the ids sent by callers with the ids of the results """
+    if isinstance(element_id, dict):
+        return str(sorted(iteritems(element_id)))
+    return str(element_id)
+
+
+class _Batch(object):
+
+    def __init__(self, cls, kwargs):
+        self.cls = cls
+        self.kwargs = kwargs
+        self.futures = OrderedDict()
+
+    def add(self, element_id, future):
+        key = _id_key(element_id)
+        if key not in self.futures:
+            self.futures[key] = (element_id, [])
+        self.futures[key][1].append(future)
+
+    def __len__(self):
+        return len(self.futures)
+
+
+class ElementLoader(object):
+    """
+    Collects the ids requested by concurrent calls and fetches them with a
+    single query per element class.
+    """
+
+    def __init__(self):
+        self._batches = {}
+
+    @staticmethod
+    def accepts(kwargs):
+        """
+        Whether a call with the given kwargs can be batched
+
+        :param dict kwargs: Keyword arguments passed to ``get``
+        :rtype: bool
+        """
+        if connection._get_batch_size <= 1:
+            return False
+        return all(k in _BATCHABLE_KWARGS for k in kwargs)
+
+    def load(self, cls, element_id, **kwargs):
+        """
+        Load an element by id along with the other ids requested in the
+        current batch window.
+
+        :param cls: The element class to load
+        :param element_id: The id of the element
+        :returns: Future element, or DoesNotExist if it was not found
+        """
+        try:
+            key = (cls, tuple(sorted(iteritems(kwargs))))
+            hash(key)
+        except TypeError:  # pragma: no cover
+            key = (cls, id(kwargs))
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _Batch(cls, kwargs)
+            connection.call_later(
+                connection._get_batch_window,
+                lambda: self._flush(key, batch, 'window'), **kwargs)
+        future = connection.get_future(kwargs)
+        batch.add(element_id, future)
+        if len(batch) >= connection._get_batch_size:
+            self._flush(key, batch, 'full')
+        return future
+
+    def _flush(self, key, batch, reason):
+        if self._batches.get(key) is not batch:
+            # already sent because it was full
+            return
+        del self._batches[key]
+        self._report(batch, reason)
+        self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        ids = [element_id for element_id, _ in batch.futures.values()]
+        future_results = batch.cls.all(ids, allow_missing=True,
+                                       **batch.kwargs)
+
+        def on_read(f2):
+            try:
+                results = f2.result()
+            except Exception as e:
+                self._fail(batch, e)
+            else:
+                found = dict((_id_key(r._id), r) for r in results)
+                for key, (element_id, futures) in batch.futures.items():
+                    result = found.get(key)
+                    for future in futures:
+                        if result is None:
+                            future.set_exception(batch.cls.DoesNotExist(
+                                'No {} with id {}'.format(
+                                    batch.cls.__name__, element_id)))
+                        else:
+                            future.set_result(result)
+
+        def on_all(f):
+            try:
+                stream = f.result()
+            except Exception as e:
+                self._fail(batch, e)
+            else:
+                future_read = connection.read_all(stream, **batch.kwargs)
+                future_read.add_done_callback(on_read)
+
+        future_results.add_done_callback(on_all)
+
+    def _fail(self, batch, exc):
+        if len(batch) == 1:
+            for element_id, futures in batch.futures.values():
+                for future in futures:
+                    future.set_exception(exc)
+            return
+        # don't let a single bad id fail the whole batch
+        logger.debug("Batched get failed, retrying ids one by one: %s", exc)
+        for key, (element_id, futures) in batch.futures.items():
+            single = _Batch(batch.cls, batch.kwargs)
+            single.futures[key] = (element_id, futures)
+            self._dispatch(single)
+
+    @staticmethod
+    def _report(batch, reason):
+        manager = connection._metric_manager
+        if manager is None:
+            return
+        for counter in manager.counters('goblin.get_batch.batches'):
+            counter.inc()
+        for counter in manager.counters(
+                'goblin.get_batch.{}'.format(reason)):
+            counter.inc()
+        calls = sum(len(futures) for _, futures in batch.futures.values())
+        for counter in manager.counters('goblin.get_batch.calls'):
+            counter.inc(calls)
+        for histogram in manager.histograms('goblin.get_batch.size'):
+            histogram.add(len(batch))
+
+
+loader = ElementLoader()
@@ -26,9 +26,18 @@ class PaginatedVertex(Vertex):
     @staticmethod
     def _transform_kwargs(kwargs):
         """
-        Transforms paginated kwargs into limit/offset kwargs
+        Transforms paginated kwargs into limit/offset kwargs, or into keyset
+        pagination kwargs when a cursor is passed as ``after`` (None for the
+        first page)
         """
         values = kwargs.copy()
+        if 'after' in kwargs:
+            return {
+                'page_size': kwargs.get('per_page'),
+                'after': kwargs['after'],
+                'sort_key': kwargs.get('sort_key'),
+                'types': kwargs.get('types'),
+            }
         return {
             'limit': kwargs.get('per_page'),
             'offset': to_offset(kwargs.get('page_num'), kwargs.get('per_page')),
@@ -42,6 +51,10 @@ class PaginatedVertex(Vertex):
         :param labels: pass in the labels to follow in as positional arguments
         :param page_num: the page number to return
         :param per_page: the number of objects to return per page
+        :param after: the cursor of the previous page, returns a
+            :py:class:`Page<goblin.models.cursor.Page>` ordered by sort_key,
+            or by id
+        :param sort_key: the indexed edge property ordering the pages
         :param types: the element types this method is allowed to return
         :rtype: vertex.Vertex
         """
@@ -52,6 +65,10 @@ class PaginatedVertex(Vertex):
         :param labels: pass in the labels to follow in as positional arguments
         :param page_num: the page number to return
         :param per_page: the number of objects to return per page
+        :param after: the cursor of the previous page, returns a
+            :py:class:`Page<goblin.models.cursor.Page>` ordered by sort_key,
+            or by id
+        :param sort_key: the indexed edge property ordering the pages
         :param types: the element types this method is allowed to return
         :rtype: edge.Edge
         """
@@ -62,6 +79,10 @@ class PaginatedVertex(Vertex):
         :param labels: pass in the labels to follow in as positional arguments
         :param page_num: the page number to return
         :param per_page: the number of objects to return per page
+        :param after: the cursor of the previous page, returns a
+            :py:class:`Page<goblin.models.cursor.Page>` ordered by sort_key,
+            or by id
+        :param sort_key: the indexed edge property ordering the pages
         :param types: the element types this method is allowed to return
         :rtype: vertex.Vertex
         """
@@ -72,6 +93,10 @@ class PaginatedVertex(Vertex):
         :param labels: pass in the labels to follow in as positional arguments
         :param page_num: the page number to return
         :param per_page: the number of objects to return per page
+        :param after: the cursor of the previous page, returns a
+            :py:class:`Page<goblin.models.cursor.Page>` ordered by sort_key,
+            or by id
+        :param sort_key: the indexed edge property ordering the pages
         :param types: the element types this method is allowed to return
         :rtype: edge.Edge
         """
@@ -82,6 +107,10 @@ class PaginatedVertex(Vertex):
         :param labels: pass in the labels to follow in as positional arguments
         :param page_num: the page number to return
         :param per_page: the number of objects to return per page
+        :param after: the cursor of the previous page, returns a
+            :py:class:`Page<goblin.models.cursor.Page>` ordered by sort_key,
+            or by id
+        :param sort_key: the indexed edge property ordering the pages
         :param types: the element types this method is allowed to return
         :rtype: list[vertex.Vertex]
         """
@@ -92,6 +121,10 @@ class PaginatedVertex(Vertex):
         :param labels: pass in the labels to follow in as positional arguments
         :param page_num: the page number to return
         :param per_page: the number of objects to return per page
+        :param after: the cursor of the previous page, returns a
+            :py:class:`Page<goblin.models.cursor.Page>` ordered by sort_key,
+            or by id
+        :param sort_key: the indexed edge property ordering the pages
         :param types: the element types this method is allowed to return
         :rtype: list[edge.Edge]
         """
@@ -14,6 +14,9 @@ from goblin.properties.base import GraphProperty
 
 logger = logging.getLogger(__name__)
 
+_PREDICATES = (EQUAL, NOT_EQUAL, GREATER_THAN, GREATER_THAN_EQUAL, LESS_THAN,
+               LESS_THAN_EQUAL, WITHIN, INSIDE, OUTSIDE, BETWEEN)
+
 
 class V(object):
     """
@@ -51,11 +54,14 @@ class V(object):
             msg = "Use %s.get_property_by_name" % (self.__class__.__name__)
             logger.error(msg)
             raise GoblinQueryError(msg)
+        if compare not in _PREDICATES:
+            raise GoblinQueryError("Unknown comparison '{}'".format(compare))
+        key_binding = self._get_binding(key)
         binding = self._get_binding(value)
         if compare in [INSIDE, OUTSIDE, BETWEEN, WITHIN]:
-            step = "has('{}', {}(*{}))".format(key, compare, binding)
+            step = "has({}, {}(*{}))".format(key_binding, compare, binding)
         else:
-            step = "has('{}', {}({}))".format(key, compare, binding)
+            step = "has({}, {}({}))".format(key_binding, compare, binding)
         q._steps.append(step)
         return q
 
@@ -0,0 +1,207 @@
+"""
+Partitioned scans of every vertex of a label.
+
+The id space of the label is split into ``parallelism`` ranges, and each
+range is read with a single query whose response is streamed: the vertices
+are handed out in batches as the response messages of the server arrive, and
+the next message of a range is only read once the batches of the previous one
+have been read.
+
+Titan can't answer a condition on the id from its storage or an index, so
+each range query goes through every vertex of the label (every vertex of the
+graph when the label isn't indexed) and drops the ids outside its range. A
+scan costs one such pass per range, plus one to find the bounds of the ids
+when there are several ranges: ``parallelism`` spreads the transfer and the
+deserialization of the vertices over several connections, it doesn't reduce
+the work of the server.
+"""
+from __future__ import unicode_literals
+import collections
+
+from goblin import connection
+from goblin._compat import integer_types
+from goblin.exceptions import GoblinQueryError
+
+
+def partition_ids(lowest, highest, parallelism):
+    """
+    Split the ids from lowest to highest into contiguous ranges
+
+    The first range has no lower bound and the last one no upper bound, so
+    the ranges cover every id, including the ids of the vertices created
+    while the scan is running.
+
+    :param int lowest: The lowest id
+    :param int highest: The highest id
+    :param int parallelism: The maximum number of ranges
+    :returns: list of [lower, upper) ranges
+    """
+    step = max(1, -(-(highest - lowest + 1) // parallelism))
+    ranges = [[start, start + step]
+              for start in range(lowest, highest + 1, step)]
+    ranges[0][0] = None
+    ranges[-1][1] = None
+    return ranges
+
+
+class LabelScan(object):
+    """
+    Stream of the batches of vertices read by a partitioned scan
+
+    Like a response stream, :meth:`read` returns a future list of vertices,
+    or None once every partition has been read. Each partition is read with
+    one streamed query, a response message at a time, and a message is split
+    into batches of at most ``batch_size`` vertices. The next message of a
+    partition is only read once the last batch of the previous one has been
+    read, so the scan holds at most one message (``resultIterationBatchSize``
+    vertices in the server configuration) per partition. Messages the server
+    sent before they are read wait in the buffers of the connection.
+
+    :param scan_partition: Callable sending the query of a partition, taking
+        its lower and upper bounds, returns a future response stream
+    :param partitions: The [lower, upper) id ranges to read
+    :type partitions: list
+    :param int batch_size: The maximum number of vertices per batch
+    """
+
+    def __init__(self, scan_partition, partitions, batch_size, **kwargs):
+        self._scan_partition = scan_partition
+        self._batch_size = batch_size
+        self._kwargs = kwargs
+        self._batches = collections.deque()
+        self._waiters = collections.deque()
+        self._running = 0
+        self._error = None
+        for lower, upper in partitions:
+            self._open(lower, upper)
+
+    def read(self):
+        """
+        Read the next batch
+
+        :returns: Future list of vertices, None when the scan is over
+        """
+        future = connection.get_future(self._kwargs)
+        self._waiters.append(future)
+        self._deliver()
+        return future
+
+    def _open(self, lower, upper):
+        self._running += 1
+        future_result = self._scan_partition(lower, upper)
+
+        def on_scan(f):
+            try:
+                stream = f.result()
+            except Exception as e:
+                self._running -= 1
+                self._error = e
+                self._deliver()
+            else:
+                self._read_message(stream)
+
+        future_result.add_done_callback(on_scan)
+
+    def _read_message(self, stream):
+
+        def on_read(f):
+            try:
+                message = f.result()
+            except Exception as e:
+                self._running -= 1
+                self._error = e
+            else:
+                if message is None:
+                    # the partition has been read to the end
+                    self._running -= 1
+                elif not message:
+                    self._read_next(stream)
+                else:
+                    size = self._batch_size
+                    batches = [message[start:start + size]
+                               for start in range(0, len(message), size)]
+                    for batch in batches[:-1]:
+                        self._batches.append((None, batch))
+                    # reading it sends for the next message of the partition
+                    self._batches.append((stream, batches[-1]))
+            self._deliver()
+
+        stream.read().add_done_callback(on_read)
+
+    def _read_next(self, stream):
+        # the stream only knows it is exhausted once the callback of the
+        # previous message returns, so read on the next iteration
+        connection.call_later(0, lambda: self._read_message(stream),
+                              **self._kwargs)
+
+    def _deliver(self):
+        while self._waiters:
+            if self._batches:
+                stream, batch = self._batches.popleft()
+                self._waiters.popleft().set_result(batch)
+                if stream is not None:
+                    self._read_next(stream)
+            elif self._error is not None:
+                # the messages in flight are dropped with the scan
+                self._waiters.popleft().set_exception(self._error)
+            elif not self._running:
+                self._waiters.popleft().set_result(None)
+            else:
+                return
+
+
+def scan_vertices(vertex_class, batch_size=500, parallelism=1, **kwargs):
+    """
+    Scan every vertex of a label, reading ``parallelism`` id ranges
+    concurrently
+
+    :param vertex_class: The vertex model to scan
+    :param int batch_size: The maximum number of vertices per batch
+    :param int parallelism: The number of ranges read concurrently, each of
+        them costs the server a pass over the label
+    :returns: Future :class:`LabelScan`
+    """
+    if batch_size < 1:
+        raise GoblinQueryError("batch_size must be at least 1")
+    if parallelism < 1:
+        raise GoblinQueryError("parallelism must be at least 1")
+    label = vertex_class.get_label()
+    future = connection.get_future(kwargs)
+
+    def scan_partition(lower, upper):
+        return vertex_class._scan_vertices(label, lower, upper, **kwargs)
+
+    if parallelism == 1:
+        # a single range doesn't need the bounds of the ids
+        future.set_result(LabelScan(scan_partition, [[None, None]],
+                                    batch_size, **kwargs))
+        return future
+
+    def on_read(f2):
+        try:
+            bounds = f2.result()[0]
+        except Exception as e:
+            future.set_exception(e)
+            return
+        if not bounds:
+            partitions = []
+        elif all(isinstance(b, integer_types) for b in bounds):
+            partitions = partition_ids(bounds[0], bounds[1], parallelism)
+        else:
+            # ids that aren't numbers can't be split into ranges
+            partitions = [[None, None]]
+        future.set_result(LabelScan(scan_partition, partitions, batch_size,
+                                    **kwargs))
+
+    def on_bounds(f):
+        try:
+            stream = f.result()
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future_read = stream.read()
+            future_read.add_done_callback(on_read)
+
+    future_result = vertex_class._id_bounds(label, **kwargs)
+    future_result.add_done_callback(on_bounds)
+    return future
@@ -0,0 +1,201 @@
+"""
+Unit of work for vertices and edges.
+
+A :class:`Session` tracks the elements added to it and, on :meth:`flush
+<Session.flush>`, creates the new ones and updates the modified ones with a
+single script run in a single transaction::
+
+    session = Session()
+    joe = User(name='joe')
+    bob = User(name='bob')
+    session.add(joe, bob, Knows(joe, bob))
+    yield session.flush()
+
+Edges may point to vertices created by the same flush: the new vertices an
+edge of the session points to are added to the flush along with it.
+"""
+from __future__ import unicode_literals
+
+from goblin import connection
+from goblin.constants import VERTEX_TRAVERSAL, EDGE_TRAVERSAL
+from goblin.exceptions import GoblinException
+from . import cache
+
+
+def _is_dirty(element):
+    """ Whether flushing the element would change the graph """
+    if element._id is None:
+        return True
+    for vm in element._values.values():
+        if vm.value != vm.previous_value and vm.changed:
+            return True
+    for vm in element._manual_values.values():
+        if vm is None or vm.value != vm.previous_value:
+            return True
+    return False
+
+
+class Session(object):
+    """
+    Tracks new and modified vertices and edges, and saves them all at once
+    """
+
+    def __init__(self):
+        self._elements = []
+
+    def __len__(self):
+        return len(self._elements)
+
+    def __contains__(self, element):
+        return any(e is element for e in self._elements)
+
+    def add(self, *elements):
+        """
+        Track elements, whether they are new or loaded from the graph
+
+        :param elements: The vertices and edges
+        :type elements: goblin.models.element.Element
+        """
+        from goblin.models.element import Element
+        for element in elements:
+            if not isinstance(element, Element):
+                raise GoblinException(
+                    'Only vertices and edges can be added to a session')
+            if element.__abstract__:
+                raise GoblinException('cant save abstract elements')
+            if element not in self:
+                self._elements.append(element)
+
+    def remove(self, element):
+        """ Stop tracking an element """
+        self._elements = [e for e in self._elements if e is not element]
+
+    def clear(self):
+        """ Stop tracking every element """
+        self._elements = []
+
+    @property
+    def dirty(self):
+        """
+        The elements the next flush saves: the new ones, the ones with a
+        property changed according to its save strategy, and the new
+        vertices the edges to save point to
+
+        :rtype: list
+        """
+        from goblin.models.vertex import Vertex
+        from goblin.models.edge import Edge
+        dirty = [e for e in self._elements if _is_dirty(e)]
+        for edge in [e for e in dirty if isinstance(e, Edge)]:
+            for vertex in (edge._outV, edge._inV):
+                if isinstance(vertex, Vertex) and vertex._id is None and \
+                        not any(e is vertex for e in dirty):
+                    dirty.append(vertex)
+        return dirty
+
+    def flush(self, **kwargs):
+        """
+        Create and update the dirty elements in a single transaction.
+
+        The elements are updated in place: the new ones get their id, and the
+        values sent become their saved values. Nothing is saved if the
+        transaction fails.
+
+        :returns: Future list of the elements saved, vertices first
+        """
+        from goblin.models.element import BaseElement
+        from goblin.models.vertex import Vertex
+        dirty = self.dirty
+        if not dirty:
+            future = connection.get_future(kwargs)
+            future.set_result([])
+            return future
+        elements = ([e for e in dirty if isinstance(e, Vertex)] +
+                    [e for e in dirty if not isinstance(e, Vertex)])
+        entries = []
+        for element in elements:
+            BaseElement.save(element)
+            params, geo_params = element.as_save_params()
+            entries.append((element, params, geo_params))
+        return save_elements(entries, **kwargs)
+
+
+def save_elements(entries, **kwargs):
+    """
+    Create and update elements with a single script run in a single
+    transaction, and update them in place: the new ones get their id, and
+    the values sent become their saved values.
+
+    An edge may point to a new vertex saved by the same call.
+
+    :param entries: ``(element, params, geo_params)`` of each element, the
+        params being those returned by ``as_save_params``
+    :type entries: list of tuple
+    :returns: Future list of the elements, vertices first
+    """
+    from goblin.models.element import save_error
+    from goblin.models.vertex import Vertex
+    future = connection.get_future(kwargs)
+    sent = {VERTEX_TRAVERSAL: [], EDGE_TRAVERSAL: []}
+    for entry in entries:
+        source = (VERTEX_TRAVERSAL if isinstance(entry[0], Vertex)
+                  else EDGE_TRAVERSAL)
+        sent[source].append(entry)
+    vertices = [element for element, _, _ in sent[VERTEX_TRAVERSAL]]
+    edges = [element for element, _, _ in sent[EDGE_TRAVERSAL]]
+
+    vertex_params = [[vertex._id, vertex.get_label(), params, geo_params,
+                      vertex.version_condition()]
+                     for vertex, params, geo_params in sent[VERTEX_TRAVERSAL]]
+
+    def endpoint(vertex):
+        if isinstance(vertex, Vertex):
+            if vertex._id is None:
+                for index, saved in enumerate(vertices):
+                    if saved is vertex:
+                        return [None, index]
+            vertex = vertex._id
+        return [vertex, None]
+
+    edge_params = [[edge._id, endpoint(edge._outV), endpoint(edge._inV),
+                    edge.get_label(), params, geo_params, edge.__exclusive__,
+                    edge.version_condition()]
+                   for edge, params, geo_params in sent[EDGE_TRAVERSAL]]
+
+    def invalidate():
+        for source, elements in sent.items():
+            for element, _, _ in elements:
+                cache.invalidate(source, element._id)
+
+    invalidate()
+    future_result = Vertex._flush_session(vertex_params, edge_params,
+                                          **kwargs)
+
+    def on_read(f2):
+        # reads sent while flushing may have cached the previous values
+        invalidate()
+        try:
+            vertex_ids, edge_ids = f2.result()[0]
+        except Exception as e:
+            future.set_exception(save_error(e))
+            return
+        for source, element_ids in ((VERTEX_TRAVERSAL, vertex_ids),
+                                    (EDGE_TRAVERSAL, edge_ids)):
+            for element_id, (element, params, geo_params) in zip(
+                    element_ids, sent[source]):
+                element._id = element_id
+                element._mark_saved(params, geo_params)
+                cache.forget_missing(source, element_id)
+        future.set_result(vertices + edges)
+
+    def on_flush(f):
+        try:
+            stream = f.result()
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future_read = stream.read()
+            future_read.add_done_callback(on_read)
+
+    future_result.add_done_callback(on_flush)
+    return future
@@ -1,14 +1,23 @@
 
-def _save_vertex(vid, vlabel, attrs, geo_attrs) {
+def _save_vertex(vid, vlabel, attrs, geo_attrs, read_back, version) {
     /**
      * Saves a vertex
      *
      * :param id: vertex id, if null, a new vertex is created
      * :param attrs: map of parameters to set on the vertex
+     * :param read_back: if true, returns the saved vertex, otherwise only
+     *     its id
+     * :param version: null, or [key, version]: the vertex is only saved if
+     *     its stored version is the given one. The check and the write are
+     *     only atomic if key is defined with ConsistencyModifier.LOCK,
+     *     otherwise two saves may both pass it
      */
     graph.tx().rollback()
     try {
         def v = vid == null ? graph.addVertex(label, vlabel) : g.V(vid).next()
+        if (version != null && v.property(version[0]).orElse(null) != version[1]) {
+            throw new IllegalStateException("Version conflict: vertex " + vid + " is not at version " + version[1])
+        }
 
         for (item in geo_attrs.entrySet()) {
             if (item.value == null) {
@@ -36,13 +45,288 @@ def _save_vertex(vid, vlabel, attrs, geo_attrs) {
             }
         }
         graph.tx().commit()
-        return g.V(v.id()).next()
+        return read_back ? g.V(v.id()).next() : v.id()
+    } catch (err) {
+        graph.tx().rollback()
+        throw(err)
+    }
+}
+
+def _bulk_save_vertices(vlabel, elements) {
+    /**
+     * Creates vertices in a single transaction
+     *
+     * :param vlabel: label of the new vertices
+     * :param elements: list of [attrs, geo_attrs] pairs, one per vertex
+     * :returns: the new vertex ids, in the order of elements
+     */
+    graph.tx().rollback()
+    try {
+        def ids = []
+        for (element in elements) {
+            def v = graph.addVertex(label, vlabel)
+
+            for (item in element[1].entrySet()) {
+                if (item.value == null) {
+                    continue
+                } else if (item.value[0] == 'point') {
+                    v.property(item.key, Geoshape.point(*item.value[1]))
+                } else if (item.value[0] == 'circle') {
+                    v.property(item.key, Geoshape.circle(*item.value[1]))
+                } else if (item.value[0] == 'box') {
+                    v.property(item.key, Geoshape.box(*item.value[1]))
+                }
+            }
+
+            for (item in element[0].entrySet()) {
+                if (item.value == null) {
+                    continue
+                } else if (item.value instanceof List) {
+                    for (extra in item.value) {
+                        v.property(item.key, extra)
+                    }
+                } else {
+                    v.property(item.key, item.value)
+                }
+            }
+            ids.add(v.id())
+        }
+        graph.tx().commit()
+        // wrapped so the ids come back as a single result
+        return [ids]
+    } catch (err) {
+        graph.tx().rollback()
+        throw(err)
+    }
+}
+
+def _flush_session(vertices, edges) {
+    /**
+     * Creates and updates vertices and edges in a single transaction
+     *
+     * :param vertices: list of [vid, vlabel, attrs, geo_attrs, version], vid
+     *     is null for the vertices to create
+     * :param edges: list of [eid, outV, inV, elabel, attrs, geo_attrs,
+     *     exclusive, version], eid is null for the edges to create. The
+     *     endpoints are [vid, index] pairs where, when vid is null, index is
+     *     the position in vertices of a vertex created by this call. The
+     *     elements with a [key, version] version are only saved if their
+     *     stored version is the given one
+     * :returns: the vertex ids and the edge ids, in the order of vertices and
+     *     edges
+     */
+    graph.tx().rollback()
+    try {
+        def saved = []
+        for (element in vertices) {
+            def v = element[0] == null ? graph.addVertex(label, element[1]) : g.V(element[0]).next()
+            if (element[4] != null && v.property(element[4][0]).orElse(null) != element[4][1]) {
+                throw new IllegalStateException("Version conflict: vertex " + element[0] + " is not at version " + element[4][1])
+            }
+
+            for (item in element[3].entrySet()) {
+                if (item.value == null) {
+                    v.property(item.key).remove()
+                } else if (item.value[0] == 'point') {
+                    v.property(item.key, Geoshape.point(*item.value[1]))
+                } else if (item.value[0] == 'circle') {
+                    v.property(item.key, Geoshape.circle(*item.value[1]))
+                } else if (item.value[0] == 'box') {
+                    v.property(item.key, Geoshape.box(*item.value[1]))
+                }
+            }
+
+            for (item in element[2].entrySet()) {
+                if (item.value == null) {
+                    v.property(item.key).remove()
+                } else if (item.value instanceof List) {
+                    for (extra in item.value) {
+                        v.property(item.key, extra)
+                    }
+                } else {
+                    v.property(item.key, item.value)
+                }
+            }
+            saved.add(v)
+        }
+
+        def edge_ids = []
+        for (element in edges) {
+            def e = null
+            if (element[0] == null) {
+                def source = element[1][0] == null ? saved[element[1][1]] : g.V(element[1][0]).next()
+                def target = element[2][0] == null ? saved[element[2][1]] : g.V(element[2][0]).next()
+                if (element[6]) {
+                    // walk the edges of the label of both vertices at once:
+                    // the search ends once the vertex with the fewest is
+                    // exhausted
+                    def out_edges = g.V(source).outE(element[3])
+                    def in_edges = g.V(target).inE(element[3])
+                    while (e == null && out_edges.hasNext()) {
+                        def candidate = out_edges.next()
+                        if (candidate.inVertex().id() == target.id()) {
+                            e = candidate
+                        } else if (!in_edges.hasNext()) {
+                            break
+                        } else {
+                            candidate = in_edges.next()
+                            if (candidate.outVertex().id() == source.id()) {
+                                e = candidate
+                            }
+                        }
+                    }
+                }
+                if (e == null) {
+                    e = source.addEdge(element[3], target)
+                }
+            } else {
+                e = g.E(element[0]).next()
+                if (element[7] != null && e.property(element[7][0]).orElse(null) != element[7][1]) {
+                    throw new IllegalStateException("Version conflict: edge " + element[0] + " is not at version " + element[7][1])
+                }
+            }
+
+            for (item in element[5].entrySet()) {
+                if (item.value == null) {
+                    e.property(item.key).remove()
+                } else if (item.value[0] == 'point') {
+                    e.property(item.key, Geoshape.point(*item.value[1]))
+                } else if (item.value[0] == 'circle') {
+                    e.property(item.key, Geoshape.circle(*item.value[1]))
+                } else if (item.value[0] == 'box') {
+                    e.property(item.key, Geoshape.box(*item.value[1]))
+                }
+            }
+
+            for (item in element[4].entrySet()) {
+                if (item.value == null) {
+                    e.property(item.key).remove()
+                } else {
+                    e.property(item.key, item.value)
+                }
+            }
+            edge_ids.add(e.id())
+        }
+        graph.tx().commit()
+        // wrapped so the ids come back as a single result
+        return [[saved.collect { it.id() }, edge_ids]]
+    } catch (err) {
+        graph.tx().rollback()
+        throw(err)
+    }
+}
+
+def _upsert_vertex(vlabel, lookup, attrs, geo_attrs, updates, geo_updates, version) {
+    /**
+     * Gets, updates or creates the vertex with the given property values
+     *
+     * :param vlabel: label of the vertex
+     * :param lookup: map of the property values identifying the vertex
+     * :param attrs: map of parameters to set on a new vertex
+     * :param geo_attrs: map of geo parameters to set on a new vertex
+     * :param updates: map of parameters to set on an existing vertex, if
+     *     null the vertex is left as is
+     * :param geo_updates: map of geo parameters to set on an existing vertex
+     * :param version: null, or the key of a version property incremented
+     *     when an existing vertex is updated
+     * :returns: the vertex and whether it was created
+     */
+    graph.tx().rollback()
+    try {
+        def t = g.V().hasLabel(vlabel)
+        for (item in lookup.entrySet()) {
+            t = t.has(item.key, item.value)
+        }
+        def created = !t.hasNext()
+        def v = null
+        if (created) {
+            v = graph.addVertex(label, vlabel)
+        } else {
+            v = t.next()
+            attrs = updates
+            geo_attrs = geo_updates
+            if (updates != null && version != null) {
+                v.property(version, v.property(version).orElse(0) + 1)
+            }
+        }
+
+        if (attrs != null) {
+            for (item in geo_attrs.entrySet()) {
+                if (item.value == null) {
+                    v.property(item.key).remove()
+                } else if (item.value[0] == 'point') {
+                    v.property(item.key, Geoshape.point(*item.value[1]))
+                } else if (item.value[0] == 'circle') {
+                    v.property(item.key, Geoshape.circle(*item.value[1]))
+                } else if (item.value[0] == 'box') {
+                    v.property(item.key, Geoshape.box(*item.value[1]))
+                }
+            }
+
+            for (item in attrs.entrySet()) {
+                if (item.value == null) {
+                    v.property(item.key).remove()
+                } else if (item.value instanceof List) {
+                    for (extra in item.value) {
+                        v.property(item.key, extra)
+                    }
+                } else {
+                    v.property(item.key, item.value)
+                }
+            }
+        }
+        graph.tx().commit()
+        return [[g.V(v.id()).next(), created]]
     } catch (err) {
         graph.tx().rollback()
         throw(err)
     }
 }
 
+def _increment_property(vid, key, delta, version, attempts) {
+    /**
+     * Adds delta to a numeric property of a vertex
+     *
+     * The value is read and written in one transaction, which only fails
+     * when another transaction changed it in between if key is defined
+     * with ConsistencyModifier.LOCK: without the lock Titan commits both
+     * writes and one increment is lost. A failed commit is retried in a new
+     * transaction, attempts times in all.
+     *
+     * :param vid: vertex id
+     * :param key: name of the property, a missing value counts as 0
+     * :param delta: amount to add
+     * :param version: null, or the key of the version of a versioned
+     *     vertex, incremented with the property
+     * :param attempts: number of transactions to try
+     * :returns: [the new value, the new version or null]
+     */
+    def failure = null
+    for (attempt in 1..attempts) {
+        graph.tx().rollback()
+        try {
+            def v = g.V(vid).next()
+            def value = v.property(key).orElse(0) + delta
+            v.property(key, value)
+            def stored = null
+            if (version != null) {
+                stored = v.property(version).orElse(0) + 1
+                v.property(version, stored)
+            }
+            graph.tx().commit()
+            return [[value, stored]]
+        } catch (com.thinkaurelius.titan.core.TitanException err) {
+            // the lock on key was taken or its value changed meanwhile
+            graph.tx().rollback()
+            failure = err
+        } catch (err) {
+            graph.tx().rollback()
+            throw(err)
+        }
+    }
+    throw new IllegalStateException("Lock conflict: " + key + " of vertex " + vid + " changed in each of " + attempts + " attempts: " + failure.getMessage())
+}
+
 def _delete_vertex(vid) {
     /**
      * Deletes a vertex
@@ -139,6 +423,78 @@ def _traversal(vid, operation, labels, start, end, element_types) {
     return results
 }
 
+def _traversal_page(vid, operation, labels, element_types, sort_key, after, page_limit) {
+    /**
+     * performs vertex/edge traversals a page at a time, each page resuming
+     * where the previous one ended
+     *
+     * With a sort key, the edges are read in the order of the vertex-centric
+     * index of their labels on this edge property, from the value of the last
+     * result of the previous page, so a page only reads its own edges, and
+     * [element, sort key value] rows are returned. Every edge of the labels
+     * must have the property.
+     *
+     * Without one, results are ordered by id and resume after the last id of
+     * the previous page: every page reads and sorts all the adjacent
+     * elements, which is only fit for vertices of small degree.
+     * :param id: vertex id to start from
+     * :param operation: the traversal operation
+     * :param labels: the edge labels to filter on
+     * :param element_types: list of allowed element types for results
+     * :param sort_key: the indexed edge property ordering the pages, or null
+     * :param after: sort key value (with a sort key, included) or id (without
+     *     one, excluded) of the last result of the previous page, or null
+     * :param page_limit: maximum number of results to return
+     */
+    graph.tx().rollback()
+    def label_args = labels == null ? [] : labels
+    def edge_steps = [inV: "inE", outV: "outE", bothV: "bothE",
+                      inE: "inE", outE: "outE", bothE: "bothE"]
+    def vertex_steps = [inV: "in", outV: "out", bothV: "both",
+                        inE: "inE", outE: "outE", bothE: "bothE"]
+    def adjacent_steps = [inV: "outV", outV: "inV", bothV: "otherV"]
+    if (!edge_steps.containsKey(operation)) {
+        throw NamingException()
+    }
+    def vertex_results = adjacent_steps.containsKey(operation)
+    if (sort_key != null) {
+        def source = g.V(vid).next()
+        def edges = g.V(vid)."${edge_steps[operation]}"(*label_args)
+        if (after != null) {
+            edges = edges.has(sort_key, P.gte(after))
+        }
+        if (element_types != null) {
+            edges = vertex_results ?
+                edges.where(__."${adjacent_steps[operation]}"().hasLabel(*element_types)) :
+                edges.hasLabel(*element_types)
+        }
+        // no order step: the index returns the edges sorted on the key
+        return edges.limit(page_limit).toList().collect { edge ->
+            def element = edge
+            if (vertex_results) {
+                element = edge.outVertex() == source ? edge.inVertex() : edge.outVertex()
+            }
+            [element, edge.value(sort_key)]
+        }
+    }
+    def results = g.V(vid)."${vertex_steps[operation]}"(*label_args)
+    if (element_types != null) {
+        results = results.hasLabel(*element_types)
+    }
+    if (vertex_results) {
+        if (after != null) {
+            results = results.has(T.id, P.gt(after))
+        }
+        return results.order().by(T.id, incr).limit(page_limit)
+    }
+    // edge ids aren't comparable, they are ordered by their string form
+    def id_key = { id -> id instanceof Number ? id : id.toString() }
+    if (after != null) {
+        results = results.filter{id_key(it.get().id()) > after}
+    }
+    return results.order().by{id_key(it.id())}.limit(page_limit)
+}
+
 def _delete_related(vid, operation, lbs) {
     graph.tx().rollback()
     try{
@@ -187,3 +543,95 @@ def _find_vertex_by_value(value_type, vlabel, field, val) {
         raise(err)
     }
 }
+
+def _id_bounds(vlabel) {
+    /**
+     * Finds the lowest and highest ids of the vertices of a label, reading
+     * the ids once
+     *
+     * :param vlabel: the vertex label
+     * :returns: [lowest id, highest id], or an empty list when there is no
+     *     vertex with this label
+     */
+    graph.tx().rollback()
+    def lowest = null
+    def highest = null
+    g.V().hasLabel(vlabel).id().each { id ->
+        if (lowest == null || id < lowest) {
+            lowest = id
+        }
+        if (highest == null || id > highest) {
+            highest = id
+        }
+    }
+    // wrapped so the bounds come back as a single result
+    return lowest == null ? [[]] : [[lowest, highest]]
+}
+
+def _scan_vertices(vlabel, lower, upper) {
+    /**
+     * Reads the vertices of a label whose ids are in the range [lower, upper)
+     *
+     * The id conditions can't be answered by the storage: every vertex of
+     * the label is read and the ones outside the range are dropped. The
+     * vertices are streamed back as they are found.
+     *
+     * :param vlabel: the vertex label
+     * :param lower: lowest id of the range, or null
+     * :param upper: id after the range, or null
+     */
+    graph.tx().rollback()
+    def results = g.V().hasLabel(vlabel)
+    if (lower != null) {
+        results = results.has(T.id, P.gte(lower))
+    }
+    if (upper != null) {
+        results = results.has(T.id, P.lt(upper))
+    }
+    return results
+}
+
+def _prefetch_relationships(relationships) {
+    /**
+     * Reads the vertices related to a batch of vertices along each of the
+     * given relationships, with one traversal per relationship
+     *
+     * :param relationships: [vertex ids, direction, edge labels, vertex labels]
+     *     of each relationship
+     * :returns: [related vertices, rows]: each related vertex once, and a
+     *     [relationship index, position of the vertex id, related vertex id]
+     *     row per edge
+     */
+    graph.tx().rollback()
+    def vertices = [:]
+    def rows = []
+    relationships.eachWithIndex { relationship, index ->
+        def (vids, direction, elabels, vlabels) = relationship
+        if (!vids) {
+            return
+        }
+        def positions = [:]
+        vids.eachWithIndex { vid, position ->
+            positions.get(vid.toString(), []).add(position)
+        }
+        def results = g.V(*vids).as('source')
+        switch (direction) {
+            case "out":
+                results = results.outE(*elabels).inV()
+                break
+            case "in":
+                results = results.inE(*elabels).outV()
+                break
+            default:
+                results = results.bothE(*elabels).otherV()
+        }
+        results.hasLabel(*vlabels).as('related').select('source', 'related').each {
+            def related = it['related']
+            vertices[related.id()] = related
+            positions[it['source'].id().toString()].each { position ->
+                rows.add([index, position, related.id()])
+            }
+        }
+    }
+    return [[vertices.values() as List, rows]]
+}
@@ -5,11 +5,22 @@ import logging
 from goblin import connection
 from goblin.constants import VERTEX_TRAVERSAL
 from goblin._compat import (
-    array_types, string_types, add_metaclass, integer_types, float_types)
+    array_types, string_types, add_metaclass, PY35, integer_types, float_types)
 from goblin.exceptions import (
     GoblinException, ElementDefinitionException, GoblinQueryError)
-from goblin.gremlin import GremlinMethod
-from .element import Element, ElementMetaClass, vertex_types
+from goblin.gremlin import GremlinMethod, GremlinValue
+from goblin.properties.properties import Short, Integer, Long, Double
+from . import cache
+from .committer import committer
+from .cursor import Page, decode_cursor, encode_cursor
+from .scan import scan_vertices
+from .element import Element, ElementMetaClass, vertex_types, save_error
+
+
+if PY35:
+    from .aio import AsyncVertexMixin
+else:  # pragma: no cover
+    AsyncVertexMixin = object
 
 
 logger = logging.getLogger(__name__)
@@ -96,7 +107,7 @@ class EnumVertexBaseMeta(VertexMetaClass):
 
 
 @add_metaclass(VertexMetaClass)
-class Vertex(Element):
+class Vertex(Element, AsyncVertexMixin):
     """ The Vertex model base class.
 
     The element type is auto-generated from the subclass name, but can
@@ -107,11 +118,20 @@ class Vertex(Element):
 
     gremlin_path = 'vertex.groovy'
 
-    _save_vertex = GremlinMethod()
+    _save_vertex = GremlinMethod(defaults={'read_back': True,
+                                           'version': None})
+    _increment_property = GremlinValue()
     _delete_vertex = GremlinMethod()
     _traversal = GremlinMethod()
+    _traversal_page = GremlinMethod()
     _delete_related = GremlinMethod()
     _find_vertex_by_value = GremlinMethod(classmethod=True)
+    _bulk_save_vertices = GremlinMethod(classmethod=True)
+    _upsert_vertex = GremlinMethod(classmethod=True)
+    _flush_session = GremlinMethod(classmethod=True)
+    _id_bounds = GremlinMethod(classmethod=True)
+    _scan_vertices = GremlinMethod(classmethod=True)
+    _prefetch_relationships = GremlinMethod(classmethod=True)
 
     _label = None
 
@@ -125,14 +145,17 @@ class Vertex(Element):
 
     def __getstate__(self):
         state = {'id': self.id, '_type': 'vertex'}
-        properties, geo_properties = self.as_save_params()
+        properties, geo_properties = self.as_state_params()
         properties['label'] = self.get_label()
         state['properties'] = properties
         state['geo_properties'] = geo_properties
         return state
 
     def __setstate__(self, state):
-        self.__init__(**self.translate_db_fields(state))
+        data = dict(state)
+        data['properties'] = self._state_properties(
+            state['properties'], state.get('geo_properties'))
+        self.__init__(**self.translate_db_fields(data))
         return self
 
     @classmethod
@@ -217,24 +240,54 @@ class Vertex(Element):
         """
         Save the current vertex using the configured save strategy, the default
         save strategy is to re-save all fields every time the object is saved.
+
+        With ``connection.setup(save_batch_window=...)``, concurrent saves are
+        committed together, see :py:mod:`goblin.models.committer`, and the
+        vertex itself is returned.
+
+        A vertex of a ``__versioned__`` model is only saved if its stored
+        version is the one loaded, otherwise the save fails with
+        :class:`VersionConflict<goblin.models.element.BaseElement.VersionConflict>`.
+        The check is only atomic if the version key is defined with
+        ``ConsistencyModifier.LOCK``.
+
+        :param read_back: Return the vertex read back from the graph, or only
+            read back its id and return this vertex, updated in place.
+            Defaults to the ``__read_back__`` of the model
+        :type read_back: bool
         """
         super(Vertex, self).save()
+        read_back = kwargs.pop('read_back', self.__read_back__)
         params, geo_params = self.as_save_params()
+        if committer.accepts(kwargs):
+            return committer.save(self, params, geo_params, **kwargs)
         label = self.get_label()
         # params['element_type'] = self.get_element_type()  don't think we need
         # Here this is a future, have to set handler in callback
         future = connection.get_future(kwargs)
-        future_result = self._save_vertex(label, params, geo_params, **kwargs)
+        cache.invalidate(VERTEX_TRAVERSAL, self._id)
+        future_result = self._save_vertex(label, params, geo_params,
+                                          read_back=read_back,
+                                          version=self.version_condition(),
+                                          **kwargs)
         deserialize = kwargs.pop('deserialize', True)
         def on_read(f2):
+            # reads sent while saving may have cached the previous values
+            cache.invalidate(VERTEX_TRAVERSAL, self._id)
             try:
                 result = f2.result()
             except Exception as e:
-                future.set_exception(e)
+                future.set_exception(save_error(e))
             else:
-                if deserialize:
+                if not read_back:
+                    self._id = result[0]
+                    cache.forget_missing(VERTEX_TRAVERSAL, self._id)
+                    self._mark_saved(params, geo_params)
+                    result = self
+                elif deserialize:
                     result = result[0]
                     self._id = result._id
+                    cache.forget_missing(VERTEX_TRAVERSAL, self._id)
                     for k, v in self._values.items():
                         v.previous_value = result._values[k].previous_value
                 else:
@@ -254,6 +307,203 @@ class Vertex(Element):
 
         return future
 
+    def increment(self, field, delta=1, attempts=5, **kwargs):
+        """
+        Add ``delta`` to a numeric property of this vertex on the server. A
+        missing value counts as 0. The property of this vertex is set to the
+        new value.
+
+        The ``version`` of a ``__versioned__`` vertex is incremented with the
+        property, so a save of a copy loaded before fails with
+        :class:`VersionConflict<goblin.models.element.BaseElement.VersionConflict>`.
+        This vertex takes the new version only if it was at the one before.
+
+        The script reads and writes the value in one transaction, so
+        concurrent increments are only kept if the property key is defined
+        with ``ConsistencyModifier.LOCK`` in the schema: Titan then fails
+        the commit of an increment whose value changed meanwhile, and the
+        script retries it. Without the lock two increments may read the
+        same value and one of them is lost.
+
+        :param field: The name of the property
+        :type field: str
+        :param delta: The amount to add, may be negative
+        :type delta: int | float
+        :param attempts: The number of transactions to try before raising
+            :class:`LockConflict<goblin.models.element.BaseElement.LockConflict>`
+        :type attempts: int
+        :returns: Future new value
+        """
+        if self._id is None:
+            raise GoblinQueryError("Can't increment an unsaved vertex")
+        prop = self._properties.get(field)
+        if prop is None:
+            raise TypeError("unrecognized attribute name: '{}'".format(field))
+        if not isinstance(prop, (Short, Integer, Long, Double)):
+            raise GoblinQueryError(
+                "Can't increment non numeric property '{}'".format(field))
+        delta = prop.validate(delta)
+        future = connection.get_future(kwargs)
+        cache.invalidate(VERTEX_TRAVERSAL, self._id)
+        version = self.version_condition()
+        future_result = self._increment_property(
+            prop.db_field_name or field, prop.to_database(delta),
+            version and version[0], attempts, **kwargs)
+
+        def on_increment(f):
+            cache.invalidate(VERTEX_TRAVERSAL, self._id)
+            try:
+                result, stored = f.result()
+                result = prop.to_python(result)
+            except Exception as e:
+                future.set_exception(save_error(e))
+            else:
+                value_mngr = self._values[field]
+                value_mngr.value = result
+                value_mngr.previous_value = result
+                # a vertex loaded before another save stays stale
+                if version and stored == (version[1] or 0) + 1:
+                    version_mngr = self._values['version']
+                    version_mngr.value = stored
+                    version_mngr.previous_value = stored
+                future.set_result(result)
+
+        future_result.add_done_callback(on_increment)
+        return future
+
+    def update_fields(self, **values):
+        """
+        Set the given properties of this vertex and save only those, without
+        reading the vertex back. The other properties of the vertex are left
+        as stored, even if they were changed locally.
+
+        :returns: Future of this vertex, with the given values saved
+        """
+        if self.__abstract__:
+            raise GoblinException('cant update abstract elements')
+        if self._id is None:
+            raise GoblinQueryError("Can't update an unsaved vertex")
+        query_kwargs = connection.pop_execute_query_kwargs(values)
+        self.pre_update(**values)
+        params, geo_params = {}, {}
+        if self.__versioned__:
+            self._bump_version()
+            values['version'] = self.version
+        for name, value in values.items():
+            setattr(self, name, value)
+            validate = getattr(self, 'validate_{}'.format(name), None)
+            if validate is not None:
+                value = validate(getattr(self, name))
+            else:
+                value = self._properties[name].validate(getattr(self, name))
+            setattr(self, name, value)
+            self._add_param(name, self._properties[name], value, params,
+                            geo_params)
+        future = connection.get_future(query_kwargs)
+        cache.invalidate(VERTEX_TRAVERSAL, self._id)
+        future_result = self._save_vertex(self.get_label(), params,
+                                          geo_params, read_back=False,
+                                          version=self.version_condition(),
+                                          **query_kwargs)
+
+        def on_read(f2):
+            cache.invalidate(VERTEX_TRAVERSAL, self._id)
+            try:
+                f2.result()
+            except Exception as e:
+                future.set_exception(save_error(e))
+            else:
+                self._mark_saved(params, geo_params)
+                future.set_result(self)
+
+        def on_save(f):
+            try:
+                stream = f.result()
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future_read = stream.read()
+                future_read.add_done_callback(on_read)
+
+        future_result.add_done_callback(on_save)
+        return future
+
+    @classmethod
+    def bulk_create(cls, values, chunk_size=500, **kwargs):
+        """
+        Create many vertices of this type, sending ``chunk_size`` vertices
+        per script. Each chunk is saved in a single transaction.
+
+        :param values: The properties of each vertex
+        :type values: iterable of dict
+        :param chunk_size: Maximum number of vertices created per script
+        :type chunk_size: int
+        :rtype: list of the new vertex ids, in the order of values
+
+        """
+        params = []
+        for vertex_values in values:
+            vertex = cls(**vertex_values)
+            super(Vertex, vertex).save()
+            params.append(list(vertex.as_save_params()))
+        label = cls.get_label()
+
+        def save_chunk(chunk):
+            return cls._bulk_save_vertices(label, chunk, **kwargs)
+
+        return cls._save_in_chunks(save_chunk, params, chunk_size, **kwargs)
+
+    @classmethod
+    def get_or_create(cls, lookup, defaults=None, **kwargs):
+        """
+        Get the vertex of this type with the given property values, or create
+        it with these values and the defaults, with a single script. The
+        lookup goes through ``has()`` steps, so it uses the indices of the
+        properties; a unique index keeps concurrent calls from creating the
+        vertex twice.
+
+        :param lookup: The property values identifying the vertex
+        :type lookup: dict
+        :param defaults: The other properties of a new vertex
+        :type defaults: dict
+        :returns: Future (vertex, created) pair
+        """
+        values = dict(defaults or {})
+        values.update(lookup)
+        return cls._upsert(values, lookup, None, True, **kwargs)
+
+    @classmethod
+    def upsert(cls, key_fields, **values):
+        """
+        Update the vertex of this type whose ``key_fields`` have the given
+        values, or create it, with a single script. Only the given values are
+        set on an existing vertex.
+
+        :param key_fields: The names of the properties identifying the vertex
+        :type key_fields: str | list
+        :param values: The properties of the vertex, including the key fields
+        :returns: Future vertex
+        """
+        query_kwargs = connection.pop_execute_query_kwargs(values)
+        if isinstance(key_fields, string_types):
+            key_fields = [key_fields]
+        missing = [name for name in key_fields if name not in values]
+        if missing:
+            raise GoblinQueryError(
+                'No value given for the key fields {}'.format(missing))
+        lookup = dict((name, values[name]) for name in key_fields)
+        return cls._upsert(values, lookup, list(values), False,
+                           **query_kwargs)
+
+    @classmethod
+    def _upsert(cls, values, lookup, update_names, with_created, **kwargs):
+        if not lookup:
+            raise GoblinQueryError('An upsert needs at least one key field')
+        params = cls._upsert_params((), values, lookup, update_names)
+        future_result = cls._upsert_vertex(cls.get_label(), *params, **kwargs)
+        return cls._read_upsert(future_result, VERTEX_TRAVERSAL, with_created,
+                                **kwargs)
+
     def delete(self, **kwargs):
         """ Delete the current vertex from the graph. """
         if self.__abstract__:
@@ -264,6 +514,9 @@ class Vertex(Element):
         future_result = self._delete_vertex()
 
         def on_read(f2):
+            # the edges of the vertex are deleted with it
+            cache.invalidate(VERTEX_TRAVERSAL, self._id)
+            cache.invalidate_edges(self._id)
             try:
                 result = f2.result()
             except Exception as e:
@@ -285,9 +538,56 @@ class Vertex(Element):
         return future
 
     @classmethod
-    def all(cls, ids=None, as_dict=False, *args, **kwargs):
-        return super(Vertex, cls).all(
+    def all(cls, ids=None, as_dict=False, prefetch=None, *args, **kwargs):
+        """
+        Load all vertices with the given ids from the graph, see
+        :py:meth:`Element.all<goblin.models.element.BaseElement.all>`.
+
+        :param prefetch: Names of relationships whose vertices are read along
+            with the vertices, with one query per message of the stream, see
+            :py:func:`prefetch_related<goblin.relationships.prefetch.prefetch_related>`
+        :type prefetch: list[str]
+        :rtype: Future stream of the vertices
+        """
+        future_stream = super(Vertex, cls).all(
             VERTEX_TRAVERSAL, ids=ids, as_dict=as_dict, *args, **kwargs)
+        if not prefetch:
+            return future_stream
+        from goblin.relationships.prefetch import PrefetchStream
+        query_kwargs = connection.pop_execute_query_kwargs(kwargs)
+        future = connection.get_future(query_kwargs)
+
+        def on_all(f):
+            try:
+                stream = f.result()
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(
+                    PrefetchStream(stream, prefetch, **query_kwargs))
+
+        future_stream.add_done_callback(on_all)
+        return future
+
+    @classmethod
+    def iter_all(cls, batch_size=500, parallelism=1, **kwargs):
+        """
+        Scan every vertex of this type in batches. The ids are split into
+        ``parallelism`` ranges that are each streamed by one query,
+        concurrently, over separate connections of the pool. Each range
+        costs the server a pass over the label, see
+        :py:mod:`goblin.models.scan`.
+
+        :param batch_size: The maximum number of vertices per batch
+        :type batch_size: int
+        :param parallelism: The number of ranges read concurrently
+        :type parallelism: int
+        :rtype: Future :py:class:`LabelScan<goblin.models.scan.LabelScan>`,
+            whose ``read`` returns the next batch, or None at the end
+
+        """
+        return scan_vertices(cls, batch_size=batch_size,
+                             parallelism=parallelism, **kwargs)
 
     # This section of the API is under review
     def _simple_traversal(self,
@@ -296,6 +596,10 @@ class Vertex(Element):
                           limit=None,
                           offset=None,
                           types=None,
+                          page_size=None,
+                          after=None,
+                          sort_key=None,
+                          resolve_endpoints=False,
                           **kwargs):
         """
         Perform simple graph database traversals with ubiquitous pagination.
@@ -310,11 +614,32 @@ class Vertex(Element):
         :type max_results: int
         :param types: The list of allowed result elements
         :type types: list
+        :param page_size: Use keyset pagination, returning pages of at most
+            page_size elements ordered by sort_key, or by id
+        :type page_size: int
+        :param after: The cursor of the previous page
+        :type after: str
+        :param sort_key: The edge property ordering the pages, which should
+            have a vertex-centric index on the labels
+        :type sort_key: str
+        :param resolve_endpoints: Read the vertices at both ends of the
+            edges found, with one query per message or page
+        :type resolve_endpoints: bool
 
         """
-        from goblin.models.edge import Edge
+        from goblin.models.edge import Edge, EndpointsStream
+        if resolve_endpoints and operation not in ('inE', 'outE', 'bothE'):
+            raise GoblinQueryError(
+                "resolve_endpoints only applies to edge traversals")
+        if sort_key is not None and page_size is None:
+            raise GoblinQueryError("sort_key only applies to pages")
         label_strings = []
+        sort_field = sort_key
         for label in labels:
+            edge_class = label if inspect.isclass(label) else type(label)
+            prop = getattr(edge_class, '_properties', {}).get(sort_key)
+            if prop is not None:
+                sort_field = prop.db_field_name
             if inspect.isclass(label) and issubclass(label, Edge):
                 label_string = label.get_label()
             elif isinstance(label, Edge):
@@ -335,6 +660,16 @@ class Vertex(Element):
                 elif issubclass(e, Edge):
                     allowed_elts += [e.get_label()]
 
+        if page_size is not None:
+            future_page = self._keyset_traversal(operation, label_strings,
+                                                 allowed_elts, page_size,
+                                                 after, sort_field, **kwargs)
+            if resolve_endpoints:
+                # this vertex is an end of every edge
+                future_page = self._resolve_endpoints(future_page, [self],
+                                                      **kwargs)
+            return future_page
+
         if limit is not None and offset is not None:
             start = offset
             end = offset + limit
@@ -360,11 +695,122 @@ class Vertex(Element):
                 future.set_exception(e)
             else:
                 stream.add_handler(traversal_handler)
+                if resolve_endpoints:
+                    stream = EndpointsStream(
+                        stream, [self], **connection.pop_execute_query_kwargs(
+                            dict(kwargs)))
                 future.set_result(stream)
 
         future_result.add_done_callback(on_traversal)
         return future
 
+    @staticmethod
+    def _resolve_endpoints(future_page, vertices, **kwargs):
+        """ Resolve the endpoints of the edges of a future page """
+        from goblin.models.edge import resolve_endpoints
+        future = connection.get_future(kwargs)
+
+        def on_page(f):
+            try:
+                page = f.result()
+            except Exception as e:
+                future.set_exception(e)
+                return
+
+            def on_resolve(f2):
+                try:
+                    f2.result()
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(page)
+
+            future_resolve = resolve_endpoints(page, vertices, **kwargs)
+            future_resolve.add_done_callback(on_resolve)
+
+        future_page.add_done_callback(on_page)
+        return future
+
+    def _keyset_traversal(self, operation, label_strings, allowed_elts,
+                          page_size, after=None, sort_key=None, **kwargs):
+        """
+        Read a page of a traversal, resuming after the cursor of the previous
+        page.
+
+        With a sort key, the page is read from the vertex-centric index of the
+        labels on this edge property, starting at the value of the last
+        element of the previous page, so it only reads its own edges. Without
+        one, the elements are ordered by id, which sorts every adjacent
+        element for each page.
+
+        :param operation: The operation to be performed
+        :type operation: str
+        :param label_strings: The edge labels to be used
+        :type label_strings: list of str
+        :param allowed_elts: The labels of the allowed result elements
+        :type allowed_elts: list of str | None
+        :param page_size: The maximum number of elements of the page
+        :type page_size: int
+        :param after: The cursor of the previous page, None for the first
+            page
+        :type after: str
+        :param sort_key: The db field name of the edge property ordering the
+            pages
+        :type sort_key: str
+        :rtype: goblin.models.cursor.Page
+
+        """
+        if page_size < 1:
+            raise GoblinQueryError("page_size must be at least 1")
+        position = decode_cursor(after) if after is not None else None
+        seen = []
+        if sort_key is not None and position is not None:
+            # the value of the last element of the previous page, and the
+            # elements already returned with that value
+            try:
+                position, seen = position
+            except (TypeError, ValueError):
+                raise GoblinQueryError("Invalid cursor: {!r}".format(after))
+        future = connection.get_future(kwargs)
+        # one more element tells whether there is a next page
+        future_result = self._traversal_page(operation, label_strings,
+                                             allowed_elts, sort_key, position,
+                                             page_size + 1 + len(seen),
+                                             **kwargs)
+
+        def on_read(f2):
+            try:
+                results = f2.result()
+            except Exception as e:
+                future.set_exception(e)
+                return
+            if sort_key is None:
+                future.set_result(Page(results, page_size))
+                return
+            rows = [row for row in results
+                    if not (row[1] == position and row[0]._id in seen)]
+            next_cursor = None
+            if len(rows) > page_size:
+                value = rows[page_size - 1][1]
+                ties = seen if value == position else []
+                ties = ties + [element._id for element, key in
+                               rows[:page_size] if key == value]
+                next_cursor = encode_cursor([value, ties])
+            future.set_result(Page([row[0] for row in rows], page_size,
+                                   next_cursor))
+
+        def on_traversal(f):
+            try:
+                stream = f.result()
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future_read = connection.read_all(stream, **kwargs)
+                future_read.add_done_callback(on_read)
+
+        future_result.add_done_callback(on_traversal)
+        return future
+
     def _simple_deletion(self, operation, labels, **kwargs):
         """
         Perform simple bulk graph deletion operation.
@@ -394,6 +840,11 @@ class Vertex(Element):
         future_result = self._delete_related(operation, label_strings)
 
         def on_read(f2):
+            if operation in ('inE', 'outE'):
+                cache.invalidate_edges(self._id, label_strings)
+            else:
+                # the deleted neighbours aren't known
+                cache.clear()
             try:
                 result = f2.result()
             except Exception as e:
@@ -427,6 +878,13 @@ class Vertex(Element):
         :type offset: int or None
         :param types: A list of allowed element types
         :type types: list
+        :param page_size: Return a page of at most page_size elements ordered
+            by id (keyset pagination), with the cursor of the next page
+        :type page_size: int or None
+        :param after: The cursor of the previous page
+        :type after: str or None
+        :rtype: Future stream, or Future
+            :py:class:`Page<goblin.models.cursor.Page>` with page_size
 
         """
         return self._simple_traversal('outV', labels, **kwargs)
@@ -444,6 +902,13 @@ class Vertex(Element):
         :type offset: int or None
         :param types: A list of allowed element types
         :type types: list
+        :param page_size: Return a page of at most page_size elements ordered
+            by id (keyset pagination), with the cursor of the next page
+        :type page_size: int or None
+        :param after: The cursor of the previous page
+        :type after: str or None
+        :rtype: Future stream, or Future
+            :py:class:`Page<goblin.models.cursor.Page>` with page_size
 
         """
         return self._simple_traversal('inV', labels, **kwargs)
@@ -460,6 +925,16 @@ class Vertex(Element):
         :type offset: int or None
         :param types: A list of allowed element types
         :type types: list
+        :param page_size: Return a page of at most page_size elements ordered
+            by id (keyset pagination), with the cursor of the next page
+        :type page_size: int or None
+        :param after: The cursor of the previous page
+        :type after: str or None
+        :param resolve_endpoints: Read the vertices at both ends of the
+            edges found, with one query per message or page
+        :type resolve_endpoints: bool
+        :rtype: Future stream, or Future
+            :py:class:`Page<goblin.models.cursor.Page>` with page_size
 
         """
         return self._simple_traversal('outE', labels, **kwargs)
@@ -476,6 +951,16 @@ class Vertex(Element):
         :type offset: int or None
         :param types: A list of allowed element types
         :type types: list
+        :param page_size: Return a page of at most page_size elements ordered
+            by id (keyset pagination), with the cursor of the next page
+        :type page_size: int or None
+        :param after: The cursor of the previous page
+        :type after: str or None
+        :param resolve_endpoints: Read the vertices at both ends of the
+            edges found, with one query per message or page
+        :type resolve_endpoints: bool
+        :rtype: Future stream, or Future
+            :py:class:`Page<goblin.models.cursor.Page>` with page_size
 
         """
         return self._simple_traversal('inE', labels, **kwargs)
@@ -492,6 +977,16 @@ class Vertex(Element):
         :type offset: int or None
         :param types: A list of allowed element types
         :type types: list
+        :param page_size: Return a page of at most page_size elements ordered
+            by id (keyset pagination), with the cursor of the next page
+        :type page_size: int or None
+        :param after: The cursor of the previous page
+        :type after: str or None
+        :param resolve_endpoints: Read the vertices at both ends of the
+            edges found, with one query per message or page
+        :type resolve_endpoints: bool
+        :rtype: Future stream, or Future
+            :py:class:`Page<goblin.models.cursor.Page>` with page_size
 
         """
         return self._simple_traversal('bothE', labels, **kwargs)
@@ -508,6 +1003,13 @@ class Vertex(Element):
         :type offset: int or None
         :param types: A list of allowed element types
         :type types: list
+        :param page_size: Return a page of at most page_size elements ordered
+            by id (keyset pagination), with the cursor of the next page
+        :type page_size: int or None
+        :param after: The cursor of the previous page
+        :type after: str or None
+        :rtype: Future stream, or Future
+            :py:class:`Page<goblin.models.cursor.Page>` with page_size
 
         """
         return self._simple_traversal('bothV', labels, **kwargs)
@@ -1 +1,2 @@
 from .relationship import Relationship
+from .prefetch import prefetch_related
@@ -0,0 +1,157 @@
+"""
+Eager loading of relationships.
+
+:py:func:`prefetch_related` reads the vertices related to a whole list of
+vertices along the named :py:class:`Relationship<goblin.relationships.Relationship>`
+attributes with a single query, instead of one query per vertex and
+relationship, and attaches them to each vertex, where the ``prefetched``
+attribute of its relationships returns them::
+
+    >>> people = yield from Person.all(ids, prefetch=['friends'])
+    >>> for person in (yield from people.read()):
+    ...     print(person.name, [f.name for f in person.friends.prefetched])
+"""
+from __future__ import unicode_literals
+import logging
+
+from goblin import connection
+from goblin._compat import string_types
+from goblin.exceptions import GoblinRelationshipException
+from .relationship import Relationship
+
+
+logger = logging.getLogger(__name__)
+
+
+def _relationship(vertex, name):
+    relationship = type(vertex)._relationships.get(name)
+    if not isinstance(relationship, Relationship):
+        raise GoblinRelationshipException(
+            "{} has no relationship named {}".format(
+                type(vertex).__name__, name))
+    return relationship
+
+
+def prefetch_related(vertices, names, **kwargs):
+    """
+    Read the vertices related to each of the given vertices along the named
+    relationships, in one query, and attach them to the vertices. A vertex
+    related to several of them is read once and attached to each as the
+    same instance.
+
+    :param vertices: The saved vertices
+    :type vertices: list[goblin.models.Vertex]
+    :param names: The names of the relationship attributes
+    :type names: list[str] | str
+    :rtype: Future list of the given vertices
+    """
+    if isinstance(names, string_types):
+        names = [names]
+    vertices = list(vertices)
+    kwargs = connection.pop_execute_query_kwargs(kwargs)
+    future = connection.get_future(kwargs)
+    # vertices of different classes may define different relationships under
+    # the same name, each is read on its own
+    relationships = []
+    positions = {}
+    for vertex in vertices:
+        if vertex._id is None:
+            raise GoblinRelationshipException(
+                "Relationships can only be prefetched for saved vertices")
+        prefetched = vertex.__dict__.setdefault('_prefetched', {})
+        for name in names:
+            relationship = _relationship(vertex, name)
+            prefetched[relationship] = []
+            if relationship not in positions:
+                positions[relationship] = len(relationships)
+                relationships.append((relationship, []))
+            relationships[positions[relationship]][1].append(vertex)
+
+    if not relationships:
+        future.set_result(vertices)
+        return future
+
+    specs = [[[vertex._id for vertex in sources], relationship.direction,
+              [e.get_label() for e in relationship.edge_classes],
+              [v.get_label() for v in relationship.vertex_classes]]
+             for relationship, sources in relationships]
+
+    def on_read(f2):
+        try:
+            [[related, rows]] = f2.result()
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            # a vertex related to several sources is sent once
+            related = {vertex._id: vertex for vertex in related}
+            for index, position, related_id in rows:
+                relationship, sources = relationships[index]
+                sources[position]._prefetched[relationship].append(
+                    related[related_id])
+            future.set_result(vertices)
+
+    def on_prefetch(f):
+        try:
+            stream = f.result()
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future_read = connection.read_all(stream, **kwargs)
+            future_read.add_done_callback(on_read)
+
+    from goblin.models.vertex import Vertex
+    future_result = Vertex._prefetch_relationships(specs, **kwargs)
+    future_result.add_done_callback(on_prefetch)
+    return future
+
+
+class PrefetchStream(object):
+    """
+    Response stream of vertices prefetching the named relationships of each
+    message it reads, with one query per message
+
+    :param stream: The stream of the vertices
+    :param list names: The names of the relationships
+    """
+
+    def __init__(self, stream, names, **kwargs):
+        self._stream = stream
+        self._names = names
+        self._kwargs = kwargs
+
+    def add_handler(self, handler):
+        self._stream.add_handler(handler)
+
+    def read(self):
+        future = connection.get_future(self._kwargs)
+
+        def on_read(f):
+            try:
+                results = f.result()
+            except Exception as e:
+                future.set_exception(e)
+                return
+            if not results:
+                future.set_result(results)
+                return
+
+            def on_prefetch(f2):
+                try:
+                    f2.result()
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(results)
+
+            vertices = results.values() if isinstance(results, dict) \
+                else results
+            try:
+                future_prefetch = prefetch_related(vertices, self._names,
+                                                   **self._kwargs)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future_prefetch.add_done_callback(on_prefetch)
+
+        self._stream.read().add_done_callback(on_read)
+        return future
@@ -13,6 +13,51 @@ from goblin.tools import LazyImportClass
 
 logger = logging.getLogger(__name__)
 
+# scripts are fixed texts so the server compiles each of them only once
+_edge_scripts = {OUT: "g.V(vid).outE(*elabels)",
+                 IN: "g.V(vid).inE(*elabels)",
+                 BOTH: "g.V(vid).bothE(*elabels)"}
+_vertex_steps = {IN: ".inV().hasLabel(*vlabels)",
+                 OUT: ".outV().hasLabel(*vlabels)",
+                 'other': ".otherV().hasLabel(*vlabels)"}
+_order_steps = {False: ".order().by(okey, incr)",
+                True: ".order().by(okey, decr)"}
+# traversal operations of the keyset paginated queries, keyed by direction
+_vertex_operations = {OUT: 'outV', IN: 'inV', BOTH: 'bothV'}
+_edge_operations = {OUT: 'outE', IN: 'inE', BOTH: 'bothE'}
+
+
+def _field_name(name, model_classes):
+    """ The db field name of a property of the given model classes """
+    for model_class in model_classes:
+        if isinstance(model_class, LazyImportClass):
+            model_class = model_class.klass
+        prop = model_class._properties.get(name)
+        if prop is not None:
+            return prop.db_field_name
+    return name
+
+
+def _order_key(name, model_classes):
+    """ The db field name ordering the elements of the given model classes by
+    a property, which each of them must define under the same field, since
+    the server fails to order the elements missing it """
+    fields = set()
+    for model_class in model_classes:
+        if isinstance(model_class, LazyImportClass):
+            model_class = model_class.klass
+        prop = model_class._properties.get(name)
+        if prop is None:
+            raise GoblinRelationshipException(
+                "Can't order by {}, {} has no such property".format(
+                    name, model_class.__name__))
+        fields.add(prop.db_field_name)
+    if len(fields) > 1:
+        raise GoblinRelationshipException(
+            "Can't order by {}, it is stored as {}".format(
+                name, ', '.join(sorted(fields))))
+    return fields.pop() if fields else name
+
 
 def requires_vertex(method):
     @wraps(method)
@@ -84,44 +129,168 @@ class Relationship(object):
         return model_classes
 
     @requires_vertex
-    def vertices(self, limit=None, **kwargs):
+    def vertices(self, limit=None, offset=None, order_by=None, page_size=None,
+                 after=None, sort_key=None, **kwargs):
         """ Query and return all Vertices attached to the current Vertex
 
-        TODO: fix this, the instance method isn't properly setup
         :param limit: Limit the number of returned results
         :type limit: int | long
-        :param offset: Query offset of the number of paginated results
+        :param offset: Skip this many results before returning any
         :type offset: int | long
+        :param order_by: Order the results by this property, descending if
+            the name starts with '-'. Every related class must define it, and
+            the query fails on the server if a related element has no value
+            for it
+        :type order_by: str
+        :param page_size: Return a page of at most page_size vertices ordered
+            by sort_key, or by id (keyset pagination), with the cursor of the
+            next page
+        :type page_size: int
+        :param after: The cursor of the previous page
+        :type after: str
+        :param sort_key: The edge property ordering the pages, which should
+            have a vertex-centric index on the edge labels
+        :type sort_key: str
         :param callback: (Optional) Callback function to handle results
         :type callback: method
-        :rtype: List[goblin.models.Edge] | Object
+        :rtype: List[goblin.models.Vertex] | Object
         """
+        if page_size is not None:
+            self._check_page(offset, order_by)
+            vlabels = [v.get_label() for v in self.vertex_classes]
+            return self._get_page(_vertex_operations, vlabels, page_size,
+                                  after, sort_key, **kwargs)
         script, bindings = self._vertices()
-        return self._get_elements(script, bindings, limit=limit, **kwargs)
+        script = self._slice(script, bindings, self.vertex_classes, limit,
+                             offset, order_by)
+        return self._get_elements(script, bindings, **kwargs)
 
     @requires_vertex
-    def edges(self, limit=None, **kwargs):
+    def edges(self, limit=None, offset=None, order_by=None, page_size=None,
+              after=None, sort_key=None, **kwargs):
         """ Query and return all Edges attached to the current Vertex
 
-        TODO: fix this, the instance method isn't properly setup
         :param limit: Limit the number of returned results
         :type limit: int | long
-        :param offset: Query offset of the number of paginated results
+        :param offset: Skip this many results before returning any
         :type offset: int | long
+        :param order_by: Order the results by this property, descending if
+            the name starts with '-'. Every related class must define it, and
+            the query fails on the server if a related element has no value
+            for it
+        :type order_by: str
+        :param page_size: Return a page of at most page_size edges ordered by
+            sort_key, or by id (keyset pagination), with the cursor of the
+            next page
+        :type page_size: int
+        :param after: The cursor of the previous page
+        :type after: str
+        :param sort_key: The edge property ordering the pages, which should
+            have a vertex-centric index on the edge labels
+        :type sort_key: str
         :param callback: (Optional) Callback function to handle results
         :type callback: method
         :rtype: List[goblin.models.Edge] | Object
         """
+        if page_size is not None:
+            self._check_page(offset, order_by)
+            return self._get_page(_edge_operations, None, page_size, after,
+                                  sort_key, **kwargs)
         script, bindings = self._edges()
-        return self._get_elements(script, bindings, limit=limit, **kwargs)
+        script = self._slice(script, bindings, self.edge_classes, limit,
+                             offset, order_by)
+        return self._get_elements(script, bindings, **kwargs)
 
-    def _get_elements(self, script, bindings, limit=None, **kwargs):
-        """ Query and return all Vertices attached to the current Vertex
+    @requires_vertex
+    def count(self, edges=False, **kwargs):
+        """ Count the Vertices (or Edges) attached to the current Vertex
+
+        :param edges: Count the edges rather than the vertices
+        :type edges: bool
+        :rtype: int
+        """
+        script, bindings = self._edges() if edges else self._vertices()
+        future = connection.get_future(kwargs)
+        future_results = connection.execute_query(
+            script + ".count()", bindings=bindings,
+            handler=lambda results: results or [], **kwargs)
+
+        def on_read(f2):
+            try:
+                result = f2.result()
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result[0] if result else 0)
+
+        def on_count(f):
+            try:
+                stream = f.result()
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future_read = connection.read_all(stream, **kwargs)
+                future_read.add_done_callback(on_read)
+
+        future_results.add_done_callback(on_count)
+        return future
+
+    @staticmethod
+    def _check_page(offset, order_by):
+        if offset is not None or order_by is not None:
+            raise GoblinRelationshipException(
+                "offset and order_by can't be combined with page_size, pages "
+                "are ordered by sort_key or id and resume after a cursor")
+
+    @staticmethod
+    def _slice(script, bindings, model_classes, limit, offset, order_by):
+        """ Append the ordering and range steps to a relationship script
+
+        :rtype: str
+        """
+        if order_by is not None:
+            descending = order_by.startswith('-')
+            name = order_by.lstrip('-')
+            bindings["okey"] = _order_key(name, model_classes)
+            script += _order_steps[descending]
+        if limit is not None or offset is not None:
+            if (limit is not None and limit < 0) or \
+                    (offset is not None and offset < 0):
+                raise GoblinRelationshipException(
+                    "limit and offset can't be negative")
+            low = offset or 0
+            bindings.update({"low": low,
+                             "high": low + limit if limit is not None else -1})
+            script += ".range(low, high)"
+        return script
+
+    @property
+    @requires_vertex
+    def prefetched(self):
+        """ The vertices attached to the current Vertex by
+        :py:func:`prefetch_related<goblin.relationships.prefetch.prefetch_related>`,
+        None if this relationship wasn't prefetched
+
+        :rtype: list[goblin.models.Vertex] | None
+        """
+        return getattr(self.top_level_vertex, '_prefetched', {}).get(self)
+
+    def _get_page(self, operations, allowed_labels, page_size, after,
+                  sort_key=None, **kwargs):
+        """ Read a page of the related elements with keyset pagination
+
+        :rtype: goblin.models.cursor.Page
+        """
+        elabels = [e.get_label() for e in self.edge_classes]
+        if sort_key is not None:
+            sort_key = _field_name(sort_key, self.edge_classes)
+        return self.top_level_vertex._keyset_traversal(
+            operations.get(self.direction, operations[BOTH]), elabels,
+            allowed_labels, page_size, after, sort_key, **kwargs)
+
+    def _get_elements(self, script, bindings, **kwargs):
+        """ Query and return the elements of a relationship script
 
-        :param limit: Limit the number of returned results
-        :type limit: int | long
-        :param offset: Query offset of the number of paginated results
-        :type offset: int | long
         :param callback: (Optional) Callback function to handle results
         :type callback: method
         :rtype: List[goblin.models.Vertex] | Object
@@ -148,7 +317,7 @@ class Relationship(object):
             vertex = 'other'
         vlabels = [v.get_label() for v in self.vertex_classes]
         script, bindings = self._edges()
-        script += ".%sV().hasLabel(*vlabels)" % (vertex, )
+        script += _vertex_steps[vertex]
         bindings.update({"vlabels": vlabels})
         return script, bindings
 
@@ -160,7 +329,7 @@ class Relationship(object):
         else:
             edge = BOTH
         elabels = [e.get_label() for e in self.edge_classes]
-        script = "g.V(vid).%sE(*elabels)" % (edge, )
+        script = _edge_scripts[edge]
         bindings = {"vid": self.top_level_vertex.id, "elabels": elabels}
         return script, bindings
 
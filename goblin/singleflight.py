@@ -0,0 +1,170 @@
+"""
+Shares one server request between identical in-flight read queries.
+
+While a query sent with ``singleflight=True`` is running, callers executing
+the same script with the same bindings don't send a request of their own:
+they get a stream replaying the messages of the running request.
+"""
+from __future__ import unicode_literals
+import json
+import logging
+
+from goblin import connection
+
+
+logger = logging.getLogger(__name__)
+
+# running requests, keyed by query, bindings and connection settings
+_in_flight = {}
+
+
+def request_key(query, bindings, pool, aliases):
+    """
+    Key identifying a request, or None if its bindings can't be compared
+
+    :param str query: The Gremlin query
+    :param dict bindings: Bindings for the query
+    :param pool: The pool the request is sent with
+    :param dict aliases: The graph and traversal source aliases
+    """
+    try:
+        bindings = json.dumps(bindings, sort_keys=True)
+    except (TypeError, ValueError):
+        return None
+    return (query, bindings, pool, tuple(sorted(aliases.items())))
+
+
+class SharedResponse(object):
+    """
+    Reads every message of a stream once, and keeps them so they can be
+    replayed to each caller sharing the request.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.messages = []
+        self.error = None
+        self.done = False
+        self.waiters = []
+
+    def consume(self, future_stream, **kwargs):
+        """ Read the whole response of the request sent by ``future_stream`` """
+
+        def finish(error=None):
+            self.error = error
+            self.done = True
+            if _in_flight.get(self.key) is self:
+                del _in_flight[self.key]
+            self._wake()
+
+        def read_next(stream):
+            future_read = stream.read()
+            future_read.add_done_callback(lambda f: on_read(f, stream))
+
+        def on_read(f, stream):
+            try:
+                message = f.result()
+            except Exception as e:
+                finish(e)
+            else:
+                if message is None:
+                    finish()
+                else:
+                    self.messages.append(message)
+                    self._wake()
+                    # read again once the stream has processed this message
+                    connection.call_later(0, lambda: read_next(stream),
+                                          **kwargs)
+
+        def on_send(f):
+            try:
+                stream = f.result()
+            except Exception as e:
+                finish(e)
+            else:
+                read_next(stream)
+
+        future_stream.add_done_callback(on_send)
+
+    def _wake(self):
+        waiters, self.waiters = self.waiters, []
+        for waiter in waiters:
+            waiter()
+
+
+class SharedStream(object):
+    """
+    Stream replaying the messages of a :class:`SharedResponse`. Provides the
+    same ``read``/``add_handler`` interface as
+    :py:class:`gremlinclient.connection.Stream`.
+    """
+
+    def __init__(self, response, handler, future_class):
+        self._response = response
+        self._future_class = future_class
+        self._position = 0
+        self._closed = False
+        self._handlers = []
+        if handler is not None:
+            self._handlers.append(handler)
+
+    def add_handler(self, handler):
+        self._handlers.append(handler)
+
+    def read(self):
+        """
+        Read the next message of the response
+
+        :returns: Future message, or None once the response is exhausted
+        """
+        future = self._future_class()
+        self._read(future)
+        return future
+
+    def _read(self, future):
+        response = self._response
+        if self._position < len(response.messages):
+            message = response.messages[self._position]
+            self._position += 1
+            try:
+                future.set_result(self._process(message))
+            except Exception as e:
+                future.set_exception(e)
+        elif response.done:
+            if response.error is not None and not self._closed:
+                self._closed = True
+                future.set_exception(response.error)
+            else:
+                future.set_result(None)
+        else:
+            response.waiters.append(lambda: self._read(future))
+
+    def _process(self, message):
+        if self._handlers:
+            message = message.data
+            for handler in self._handlers:
+                message = handler(message)
+        return message
+
+
+def execute_query(send, key, handler, future_class, **kwargs):
+    """
+    Join the running request identified by ``key``, or start it with
+    ``send``.
+
+    :param send: Callable sending the request without handler, returns a
+        future stream
+    :param key: Key returned by :func:`request_key`
+    :param handler: Handler of this caller
+    :param class future_class: type of Future
+    :returns: Future :class:`SharedStream`
+    """
+    response = _in_flight.get(key)
+    if response is None:
+        response = _in_flight[key] = SharedResponse(key)
+        response.consume(send(), future_class=future_class, **kwargs)
+    else:
+        logger.debug("Joining in-flight request for %s", key[0])
+    future = future_class()
+    future.set_result(SharedStream(response, handler, future_class))
+    return future
@@ -12,52 +12,74 @@ def get_existing_indices():
     return vertex_indices, edge_indices
 
 
-def make_property_key(name, data_type, cardinality, graph_name=None, **kwargs):
-    graph_name = graph_name or connection._graph_name or "graph"
-    script = """
+# Schema scripts are fixed texts with every name passed as a binding, so the
+# server compiles each of them only once
+MAKE_PROPERTY_KEY = """
         try {
+            def data_types = [String: String, Character: Character,
+                              Boolean: Boolean, Byte: Byte, Short: Short,
+                              Integer: Integer, Long: Long, Float: Float,
+                              Double: Double, Date: Date, UUID: UUID,
+                              Geoshape: Geoshape, Object: Object]
+            if (!data_types.containsKey(data_type)) {
+                throw new IllegalArgumentException(
+                    "Unknown data type: " + data_type)
+            }
             mgmt = graph.openManagement()
-            name = mgmt.makePropertyKey('%s').dataType(%s.class).cardinality(Cardinality.%s).make()
+            name = mgmt.makePropertyKey(key_name).dataType(data_types[data_type]).cardinality(Cardinality.valueOf(cardinality)).make()
             mgmt.commit()
         } catch (err) {
             graph.tx().rollback()
             throw(err)
-        }""" % (name, data_type, cardinality)
-    return _property_handler(script, graph_name, **kwargs)
-
+        }"""
 
-def get_property_key(name, graph_name=None, **kwargs):
-    graph_name = graph_name or connection._graph_name or "graph"
-    script = """
+GET_PROPERTY_KEY = """
         try {
             mgmt = graph.openManagement()
-            prop = mgmt.getPropertyKey('%s')
+            prop = mgmt.getPropertyKey(key_name)
             return prop
         } catch (err) {
             graph.tx().rollback()
             throw(error)
-        } """ % (name)
-    # This returns a vertex...?
-    return _property_handler(script, graph_name, **kwargs)
-
+        } """
 
-def change_property_key_name(old_name, new_name, graph_name=None, **kwargs):
-    script = """
+CHANGE_PROPERTY_KEY_NAME = """
         try {
             mgmt = graph.openManagement()
-            prop = mgmt.getPropertyKey('%s')
-            mgmt.changeName(prop, '%s')
+            prop = mgmt.getPropertyKey(old_name)
+            mgmt.changeName(prop, new_name)
             mgmt.commit()
         } catch (err) {
             graph.tx().rollback()
             throw(err)
-        }""" % (old_name, new_name)
-    return _property_handler(script, graph_name, **kwargs)
+        }"""
+
+
+def make_property_key(name, data_type, cardinality, graph_name=None, **kwargs):
+    graph_name = graph_name or connection._graph_name or "graph"
+    bindings = {'key_name': name, 'data_type': data_type,
+                'cardinality': cardinality}
+    return _property_handler(MAKE_PROPERTY_KEY, bindings, graph_name,
+                             **kwargs)
+
+
+def get_property_key(name, graph_name=None, **kwargs):
+    graph_name = graph_name or connection._graph_name or "graph"
+    # This returns a vertex...?
+    return _property_handler(GET_PROPERTY_KEY, {'key_name': name},
+                             graph_name, **kwargs)
+
+
+def change_property_key_name(old_name, new_name, graph_name=None, **kwargs):
+    bindings = {'old_name': old_name, 'new_name': new_name}
+    return _property_handler(CHANGE_PROPERTY_KEY_NAME, bindings, graph_name,
+                             **kwargs)
 
 
-def _property_handler(script, graph_name, **kwargs):
+def _property_handler(script, bindings, graph_name, **kwargs):
     future = connection.get_future(kwargs)
-    future_response = connection.execute_query(script, graph_name=graph_name)
+    future_response = connection.execute_query(script, bindings=bindings,
+                                               graph_name=graph_name)
 
     def on_read(f2):
         try:
@@ -1 +1,2 @@
-from .base import BaseGoblinTestCase, testcase_docstring_sub
+from .base import (BaseGoblinTestCase, BaseMemoryGoblinTestCase,
+                   requires_gremlin_server, testcase_docstring_sub)
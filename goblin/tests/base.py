@@ -1,15 +1,24 @@
 from __future__ import unicode_literals
-from unittest import TestCase
+from unittest import TestCase, skipIf
 from nose.tools import nottest
 from tornado import concurrent
 from tornado.ioloop import IOLoop
 from tornado.testing import gen_test, AsyncTestCase
 from gremlinclient.tornado_client import Pool
+from goblin import memory_client
+from goblin import connection
 from goblin.connection import setup, sync_spec, tear_down
 from goblin.models import Vertex, Edge
 from goblin.properties import Double, Integer, String
 import os
 
+# set GOBLIN_TEST_POOL=memory to run the tests without a Gremlin Server; the
+# ones that send scripts the in-memory server does not emulate are skipped
+MEMORY_POOL = os.environ.get('GOBLIN_TEST_POOL') == 'memory'
+
+requires_gremlin_server = skipIf(
+    MEMORY_POOL, 'needs a Gremlin Server, the in-memory pool is active')
+
 _val = 0
 
 
@@ -19,6 +28,16 @@ def counter():
     return _val
 
 
+class FakeClock(object):
+    """ A clock for the caches that only moves when ``now`` is changed """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
 class TestVertexModel(Vertex):
     label = 'test_vertex_model'
 
@@ -68,10 +87,15 @@ def testcase_docstring_sub(*sub):
 
 class BaseGoblinTestCase(AsyncTestCase):
 
+    if MEMORY_POOL:
+        pool_class = memory_client.Pool
+    else:
+        pool_class = Pool
+
     @classmethod
     def setUpClass(cls):
         super(BaseGoblinTestCase, cls).setUpClass()
-        setup("ws://localhost:8182/", pool_class=Pool,
+        setup("ws://localhost:8182/", pool_class=cls.pool_class,
               future_class=concurrent.Future)
 
     @classmethod
@@ -139,3 +163,18 @@ class BaseGoblinTestCase(AsyncTestCase):
 
     def assertIsEdge(self, obj):
         self.assertIsSubclass(obj, Edge)
+
+
+class BaseMemoryGoblinTestCase(BaseGoblinTestCase):
+    """ Runs against the in-process server from :py:mod:`goblin.memory_client` """
+
+    pool_class = memory_client.Pool
+
+    def setUp(self):
+        super(BaseMemoryGoblinTestCase, self).setUp()
+        self.server.graph.clear()
+        self.server.reset_stats()
+
+    @property
+    def server(self):
+        return connection._connection_pool.server
@@ -0,0 +1,3 @@
+def get_self(eid) {
+    g.V(eid).next()
+}
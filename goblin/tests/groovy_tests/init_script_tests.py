@@ -0,0 +1,79 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado import concurrent
+from tornado.testing import gen_test
+
+from goblin import connection, gremlin
+from goblin.exceptions import GoblinGremlinException
+from goblin.gremlin.init_script import (generate_init_script,
+                                        registered_methods)
+from goblin.models import Vertex
+from goblin.tests.base import (BaseMemoryGoblinTestCase, TestVertexModel,
+                               TestEdgeModel)
+from goblin.tests.groovy_tests.method_loading_tests import GroovyTestModel
+
+
+class ConflictingModel(Vertex):
+    gremlin_path = 'init_script_conflict.groovy'
+    get_self = gremlin.GremlinMethod()
+
+
+@attr('unit', 'gremlin', 'init_script')
+class TestInitScript(BaseMemoryGoblinTestCase):
+
+    def test_functions_are_defined_once(self):
+        script = generate_init_script([TestVertexModel, TestEdgeModel,
+                                       GroovyTestModel])
+        methods = registered_methods([TestVertexModel, TestEdgeModel,
+                                      GroovyTestModel])
+        self.assertIn('_save_vertex', methods)
+        self.assertIn('_save_edge', methods)
+        self.assertIn('get_self', methods)
+        for name, method in methods.items():
+            self.assertEqual(script.count('\ndef {}('.format(name)), 1)
+            self.assertIn(method.function_def.rstrip(), script)
+        lines = script.splitlines()
+        imports = [line for line in lines if line.startswith('import ')]
+        self.assertTrue(imports)
+        self.assertEqual(len(imports), len(set(imports)))
+        first_def = min(i for i, line in enumerate(lines)
+                        if line.startswith('def '))
+        self.assertTrue(all(lines.index(imp) < first_def
+                            for imp in imports))
+
+    def test_conflicting_definitions(self):
+        with self.assertRaises(GoblinGremlinException):
+            registered_methods([GroovyTestModel, ConflictingModel])
+
+
+@attr('unit', 'gremlin', 'init_script')
+class TestRegisteredMethods(BaseMemoryGoblinTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestRegisteredMethods, cls).setUpClass()
+        connection.setup("ws://localhost:8182/", pool_class=cls.pool_class,
+                         future_class=concurrent.Future,
+                         registered_methods=True)
+
+    @gen_test
+    def test_calls_send_invocations(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        e1 = yield TestEdgeModel.create(v1, v2, name='e1')
+        stream = yield v1.outV()
+        vertices = yield stream.read()
+        self.assertEqual([v.id for v in vertices], [v2.id])
+        yield e1.delete()
+        yield v1.delete()
+
+        self.assertEqual(
+            sorted(self.server.script_counts),
+            ['_delete_edge(eid)', '_delete_vertex(vid)',
+             '_save_edge(eid, outV, inV, elabel, attrs, geo_attrs, '
+             'exclusive, read_back, version)',
+             '_save_vertex(vid, vlabel, attrs, geo_attrs, read_back, '
+             'version)',
+             '_traversal(vid, operation, labels, start, end, '
+             'element_types)'])
+        self.assertEqual(len(self.server.graph.vertices), 1)
@@ -7,7 +7,7 @@ from nose.plugins.attrib import attr
 from tornado.testing import gen_test
 
 from goblin.exceptions import GoblinGremlinException
-from goblin.tests.base import BaseGoblinTestCase
+from goblin.tests.base import BaseGoblinTestCase, requires_gremlin_server
 
 from goblin.models import Vertex
 from goblin import properties
@@ -30,6 +30,7 @@ class GroovyTestModel(Vertex):
 
 
 @attr('unit', 'gremlin')
+@requires_gremlin_server
 class TestMethodLoading(BaseGoblinTestCase):
 
     @gen_test
@@ -48,6 +49,7 @@ class TestMethodLoading(BaseGoblinTestCase):
 
 
 @attr('unit', 'gremlin', 'gremlin2')
+@requires_gremlin_server
 class TestMethodArgumentHandling(BaseGoblinTestCase):
 
     @gen_test
@@ -5,7 +5,7 @@ from uuid import uuid4
 from nose.plugins.attrib import attr
 
 from goblin.exceptions import GoblinGremlinException, GoblinException
-from goblin.tests.base import BaseGoblinTestCase
+from goblin.tests.base import BaseGoblinTestCase, requires_gremlin_server
 
 from goblin.models import Vertex
 from goblin import properties
@@ -28,6 +28,7 @@ class GroovyTestModel2(Vertex):
 
 
 @attr('unit', 'gremlin', 'gremlin_table')
+@requires_gremlin_server
 class TestGremlinTable(BaseGoblinTestCase):
 
     def test_method_loads_and_works(self):
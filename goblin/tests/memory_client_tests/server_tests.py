@@ -0,0 +1,106 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado.testing import gen_test
+
+from goblin import connection
+from goblin.memory_client import GremlinServer, Pool
+from goblin.tests.base import (BaseMemoryGoblinTestCase, TestVertexModel,
+                               TestEdgeModel)
+
+
+@attr('unit', 'memory_client')
+class GremlinServerTestCase(BaseMemoryGoblinTestCase):
+
+    def test_setup(self):
+        self.assertIsInstance(connection._connection_pool, Pool)
+        self.assertIsInstance(self.server, GremlinServer)
+        self.assertEqual(connection._client_module, 'memory_client')
+
+    @gen_test
+    def test_groovy_methods(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        e1 = yield TestEdgeModel.create(v1, v2, test_val=3)
+        self.assertIn(v1.id, self.server.graph.vertices)
+        self.assertIn(e1.id, self.server.graph.edges)
+
+        stream = yield v1.outV()
+        results = yield stream.read()
+        self.assertEqual(results, [v2])
+
+        stream = yield TestEdgeModel.get_between(v1, v2)
+        results = yield stream.read()
+        self.assertEqual(results, [e1])
+
+        yield v1.delete()
+        self.assertNotIn(v1.id, self.server.graph.vertices)
+        self.assertNotIn(e1.id, self.server.graph.edges)
+        yield v2.delete()
+
+    @gen_test
+    def test_graphson_results(self):
+        v1 = yield TestVertexModel.create(name='v1', test_val=5)
+        stream = yield connection.execute_query('g.V(vid)', {'vid': v1.id})
+        message = yield stream.read()
+        self.assertEqual(message.status_code, 200)
+        data = message.data[0]
+        self.assertEqual(data['type'], 'vertex')
+        self.assertEqual(data['label'], TestVertexModel.get_label())
+        name = TestVertexModel.get_property_by_name('name')
+        self.assertEqual(data['properties'][name][0]['value'], 'v1')
+        yield v1.delete()
+
+    @gen_test
+    def test_script_errors(self):
+        stream = yield connection.execute_query('g.V(vid).next()',
+                                                {'vid': -1})
+        with self.assertRaises(RuntimeError) as cm:
+            yield stream.read()
+        self.assertTrue(str(cm.exception).startswith('597'))
+
+    @gen_test
+    def test_result_batches(self):
+        self.server.batch_size = 2
+        try:
+            vertices = []
+            for i in range(3):
+                v = yield TestVertexModel.create(name='v{}'.format(i))
+                vertices.append(v)
+            stream = yield connection.execute_query(
+                'g.V(*eids)', {'eids': [v.id for v in vertices]})
+            message = yield stream.read()
+            self.assertEqual(message.status_code, 206)
+            self.assertEqual(len(message.data), 2)
+            message = yield stream.read()
+            self.assertEqual(message.status_code, 200)
+            self.assertEqual(len(message.data), 1)
+            message = yield stream.read()
+            self.assertIsNone(message)
+        finally:
+            self.server.batch_size = 64
+
+    @gen_test
+    def test_failed_request_rolls_back(self):
+        save_vertex = self.server.functions['_save_vertex']
+
+        def failing_save(graph, **bindings):
+            save_vertex(graph, **bindings)
+            raise ValueError('boom')
+
+        self.server.register_function('_save_vertex', failing_save)
+        try:
+            with self.assertRaises(RuntimeError):
+                yield TestVertexModel.create(name='v1')
+        finally:
+            self.server.register_function('_save_vertex', save_vertex)
+        self.assertEqual(len(self.server.graph.vertices), 0)
+        self.assertEqual(self.server.graph.commits, 0)
+
+    @gen_test
+    def test_script_counts(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        yield TestVertexModel.get(v1.id)
+        yield TestVertexModel.get(v1.id)
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(
+            self.server.script_counts['g.V(*eids).hasLabel(x)'], 2)
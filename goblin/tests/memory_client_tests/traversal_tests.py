@@ -0,0 +1,106 @@
+from __future__ import unicode_literals
+from unittest import TestCase
+from nose.plugins.attrib import attr
+
+from goblin.memory_client.graph import MemoryGraph
+from goblin.memory_client.traversal import (ScriptError, Traversal,
+                                            compile_traversal)
+
+
+@attr('unit', 'memory_client')
+class TraversalTestCase(TestCase):
+
+    def setUp(self):
+        self.graph = MemoryGraph()
+        self.jon = self.graph.add_vertex('person')
+        self.jon.property('name', 'Jon')
+        self.jon.property('age', 143)
+        self.eric = self.graph.add_vertex('person')
+        self.eric.property('name', 'Eric')
+        self.eric.property('age', 25)
+        self.physics = self.graph.add_vertex('course')
+        self.graph.add_edge('enrolled_in', self.eric, self.physics)
+        self.graph.add_edge('taught_by', self.physics, self.jon)
+
+    def run_script(self, script, **bindings):
+        return Traversal(self.graph, bindings).run(compile_traversal(script))
+
+    def test_compile(self):
+        source, steps = compile_traversal(
+            "g.V(vid).has('name', eq(b0)).out(*b1)")
+        self.assertEqual(source, 'g')
+        self.assertEqual([s[0] for s in steps], ['V', 'has', 'out'])
+        self.assertEqual(steps[1][1][0], ('literal', 'name'))
+        self.assertEqual(steps[2][1][0], ('spread', 'b1'))
+
+    def test_compile_error(self):
+        with self.assertRaises(ScriptError):
+            compile_traversal("g.V(vid")
+
+    def test_ids_and_labels(self):
+        results = self.run_script('g.V(*eids).hasLabel(x)',
+                                  eids=[self.eric.id, self.jon.id],
+                                  x='person')
+        self.assertEqual(results, [self.eric, self.jon])
+        results = self.run_script('g.V(*eids).hasLabel(x)', eids=[],
+                                  x='course')
+        self.assertEqual(results, [self.physics])
+
+    def test_string_ids(self):
+        results = self.run_script('g.V(vid)', vid=str(self.jon.id))
+        self.assertEqual(results, [self.jon])
+
+    def test_has_predicates(self):
+        results = self.run_script("g.V().has('age', gt(b0))", b0=30)
+        self.assertEqual(results, [self.jon])
+        results = self.run_script("g.V().has('name', within(*b0))",
+                                  b0=['Eric', 'Blake'])
+        self.assertEqual(results, [self.eric])
+
+    def test_vertex_steps(self):
+        self.assertEqual(self.run_script('g.V(vid).out()', vid=self.eric.id),
+                         [self.physics])
+        self.assertEqual(
+            self.run_script('g.V(vid).in(*labels)', vid=self.jon.id,
+                            labels=['taught_by']),
+            [self.physics])
+        self.assertEqual(
+            self.run_script('g.V(vid).in(*labels)', vid=self.jon.id,
+                            labels=['enrolled_in']),
+            [])
+        edges = self.run_script('g.V(vid).bothE()', vid=self.physics.id)
+        self.assertEqual(len(edges), 2)
+        self.assertEqual(
+            self.run_script('g.V(vid).outE().otherV()', vid=self.eric.id),
+            [self.physics])
+
+    def test_ranges_and_count(self):
+        self.assertEqual(self.run_script('g.V().count()'), [3])
+        self.assertEqual(self.run_script('g.V().limit(2)'),
+                         [self.jon, self.eric])
+        self.assertEqual(self.run_script('g.V().range(1, 2)'), [self.eric])
+
+    def test_order(self):
+        results = self.run_script(
+            "g.V().hasLabel(x).order().by('age', incr)", x='person')
+        self.assertEqual(results, [self.eric, self.jon])
+        results = self.run_script(
+            "g.V().hasLabel(x).order().by('age', decr).values('name')",
+            x='person')
+        self.assertEqual(results, ['Jon', 'Eric'])
+
+    def test_missing_binding(self):
+        with self.assertRaises(ScriptError):
+            self.run_script('g.V(vid)')
+
+    def test_rollback(self):
+        self.graph.begin()
+        vertex = self.graph.add_vertex('person')
+        self.jon.property('age', 144)
+        self.graph.remove_vertex(self.eric)
+        self.graph.rollback()
+        self.assertNotIn(vertex.id, self.graph.vertices)
+        self.assertEqual(self.jon.value('age'), 143)
+        self.assertIn(self.eric.id, self.graph.vertices)
+        self.assertEqual(len(self.eric.out_edges), 1)
+        self.assertEqual(self.graph.commits, 0)
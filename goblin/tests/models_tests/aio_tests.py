@@ -0,0 +1,197 @@
+from __future__ import unicode_literals
+import unittest
+
+from nose.plugins.attrib import attr
+from tornado import concurrent, gen
+from tornado.testing import gen_test
+
+from goblin._compat import PY35
+from goblin.exceptions import GoblinQueryError
+from goblin.models import V, Vertex
+from goblin.properties import String
+from goblin.relationships import Relationship
+from goblin.tests.base import (BaseMemoryGoblinTestCase, TestVertexModel,
+                               TestVertexModelDouble, TestEdgeModel)
+
+if PY35:
+    from goblin.models import aio
+
+
+class StreamingVertexModel(Vertex):
+    label = 'streaming_vertex_model'
+
+    name = String()
+    relation = Relationship(TestEdgeModel, TestVertexModel, 'out')
+
+
+class FakeStream(object):
+    """ Stream counting the messages read """
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.reads = 0
+
+    def read(self):
+        future = concurrent.Future()
+        if self.messages:
+            self.reads += 1
+            future.set_result(self.messages.pop(0))
+        else:
+            future.set_result(None)
+        return future
+
+
+@gen.coroutine
+def collect(iterator):
+    results = []
+    while True:
+        try:
+            result = yield iterator.__anext__()
+        except StopAsyncIteration:
+            break
+        results.append(result)
+    raise gen.Return(results)
+
+
+@unittest.skipUnless(PY35, "async/await requires Python 3.5+")
+@attr('unit', 'aio')
+class TestAsyncAPI(BaseMemoryGoblinTestCase):
+
+    @gen_test
+    def test_acreate_and_aget(self):
+        v1 = yield TestVertexModel.acreate(name='v1', test_val=1)
+        self.assertIsNotNone(v1.id)
+        v2 = yield TestVertexModel.aget(v1.id)
+        self.assertEqual(v2.id, v1.id)
+        self.assertEqual(v2.name, 'v1')
+        v3 = yield TestVertexModel.get(v1.id)
+        self.assertEqual(v3, v2)
+
+    @gen_test
+    def test_aget_errors(self):
+        v1 = yield TestVertexModel.acreate(name='v1')
+        with self.assertRaises(TestVertexModel.DoesNotExist):
+            yield TestVertexModel.aget(v1.id + 1000)
+        with self.assertRaises(TestVertexModelDouble.DoesNotExist):
+            yield TestVertexModelDouble.aget(v1.id)
+
+    @gen_test
+    def test_aall(self):
+        vertices = []
+        for i in range(5):
+            v = yield TestVertexModel.acreate(name='v{}'.format(i))
+            vertices.append(v)
+        self.server.batch_size = 2
+        results = yield collect(TestVertexModel.aall())
+        self.assertEqual(sorted(v.id for v in results),
+                         sorted(v.id for v in vertices))
+        results = yield collect(
+            TestVertexModel.aall([vertices[0].id, vertices[3].id]))
+        self.assertEqual([v.id for v in results],
+                         [vertices[0].id, vertices[3].id])
+        with self.assertRaises(GoblinQueryError):
+            yield collect(TestVertexModel.aall([vertices[0].id, 12345]))
+        results = yield collect(TestVertexModel.aall(
+            [vertices[0].id, 12345], allow_missing=True))
+        self.assertEqual([v.id for v in results], [vertices[0].id])
+
+    @gen_test
+    def test_aclose(self):
+        for i in range(5):
+            yield TestVertexModel.acreate(name='v{}'.format(i))
+        self.server.batch_size = 2
+        iterator = TestVertexModel.aall()
+        first = yield iterator.__anext__()
+        self.assertIsInstance(first, TestVertexModel)
+        yield iterator.aclose()
+        # the connection was released, the next query can run
+        v = yield TestVertexModel.aget(first.id)
+        self.assertEqual(v.id, first.id)
+
+    @gen_test
+    def test_edges(self):
+        v1 = yield TestVertexModel.acreate(name='v1')
+        v2 = yield TestVertexModel.acreate(name='v2')
+        e1 = yield TestEdgeModel.acreate(v1, v2, name='e1')
+        self.assertIsNotNone(e1.id)
+        e2 = yield TestEdgeModel.aget(e1.id)
+        self.assertEqual(e2.name, 'e1')
+        self.assertEqual(e2._outV, v1.id)
+        yield e2.adelete()
+        with self.assertRaises(TestEdgeModel.DoesNotExist):
+            yield TestEdgeModel.aget(e1.id)
+
+    @gen_test
+    def test_asave_and_adelete(self):
+        v1 = yield TestVertexModel.acreate(name='v1')
+        v1.name = 'renamed'
+        yield v1.asave()
+        v2 = yield TestVertexModel.aget(v1.id)
+        self.assertEqual(v2.name, 'renamed')
+        yield v1.adelete()
+        with self.assertRaises(TestVertexModel.DoesNotExist):
+            yield TestVertexModel.aget(v1.id)
+
+
+@unittest.skipUnless(PY35, "async/await requires Python 3.5+")
+@attr('unit', 'aio')
+class TestResultIterator(BaseMemoryGoblinTestCase):
+
+    @gen_test
+    def test_reads_are_bounded_by_the_consumer(self):
+        stream = FakeStream([[1, 2], [3, 4], [5, 6], [7, 8]])
+        future_stream = concurrent.Future()
+        future_stream.set_result(stream)
+        iterator = aio.iterate(future_stream, max_buffered=1)
+        first = yield iterator.__anext__()
+        self.assertEqual(first, 1)
+        # let the iterator read ahead as far as it is allowed to
+        for _ in range(5):
+            yield gen.moment
+        # the message being consumed and one message read ahead
+        self.assertEqual(stream.reads, 2)
+        results = [first]
+        results.extend((yield collect(iterator)))
+        self.assertEqual(results, list(range(1, 9)))
+        self.assertEqual(stream.reads, 4)
+
+    @gen_test
+    def test_max_buffered(self):
+        stream = FakeStream([[1], [2], [3], [4], [5], [6]])
+        future_stream = concurrent.Future()
+        future_stream.set_result(stream)
+        iterator = aio.iterate(future_stream, max_buffered=3)
+        yield iterator.__anext__()
+        for _ in range(10):
+            yield gen.moment
+        self.assertEqual(stream.reads, 4)
+        with self.assertRaises(ValueError):
+            aio.iterate(future_stream, max_buffered=0)
+
+    @gen_test
+    def test_iterate_model_streams(self):
+        source = yield StreamingVertexModel.create(name='source')
+        targets = []
+        for i in range(5):
+            edge, target = yield source.relation.create(
+                vertex_params={'name': 't{}'.format(i)})
+            targets.append(target.id)
+        self.server.batch_size = 2
+
+        results = yield collect(aio.iterate(TestVertexModel.all()))
+        self.assertEqual(sorted(v.id for v in results), sorted(targets))
+        results = yield collect(aio.iterate(source.outV()))
+        self.assertEqual(sorted(v.id for v in results), sorted(targets))
+        results = yield collect(aio.iterate(
+            V(source).out_step(TestEdgeModel).get()))
+        self.assertEqual(sorted(v.id for v in results), sorted(targets))
+        results = yield collect(aio.iterate(source.relation.vertices()))
+        self.assertEqual(sorted(v.id for v in results), sorted(targets))
+        self.assertTrue(all(isinstance(v, TestVertexModel) for v in results))
+
+    @gen_test
+    def test_errors(self):
+        iterator = aio.iterate(
+            TestVertexModel.all(deserialize=False, ids=[12345]))
+        with self.assertRaises(TestVertexModel.DoesNotExist):
+            yield collect(iterator)
@@ -0,0 +1,99 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado.testing import gen_test
+
+from goblin import properties
+from goblin.exceptions import ValidationError
+from goblin.models import Edge, Vertex
+from goblin.tests.base import (
+    BaseMemoryGoblinTestCase, TestVertexModel, TestEdgeModel)
+
+
+class BulkPlaceModel(Vertex):
+    name = properties.String()
+    location = properties.Point()
+    contact = properties.Email()
+
+
+class ExclusiveBulkEdge(Edge):
+    __exclusive__ = True
+    test_val = properties.Integer()
+
+
+@attr('unit', 'bulk_create')
+class TestBulkCreate(BaseMemoryGoblinTestCase):
+
+    @gen_test
+    def test_vertex_bulk_create(self):
+        """ Vertices are created in chunks and ids come back in order """
+        values = [{'name': 'v{}'.format(i), 'test_val': i}
+                  for i in range(10)]
+        ids = yield TestVertexModel.bulk_create(values, chunk_size=4)
+        self.assertEqual(len(ids), 10)
+        self.assertEqual(self.server.graph.commits, 3)
+        self.assertEqual(self.server.requests, 3)
+        stream = yield TestVertexModel.all(ids)
+        vertices = yield stream.read()
+        self.assertEqual([v.name for v in vertices],
+                         [v['name'] for v in values])
+        self.assertEqual([v.test_val for v in vertices], list(range(10)))
+
+    @gen_test
+    def test_vertex_bulk_create_more_than_a_result_batch(self):
+        """ More ids than fit in one response message """
+        values = [{'name': 'v{}'.format(i)} for i in range(150)]
+        ids = yield TestVertexModel.bulk_create(values)
+        self.assertEqual(len(ids), 150)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(list(self.server.graph.vertices.keys()), ids)
+
+    @gen_test
+    def test_vertex_bulk_create_geo_properties(self):
+        ids = yield BulkPlaceModel.bulk_create(
+            [{'name': 'place', 'location': (-115.81, 37.24)}])
+        vertex = self.server.graph.vertex(ids[0])
+        location = BulkPlaceModel.get_property_by_name('location')
+        self.assertEqual(vertex.value(location),
+                         {'type': 'Point', 'coordinates': [-115.81, 37.24]})
+
+    def test_vertex_bulk_create_validates(self):
+        """ Invalid values are rejected before anything is sent """
+        with self.assertRaises(ValidationError):
+            BulkPlaceModel.bulk_create([{'contact': 'place@example.com'},
+                                        {'contact': 'place'}])
+        self.assertEqual(self.server.requests, 0)
+
+    @gen_test
+    def test_vertex_bulk_create_empty(self):
+        ids = yield TestVertexModel.bulk_create([])
+        self.assertEqual(ids, [])
+        self.assertEqual(self.server.requests, 0)
+
+    @gen_test
+    def test_edge_bulk_create(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        ids = yield TestEdgeModel.bulk_create(
+            [(v1, v2, {'test_val': 1}), (v2.id, v1.id, {'test_val': 2}),
+             (v1, v2, {'test_val': 3})], chunk_size=2)
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(self.server.graph.commits, 4)
+        stream = yield TestEdgeModel.all(ids)
+        edges = yield stream.read()
+        self.assertEqual([e.test_val for e in edges], [1, 2, 3])
+        self.assertEqual(edges[1]._outV, v2.id)
+        self.assertEqual(edges[1]._inV, v1.id)
+
+    @gen_test
+    def test_exclusive_edge_bulk_create(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        ids = yield ExclusiveBulkEdge.bulk_create(
+            [(v1, v2, {'test_val': 1}), (v1, v2, {'test_val': 2})])
+        self.assertEqual(ids[0], ids[1])
+        edge = yield ExclusiveBulkEdge.get(ids[0])
+        self.assertEqual(edge.test_val, 2)
+
+    def test_edge_bulk_create_validates(self):
+        with self.assertRaises(ValidationError):
+            TestEdgeModel.bulk_create([(None, None, {})])
@@ -0,0 +1,153 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado import gen
+from tornado.testing import gen_test
+
+from goblin.exceptions import GoblinQueryError
+from goblin.models import PaginatedVertex, Vertex
+from goblin.models.cursor import decode_cursor, encode_cursor
+from goblin.properties import String
+from goblin.relationships import Relationship
+from goblin.tests.base import (BaseMemoryGoblinTestCase, TestVertexModel,
+                               TestVertexModelDouble, TestEdgeModel,
+                               TestEdgeModel2)
+
+
+class CursorVertexModel(PaginatedVertex):
+    label = 'cursor_vertex_model'
+
+    name = String()
+    relation = Relationship(TestEdgeModel, TestVertexModel, 'out')
+
+
+@gen.coroutine
+def read_pages(read_page):
+    """ Read every page, returning the ids of each page """
+    pages = []
+    cursor = None
+    while True:
+        page = yield read_page(cursor)
+        pages.append([e.id for e in page])
+        if not page.has_next:
+            break
+        cursor = page.cursor
+    raise gen.Return(pages)
+
+
+@attr('unit', 'pagination')
+class TestCursorPagination(BaseMemoryGoblinTestCase):
+
+    @gen.coroutine
+    def create_neighbours(self, count):
+        self.source = yield CursorVertexModel.create(name='source')
+        self.targets = []
+        self.edges = []
+        for i in range(count):
+            edge, target = yield self.source.relation.create(
+                vertex_params={'name': 't{}'.format(i)})
+            self.targets.append(target.id)
+            self.edges.append(edge.id)
+
+    def test_cursor_round_trip(self):
+        for element_id in (12, '4r-6e-36d-9k', {'relationId': 'x'}):
+            self.assertEqual(decode_cursor(encode_cursor(element_id)),
+                             element_id)
+        with self.assertRaises(GoblinQueryError):
+            decode_cursor('not a cursor')
+
+    @gen_test
+    def test_vertex_traversal_pages(self):
+        yield self.create_neighbours(7)
+        pages = yield read_pages(
+            lambda after: Vertex.outV(self.source, TestEdgeModel,
+                                      page_size=3, after=after))
+        self.assertEqual([len(p) for p in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), sorted(self.targets))
+
+        pages = yield read_pages(
+            lambda after: Vertex.outE(self.source, page_size=4, after=after))
+        self.assertEqual(sum(pages, []), sorted(self.edges))
+
+        target = yield TestVertexModel.get(self.targets[0])
+        page = yield target.inV(page_size=2)
+        self.assertEqual([v.id for v in page], [self.source.id])
+        self.assertIsNone(page.cursor)
+
+    @gen_test
+    def test_resumes_after_cursor_when_graph_changes(self):
+        yield self.create_neighbours(4)
+        page = yield Vertex.outV(self.source, page_size=2)
+        self.assertEqual([v.id for v in page], sorted(self.targets)[:2])
+        # removing an element of a previous page doesn't shift the next one
+        first = yield TestVertexModel.get(page[0].id)
+        yield first.delete()
+        page = yield Vertex.outV(self.source, page_size=2, after=page.cursor)
+        self.assertEqual([v.id for v in page], sorted(self.targets)[2:])
+        self.assertFalse(page.has_next)
+
+    @gen_test
+    def test_element_types(self):
+        yield self.create_neighbours(2)
+        other = yield TestVertexModelDouble.create(name='other')
+        yield TestEdgeModel.create(self.source, other)
+        page = yield Vertex.outV(self.source, page_size=10,
+                                 types=[TestVertexModelDouble])
+        self.assertEqual([v.id for v in page], [other.id])
+
+    @gen_test
+    def test_paginated_vertex(self):
+        yield self.create_neighbours(5)
+        pages = yield read_pages(
+            lambda after: self.source.outV(per_page=2, after=after))
+        self.assertEqual(sum(pages, []), sorted(self.targets))
+        # page numbers still page with offsets
+        stream = yield self.source.outV(per_page=2, page_num=1)
+        results = yield stream.read()
+        self.assertEqual(len(results), 2)
+
+    @gen_test
+    def test_relationship_pages(self):
+        yield self.create_neighbours(5)
+        yield TestEdgeModel2.create(self.source, self.source)
+        pages = yield read_pages(
+            lambda after: self.source.relation.vertices(page_size=2,
+                                                        after=after))
+        self.assertEqual(sum(pages, []), sorted(self.targets))
+        pages = yield read_pages(
+            lambda after: self.source.relation.edges(page_size=3,
+                                                     after=after))
+        self.assertEqual(sum(pages, []), sorted(self.edges))
+
+    @gen_test
+    def test_sort_key_pages(self):
+        yield self.create_neighbours(0)
+        targets = yield [TestVertexModel.create(name='t{}'.format(i))
+                         for i in range(7)]
+        # ties on the key are split across pages without losing any
+        for target, value in zip(targets, [5, 1, 3, 3, 3, 9, 0]):
+            yield TestEdgeModel.create(self.source, target, test_val=value)
+        pages = yield read_pages(
+            lambda after: Vertex.outV(self.source, TestEdgeModel,
+                                      page_size=2, after=after,
+                                      sort_key='test_val'))
+        self.assertEqual([len(p) for p in pages], [2, 2, 2, 1])
+        self.assertEqual(sum(pages, []), [targets[i].id
+                                          for i in (6, 1, 2, 3, 4, 0, 5)])
+
+        pages = yield read_pages(
+            lambda after: self.source.relation.edges(page_size=3,
+                                                     after=after,
+                                                     sort_key='test_val'))
+        self.assertEqual(len(sum(pages, [])), 7)
+        page = yield self.source.outV(TestEdgeModel, per_page=3, after=None,
+                                      sort_key='test_val')
+        self.assertEqual([v.id for v in page],
+                         [targets[i].id for i in (6, 1, 2)])
+        with self.assertRaises(GoblinQueryError):
+            Vertex.outV(self.source, sort_key='test_val')
+
+    @gen_test
+    def test_invalid_page_size(self):
+        yield self.create_neighbours(1)
+        with self.assertRaises(GoblinQueryError):
+            yield Vertex.outV(self.source, page_size=0)
@@ -0,0 +1,82 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado.testing import gen_test
+
+from goblin import connection, properties
+from goblin.models import Vertex
+from goblin.properties.strategy import SaveOnIncrease
+from goblin.tests.base import BaseMemoryGoblinTestCase, TestVertexModel
+
+
+class DirtyVertexModel(Vertex):
+    __dirty_tracking__ = True
+
+    name = properties.String()
+    test_val = properties.Integer()
+    score = properties.Integer(save_strategy=SaveOnIncrease)
+
+
+def sent(element):
+    """ Names of the properties a save would send, with their values """
+    params = element.as_save_params()[0]
+    names = dict((prop.db_field_name, name)
+                 for name, prop in element._properties.items())
+    return dict((names.get(key, key), value) for key, value in params.items())
+
+
+@attr('unit', 'dirty_tracking')
+class TestDirtyTracking(BaseMemoryGoblinTestCase):
+
+    def tearDown(self):
+        connection._dirty_tracking = False
+        super(TestDirtyTracking, self).tearDown()
+
+    @gen_test
+    def test_only_changed_values_are_sent(self):
+        vertex = DirtyVertexModel(name='v', test_val=1)
+        self.assertEqual(set(sent(vertex)), {'name', 'test_val', 'score'})
+        vertex = yield vertex.save()
+        self.assertEqual(sent(vertex), {})
+        vertex.test_val = 2
+        vertex['extra'] = 'x'
+        self.assertEqual(sent(vertex), {'test_val': 2, 'extra': 'x'})
+
+        # the strategies still apply to the changed values
+        vertex.score = 5
+        vertex = yield vertex.save()
+        vertex.score = 1
+        self.assertEqual(sent(vertex), {})
+        vertex.score = 6
+        self.assertEqual(sent(vertex), {'score': 6})
+
+    @gen_test
+    def test_concurrent_updates_are_kept(self):
+        vertex = yield DirtyVertexModel.create(name='v', test_val=1)
+        first = yield DirtyVertexModel.get(vertex.id)
+        second = yield DirtyVertexModel.get(vertex.id)
+        first.name = 'renamed'
+        second.test_val = 2
+        yield first.save()
+        yield second.save()
+        loaded = yield DirtyVertexModel.get(vertex.id)
+        self.assertEqual((loaded.name, loaded.test_val), ('renamed', 2))
+
+    @gen_test
+    def test_global_setting(self):
+        vertex = yield TestVertexModel.create(name='v', test_val=1)
+        self.assertEqual(set(sent(vertex)), {'name', 'test_val'})
+        connection._dirty_tracking = True
+        self.assertEqual(sent(vertex), {})
+        vertex.name = 'w'
+        self.assertEqual(sent(vertex), {'name': 'w'})
+        yield vertex.save()
+        loaded = yield TestVertexModel.get(vertex.id)
+        self.assertEqual(loaded.name, 'w')
+        self.assertEqual(loaded.test_val, 1)
+
+        # a model can opt out of the global setting
+        TestVertexModel.__dirty_tracking__ = False
+        try:
+            self.assertEqual(set(sent(vertex)), {'name', 'test_val'})
+        finally:
+            del TestVertexModel.__dirty_tracking__
@@ -0,0 +1,82 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado.testing import gen_test
+
+from goblin.exceptions import GoblinQueryError
+from goblin.models import resolve_endpoints
+from goblin.tests.base import (
+    BaseMemoryGoblinTestCase, TestVertexModel, TestEdgeModel)
+
+
+@attr('unit', 'edge_endpoints')
+class TestEdgeEndpoints(BaseMemoryGoblinTestCase):
+
+    @gen_test
+    def test_resolve_endpoints(self):
+        hub = yield TestVertexModel.create(name='hub')
+        leaves = yield [TestVertexModel.create(name='leaf{}'.format(i))
+                        for i in range(5)]
+        yield [TestEdgeModel.create(hub, leaf) for leaf in leaves]
+        stream = yield hub.outE()
+        edges = yield stream.read()
+        self.assertEqual(edges[0]._inV, leaves[0].id)
+
+        self.server.reset_stats()
+        result = yield resolve_endpoints(edges)
+        self.assertEqual(result, edges)
+        self.assertEqual(self.server.requests, 1)
+        outs = yield [edge.outV() for edge in edges]
+        ins = yield [edge.inV() for edge in edges]
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual([v.id for v in outs], [hub.id] * 5)
+        self.assertEqual([v.name for v in ins],
+                         [leaf.name for leaf in leaves])
+
+        result = yield resolve_endpoints(edges)
+        self.assertEqual(self.server.requests, 1)
+
+    @gen_test
+    def test_edge_traversals_resolve_endpoints(self):
+        hub = yield TestVertexModel.create(name='hub')
+        leaves = yield [TestVertexModel.create(name='leaf{}'.format(i))
+                        for i in range(5)]
+        yield [TestEdgeModel.create(leaf, hub) for leaf in leaves]
+        self.server.reset_stats()
+        stream = yield hub.inE(resolve_endpoints=True)
+        edges = yield stream.read()
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual([e._outV.name for e in edges],
+                         [leaf.name for leaf in leaves])
+        # the vertex traversed from isn't read again
+        self.assertIs(edges[0]._inV, hub)
+
+        page = yield hub.bothE(page_size=2, resolve_endpoints=True)
+        self.assertEqual(len(page), 2)
+        self.assertEqual(self.server.requests, 4)
+        self.assertIsInstance(page[1]._outV, TestVertexModel)
+        self.assertTrue(all(hub is e._outV or hub is e._inV for e in page))
+
+        # every endpoint is known
+        loop = yield TestEdgeModel.create(hub, hub)
+        self.server.reset_stats()
+        result = yield resolve_endpoints([loop], [hub])
+        self.assertEqual(self.server.requests, 0)
+        self.assertIs(result[0]._outV, hub)
+        self.assertIs(result[0]._inV, hub)
+        with self.assertRaises(GoblinQueryError):
+            hub.outV(resolve_endpoints=True)
+
+    @gen_test
+    def test_endpoints_are_read_lazily(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        edge = yield TestEdgeModel.create(v1, v2)
+        edge._outV = v1
+        edge._inV = None
+        self.server.reset_stats()
+        out_v = yield edge.outV()
+        self.assertIs(out_v, v1)
+        self.assertEqual(self.server.requests, 0)
+        in_v = yield edge.inV()
+        self.assertEqual(in_v.id, v2.id)
+        self.assertEqual(self.server.requests, 1)
@@ -0,0 +1,155 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado.testing import gen_test
+
+from goblin import connection
+from goblin.metrics.base import BaseMetricsReporter
+from goblin.metrics.manager import MetricManager
+from goblin.models import Vertex
+from goblin.models.cache import ElementCache
+from goblin.models.loader import _id_key
+from goblin.properties import String
+from goblin.tests.base import (BaseMemoryGoblinTestCase, FakeClock,
+                               TestVertexModel, TestVertexModelDouble,
+                               TestEdgeModel, TestEdgeModel2)
+
+
+class ShortLivedVertexModel(Vertex):
+    label = 'short_lived_vertex_model'
+    __cache_ttl__ = 10
+
+    name = String()
+
+
+@attr('unit', 'element_cache')
+class TestElementCache(BaseMemoryGoblinTestCase):
+
+    def setUp(self):
+        super(TestElementCache, self).setUp()
+        self.clock = FakeClock()
+        self.cache = connection._element_cache = ElementCache(
+            maxsize=3, ttl=100, clock=self.clock)
+
+    def tearDown(self):
+        connection._element_cache = None
+        connection._metric_manager = None
+        super(TestElementCache, self).tearDown()
+
+    @gen_test
+    def test_get_reads_through(self):
+        v = yield TestVertexModel.create(name='v')
+        self.server.reset_stats()
+        first = yield TestVertexModel.get(v.id)
+        second = yield TestVertexModel.get(v.id)
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+        self.assertEqual(second.name, 'v')
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    @gen_test
+    def test_only_missing_ids_are_requested(self):
+        ids = yield TestVertexModel.bulk_create([{'name': 'a'},
+                                                 {'name': 'b'}])
+        yield TestVertexModel.get(ids[0])
+        self.server.reset_stats()
+        stream = yield TestVertexModel.all(ids)
+        results = []
+        while True:
+            message = yield stream.read()
+            if message is None:
+                break
+            results.extend(message)
+        self.assertEqual(sorted(v.id for v in results), sorted(ids))
+        self.assertEqual(self.server.requests, 1)
+        stream = yield TestVertexModel.all(ids)
+        results = yield stream.read()
+        self.assertEqual(len(results), 2)
+        self.assertEqual(self.server.requests, 1)
+
+    @gen_test
+    def test_label_is_checked(self):
+        v = yield TestVertexModel.create(name='v')
+        yield TestVertexModel.get(v.id)
+        with self.assertRaises(TestVertexModelDouble.DoesNotExist):
+            yield TestVertexModelDouble.get(v.id)
+
+    @gen_test
+    def test_save_and_delete_invalidate(self):
+        v = yield TestVertexModel.create(name='v')
+        loaded = yield TestVertexModel.get(v.id)
+        loaded.name = 'w'
+        yield loaded.save()
+        loaded = yield TestVertexModel.get(v.id)
+        self.assertEqual(loaded.name, 'w')
+        yield loaded.delete()
+        with self.assertRaises(TestVertexModel.DoesNotExist):
+            yield TestVertexModel.get(v.id)
+
+    @gen_test
+    def test_edges_are_invalidated_with_their_vertices(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        e1 = yield TestEdgeModel.create(v1, v2)
+        e2 = yield TestEdgeModel.create(v2, v2)
+        yield TestEdgeModel.get(e1.id)
+        yield TestEdgeModel.get(e2.id)
+        yield v1._simple_deletion('outE', [TestEdgeModel])
+        with self.assertRaises(TestEdgeModel.DoesNotExist):
+            yield TestEdgeModel.get(e1.id)
+        yield v2.delete()
+        with self.assertRaises(TestEdgeModel.DoesNotExist):
+            yield TestEdgeModel.get(e2.id)
+
+    @gen_test
+    def test_edge_index_follows_the_cache(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        for _ in range(4):
+            edge = yield TestEdgeModel.create(v1, v2)
+            yield TestEdgeModel.get(edge.id)
+        # the first edge was evicted
+        self.assertEqual(len(self.cache._vertex_edges[_id_key(v1.id)]), 3)
+        self.cache.invalidate_edges(v1.id, [TestEdgeModel2.get_label()])
+        self.assertEqual(len(self.cache), 3)
+        self.cache.invalidate_edges(v2.id, [TestEdgeModel.get_label()])
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache._vertex_edges, {})
+
+    @gen_test
+    def test_ttl(self):
+        v = yield TestVertexModel.create(name='v')
+        short = yield ShortLivedVertexModel.create(name='short')
+        yield TestVertexModel.get(v.id)
+        yield ShortLivedVertexModel.get(short.id)
+        self.clock.now += 50
+        self.server.reset_stats()
+        yield TestVertexModel.get(v.id)
+        yield ShortLivedVertexModel.get(short.id)
+        self.assertEqual(self.server.requests, 1)
+        self.clock.now += 60
+        yield TestVertexModel.get(v.id)
+        self.assertEqual(self.server.requests, 2)
+
+    @gen_test
+    def test_lru_eviction_and_metrics(self):
+        manager = MetricManager()
+        reporter = BaseMetricsReporter()
+        manager.setup_reporters(reporter)
+        connection._metric_manager = manager
+        ids = yield TestVertexModel.bulk_create([{}] * 4)
+        for vid in ids:
+            yield TestVertexModel.get(vid)
+        self.assertEqual(len(self.cache), 3)
+        self.server.reset_stats()
+        yield TestVertexModel.get(ids[3])
+        yield TestVertexModel.get(ids[0])
+        self.assertEqual(self.server.requests, 1)
+        registry = reporter.registry[0]
+        self.assertEqual(
+            registry.counter('goblin.element_cache.hits').get_count(), 1)
+        self.assertEqual(
+            registry.counter('goblin.element_cache.misses').get_count(), 5)
+        self.assertEqual(
+            registry.counter('goblin.element_cache.evictions').get_count(),
+            2)
@@ -0,0 +1,70 @@
+from __future__ import unicode_literals
+from collections import OrderedDict
+from nose.plugins.attrib import attr
+from tornado.testing import gen_test
+
+from goblin import properties
+from goblin.models import Edge, Session
+from goblin.tests.base import BaseMemoryGoblinTestCase, TestVertexModel
+
+
+class ExclusiveEdgeModel(Edge):
+    __exclusive__ = True
+
+    weight = properties.Integer()
+
+
+class CountingEdges(OrderedDict):
+    """ Edges of a memory vertex, counting the edges read """
+    reads = 0
+
+    def values(self):
+        for edge in OrderedDict.values(self):
+            self.reads += 1
+            yield edge
+
+
+@attr('unit', 'exclusive')
+class TestExclusiveEdges(BaseMemoryGoblinTestCase):
+
+    @gen_test
+    def test_save_creates_then_updates(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        edge = yield ExclusiveEdgeModel.create(v1, v2, weight=1)
+        self.assertEqual(len(self.server.graph.edges), 1)
+        same = yield ExclusiveEdgeModel.create(v1, v2, weight=2)
+        self.assertEqual(same.id, edge.id)
+        self.assertEqual(same.weight, 2)
+        other = yield ExclusiveEdgeModel.create(v2, v1, weight=3)
+        self.assertNotEqual(other.id, edge.id)
+        self.assertEqual(len(self.server.graph.edges), 2)
+
+    @gen_test
+    def test_lookup_reads_the_lower_degree_vertex(self):
+        hub = yield TestVertexModel.create(name='hub')
+        leaves = yield [TestVertexModel.create(name='leaf{}'.format(i))
+                        for i in range(50)]
+        yield ExclusiveEdgeModel.bulk_create(
+            [(hub, leaf, {}) for leaf in leaves] +
+            [(leaf, hub, {}) for leaf in leaves])
+        memory_hub = self.server.graph.vertex(hub.id)
+        memory_hub.out_edges = CountingEdges(memory_hub.out_edges)
+        memory_hub.in_edges = CountingEdges(memory_hub.in_edges)
+
+        leaf = yield TestVertexModel.create(name='leaf')
+        edge = yield ExclusiveEdgeModel.create(hub, leaf)
+        found = yield ExclusiveEdgeModel.create(hub, leaf, weight=1)
+        self.assertEqual(found.id, edge.id)
+        found = yield ExclusiveEdgeModel.create(hub, leaves[-1], weight=1)
+        self.assertEqual(found._inV, leaves[-1].id)
+        yield ExclusiveEdgeModel.create(leaves[-1], hub, weight=1)
+
+        session = Session()
+        session.add(ExclusiveEdgeModel(leaf, hub))
+        yield session.flush()
+        upserted = yield ExclusiveEdgeModel.upsert(leaf, hub, weight=2)
+        self.assertEqual(upserted.weight, 2)
+        self.assertLessEqual(memory_hub.out_edges.reads, 6)
+        self.assertLessEqual(memory_hub.in_edges.reads, 6)
+        self.assertEqual(len(self.server.graph.edges), 102)
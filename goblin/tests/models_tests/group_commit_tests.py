@@ -0,0 +1,93 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado import gen
+from tornado.testing import gen_test
+
+from goblin import connection
+from goblin.metrics.base import BaseMetricsReporter
+from goblin.metrics.manager import MetricManager
+from goblin.tests.base import (
+    BaseMemoryGoblinTestCase, TestVertexModel, TestEdgeModel)
+
+
+@attr('unit', 'group_commit')
+class TestGroupCommit(BaseMemoryGoblinTestCase):
+
+    def setUp(self):
+        super(TestGroupCommit, self).setUp()
+        connection._save_batch_window = 0
+        connection._save_batch_size = 64
+
+    def tearDown(self):
+        connection._save_batch_window = None
+        connection._save_batch_size = 64
+        connection._metric_manager = None
+        super(TestGroupCommit, self).tearDown()
+
+    @gen_test
+    def test_concurrent_saves_share_a_commit(self):
+        vertices = [TestVertexModel(name='v{}'.format(i)) for i in range(5)]
+        results = yield [v.save() for v in vertices]
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.server.graph.commits, 1)
+        for vertex, result in zip(vertices, results):
+            self.assertIs(result, vertex)
+            self.assertIsNotNone(vertex.id)
+        loaded = yield TestVertexModel.get(vertices[3].id)
+        self.assertEqual(loaded.name, 'v3')
+
+    @gen_test
+    def test_edges_and_updates_are_grouped(self):
+        v1, v2 = yield [TestVertexModel.create(name='v1'),
+                        TestVertexModel.create(name='v2')]
+        self.server.reset_stats()
+        v1.name = 'renamed'
+        results = yield [v1.save(), TestEdgeModel.create(v1, v2, test_val=3)]
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(results[0].name, 'renamed')
+        self.assertEqual(results[1]._outV, v1)
+        loaded = yield TestEdgeModel.get(results[1].id)
+        self.assertEqual(loaded.test_val, 3)
+
+    @gen_test
+    def test_failures_are_isolated(self):
+        good = TestVertexModel(name='good')
+        bad = TestVertexModel(name='bad')
+        bad._id = 10000
+        future_good, future_bad = good.save(), bad.save()
+        result = yield future_good
+        self.assertIs(result, good)
+        self.assertIsNotNone(good.id)
+        with self.assertRaises(RuntimeError):
+            yield future_bad
+        # the group, then each save on its own
+        self.assertEqual(self.server.requests, 3)
+
+    @gen_test
+    def test_window_and_size(self):
+        connection._save_batch_window = 0.01
+        connection._save_batch_size = 2
+        manager = MetricManager()
+        reporter = BaseMetricsReporter()
+        manager.setup_reporters(reporter)
+        connection._metric_manager = manager
+        first = TestVertexModel(name='a').save()
+        yield gen.moment
+        results = yield [first, TestVertexModel(name='b').save(),
+                         TestVertexModel(name='c').save()]
+        self.assertEqual(len(results), 3)
+        self.assertEqual(self.server.requests, 2)
+        registry = reporter.registry[0]
+        self.assertEqual(
+            registry.counter('goblin.group_commit.full').get_count(), 1)
+        self.assertEqual(
+            registry.counter('goblin.group_commit.window').get_count(), 1)
+        self.assertEqual(
+            registry.counter('goblin.group_commit.calls').get_count(), 3)
+
+    @gen_test
+    def test_other_kwargs_are_not_grouped(self):
+        results = yield [TestVertexModel(name='a').save(request_id='a'),
+                         TestVertexModel(name='b').save(request_id='b')]
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(results[0].name, 'a')
@@ -0,0 +1,114 @@
+from __future__ import unicode_literals
+import gc
+
+from nose.plugins.attrib import attr
+from tornado import gen
+from tornado.testing import gen_test
+
+from goblin.models import identity
+from goblin.models.identity import IdentityMap
+from goblin.tests.base import (BaseMemoryGoblinTestCase, TestVertexModel,
+                               TestEdgeModel)
+
+
+@attr('unit', 'identity_map')
+class TestIdentityMap(BaseMemoryGoblinTestCase):
+
+    @gen_test
+    def test_results_reuse_live_elements(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        yield TestEdgeModel.create(v1, v2, name='e')
+
+        with IdentityMap() as identity_map:
+            a = yield TestVertexModel.get(v2.id)
+            b = yield TestVertexModel.get(v2.id)
+            self.assertIs(a, b)
+            stream = yield v1.outV()
+            results = yield stream.read()
+            self.assertIs(results[0], a)
+            stream = yield v1.outE()
+            e1 = (yield stream.read())[0]
+            stream = yield v2.inE()
+            e2 = (yield stream.read())[0]
+            self.assertIs(e1, e2)
+            self.assertIn(a, identity_map)
+            self.assertIn(e1, identity_map)
+
+        self.assertIsNone(identity.current())
+        c = yield TestVertexModel.get(v2.id)
+        self.assertIsNot(c, a)
+
+    @gen_test
+    def test_interleaved_requests_keep_their_maps(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        yield TestEdgeModel.create(v1, v2, name='e')
+        order = []
+
+        @gen.coroutine
+        def request(name):
+            identity_map = IdentityMap()
+            a = yield TestVertexModel.get(v2.id, identity_map=identity_map)
+            order.append(name)
+            # the other request runs here
+            yield gen.moment
+            stream = yield v1.outV(identity_map=identity_map)
+            b = (yield stream.read())[0]
+            order.append(name)
+            raise gen.Return((identity_map, a, b))
+
+        (map1, a1, b1), (map2, a2, b2) = yield [request(1), request(2)]
+        self.assertEqual(order, [1, 2, 1, 2])
+        self.assertIs(a1, b1)
+        self.assertIs(a2, b2)
+        self.assertIsNot(a1, a2)
+        self.assertIn(a1, map1)
+        self.assertNotIn(a1, map2)
+        self.assertIsNone(identity.current())
+
+    @gen_test
+    def test_refreshes_changed_properties(self):
+        v = yield TestVertexModel.create(name='v', test_val=1)
+        with IdentityMap():
+            loaded = yield TestVertexModel.get(v.id)
+            # the other copy is saved outside of the map
+            v.test_val = 2
+            yield v.save()
+            loaded.name = 'changed locally'
+            reloaded = yield TestVertexModel.get(v.id)
+        self.assertIs(reloaded, loaded)
+        self.assertEqual(loaded.test_val, 2)
+        self.assertEqual(loaded._values['test_val'].previous_value, 2)
+        # the unsaved change isn't overwritten
+        self.assertEqual(loaded.name, 'changed locally')
+        self.assertEqual(loaded._values['name'].previous_value, 'v')
+
+    @gen_test
+    def test_saved_elements(self):
+        with IdentityMap():
+            v = yield TestVertexModel.create(name='v')
+            loaded = yield TestVertexModel.get(v.id)
+            self.assertIs(loaded, v)
+            v.name = 'w'
+            saved = yield loaded.save()
+        self.assertIs(saved, v)
+
+    @gen_test
+    def test_weak_references(self):
+        v = yield TestVertexModel.create(name='v')
+        with IdentityMap() as identity_map:
+            loaded = yield TestVertexModel.get(v.id)
+            self.assertEqual(len(identity_map), 1)
+            del loaded
+            # let go of the future holding the element
+            yield gen.moment
+            gc.collect()
+            self.assertEqual(len(identity_map), 0)
+
+    def test_nested_maps(self):
+        with IdentityMap() as outer:
+            with IdentityMap() as inner:
+                self.assertIs(identity.current(), inner)
+            self.assertIs(identity.current(), outer)
+        self.assertIsNone(identity.current())
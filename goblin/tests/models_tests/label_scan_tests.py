@@ -0,0 +1,91 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado import gen
+from tornado.testing import gen_test
+
+from goblin.exceptions import GoblinQueryError
+from goblin.models.scan import partition_ids
+from goblin.tests.base import (BaseMemoryGoblinTestCase, TestVertexModel,
+                               TestVertexModelDouble)
+
+
+@gen.coroutine
+def read_batches(scan):
+    batches = []
+    while True:
+        batch = yield scan.read()
+        if batch is None:
+            break
+        batches.append([v.id for v in batch])
+    raise gen.Return(batches)
+
+
+@attr('unit', 'label_scan')
+class TestLabelScan(BaseMemoryGoblinTestCase):
+
+    def test_partition_ids(self):
+        self.assertEqual(partition_ids(1, 10, 3),
+                         [[None, 5], [5, 9], [9, None]])
+        self.assertEqual(partition_ids(4, 5, 8), [[None, 5], [5, None]])
+        self.assertEqual(partition_ids(7, 7, 4), [[None, None]])
+
+    @gen_test
+    def test_scans_every_vertex_of_the_label(self):
+        ids = yield TestVertexModel.bulk_create(
+            [{'name': 'v{}'.format(i)} for i in range(23)])
+        yield TestVertexModelDouble.bulk_create([{'name': 'other'}] * 3)
+        self.server.reset_stats()
+
+        scan = yield TestVertexModel.iter_all(batch_size=4, parallelism=3)
+        # one query per partition
+        self.assertEqual(scan._running, 3)
+        batches = yield read_batches(scan)
+        for batch in batches:
+            self.assertTrue(0 < len(batch) <= 4)
+        found = sum(batches, [])
+        self.assertEqual(sorted(found), sorted(ids))
+        self.assertEqual(len(found), len(set(found)))
+        # bounds, then one query per partition
+        self.assertEqual(self.server.requests, 4)
+
+    @gen_test
+    def test_single_partition(self):
+        ids = yield TestVertexModel.bulk_create([{}] * 5)
+        self.server.reset_stats()
+        scan = yield TestVertexModel.iter_all(batch_size=5)
+        batches = yield read_batches(scan)
+        self.assertEqual([sorted(batch) for batch in batches], [sorted(ids)])
+        # no bounds are needed
+        self.assertEqual(self.server.requests, 1)
+
+    @gen_test
+    def test_messages_are_read_one_at_a_time(self):
+        batch_size = self.server.batch_size
+        self.server.batch_size = 6
+        try:
+            ids = yield TestVertexModel.bulk_create([{}] * 30)
+            scan = yield TestVertexModel.iter_all(batch_size=4)
+            batch = yield scan.read()
+            self.assertEqual(len(batch), 4)
+            for _ in range(3):
+                yield gen.moment
+            # only the rest of the first message is held
+            self.assertEqual([len(b) for _, b in scan._batches], [2])
+            batches = yield read_batches(scan)
+        finally:
+            self.server.batch_size = batch_size
+        self.assertEqual([len(b) for b in batches], [2] + [4, 2] * 4)
+        found = [v.id for v in batch] + sum(batches, [])
+        self.assertEqual(sorted(found), sorted(ids))
+
+    @gen_test
+    def test_empty_label(self):
+        scan = yield TestVertexModel.iter_all(parallelism=4)
+        batch = yield scan.read()
+        self.assertIsNone(batch)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(GoblinQueryError):
+            TestVertexModel.iter_all(batch_size=0)
+        with self.assertRaises(GoblinQueryError):
+            TestVertexModel.iter_all(parallelism=0)
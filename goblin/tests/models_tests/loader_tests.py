@@ -0,0 +1,140 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado import gen
+from tornado.testing import gen_test
+
+from goblin import connection
+from goblin.metrics.base import BaseMetricsReporter
+from goblin.metrics.manager import MetricManager
+from goblin.tests.base import (
+    BaseMemoryGoblinTestCase, TestVertexModel, TestEdgeModel)
+
+
+GET_SCRIPT = 'g.V(*eids).hasLabel(x)'
+
+
+@attr('unit', 'loader')
+class TestElementLoader(BaseMemoryGoblinTestCase):
+
+    def setUp(self):
+        super(TestElementLoader, self).setUp()
+        self.batch_window = connection._get_batch_window
+        self.batch_size = connection._get_batch_size
+
+    def tearDown(self):
+        connection._get_batch_window = self.batch_window
+        connection._get_batch_size = self.batch_size
+        connection._metric_manager = None
+        super(TestElementLoader, self).tearDown()
+
+    @gen.coroutine
+    def create_vertices(self, count):
+        vertices = []
+        for i in range(count):
+            vertex = yield TestVertexModel.create(name='v{}'.format(i))
+            vertices.append(vertex)
+        self.server.reset_stats()
+        raise gen.Return(vertices)
+
+    @gen_test
+    def test_concurrent_gets_are_batched(self):
+        vertices = yield self.create_vertices(3)
+        results = yield [TestVertexModel.get(v.id) for v in vertices]
+        self.assertEqual(results, vertices)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.server.script_counts[GET_SCRIPT], 1)
+
+    @gen_test
+    def test_duplicate_ids(self):
+        vertices = yield self.create_vertices(1)
+        vid = vertices[0].id
+        results = yield [TestVertexModel.get(vid), TestVertexModel.get(vid),
+                         TestVertexModel.get(str(vid))]
+        self.assertEqual(results, vertices * 3)
+        self.assertEqual(self.server.requests, 1)
+
+    @gen_test
+    def test_missing_ids(self):
+        """ Only the callers asking for missing ids get DoesNotExist """
+        vertices = yield self.create_vertices(1)
+        missing = TestVertexModel.get(-1)
+        found = TestVertexModel.get(vertices[0].id)
+        with self.assertRaises(TestVertexModel.DoesNotExist):
+            yield missing
+        result = yield found
+        self.assertEqual(result, vertices[0])
+        self.assertEqual(self.server.requests, 1)
+
+    @gen_test
+    def test_batches_per_class(self):
+        vertices = yield self.create_vertices(2)
+        edge = yield TestEdgeModel.create(vertices[0], vertices[1])
+        self.server.reset_stats()
+        results = yield [TestVertexModel.get(vertices[0].id),
+                         TestEdgeModel.get(edge.id),
+                         TestVertexModel.get(vertices[1].id)]
+        self.assertEqual(results, [vertices[0], edge, vertices[1]])
+        self.assertEqual(self.server.requests, 2)
+
+    @gen_test
+    def test_max_batch_size(self):
+        connection._get_batch_size = 2
+        vertices = yield self.create_vertices(5)
+        results = yield [TestVertexModel.get(v.id) for v in vertices]
+        self.assertEqual(results, vertices)
+        self.assertEqual(self.server.requests, 3)
+
+    @gen_test
+    def test_batching_disabled(self):
+        connection._get_batch_size = 1
+        vertices = yield self.create_vertices(2)
+        results = yield [TestVertexModel.get(v.id) for v in vertices]
+        self.assertEqual(results, vertices)
+        self.assertEqual(self.server.requests, 2)
+
+    @gen_test
+    def test_batch_window(self):
+        connection._get_batch_window = 0.01
+        vertices = yield self.create_vertices(2)
+        first = TestVertexModel.get(vertices[0].id)
+        yield gen.moment
+        second = TestVertexModel.get(vertices[1].id)
+        results = yield [first, second]
+        self.assertEqual(results, vertices)
+        self.assertEqual(self.server.requests, 1)
+
+    @gen_test
+    def test_failed_batch_is_retried_per_id(self):
+        """ An id the server can't handle only fails its own caller """
+        vertices = yield self.create_vertices(1)
+        bad = TestVertexModel.get([1])
+        good = TestVertexModel.get(vertices[0].id)
+        with self.assertRaises(RuntimeError):
+            yield bad
+        result = yield good
+        self.assertEqual(result, vertices[0])
+        self.assertEqual(self.server.requests, 3)
+
+    @gen_test
+    def test_results_over_several_messages(self):
+        connection._get_batch_size = 100
+        vertices = yield self.create_vertices(70)
+        results = yield [TestVertexModel.get(v.id) for v in vertices]
+        self.assertEqual(results, vertices)
+        self.assertEqual(self.server.requests, 1)
+
+    @gen_test
+    def test_metrics(self):
+        manager = MetricManager()
+        reporter = BaseMetricsReporter()
+        manager.setup_reporters(reporter)
+        connection._metric_manager = manager
+        connection._get_batch_size = 2
+        vertices = yield self.create_vertices(3)
+        yield [TestVertexModel.get(v.id) for v in vertices]
+        registry = reporter.registry[0]
+        self.assertEqual(registry.counter('goblin.get_batch.batches').get_count(), 2)
+        self.assertEqual(registry.counter('goblin.get_batch.full').get_count(), 1)
+        self.assertEqual(registry.counter('goblin.get_batch.window').get_count(), 1)
+        self.assertEqual(registry.counter('goblin.get_batch.calls').get_count(), 3)
+        self.assertEqual(registry.histogram('goblin.get_batch.size').get_max(), 2)
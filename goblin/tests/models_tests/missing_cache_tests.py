@@ -0,0 +1,134 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado.testing import gen_test
+
+from goblin import connection
+from goblin.constants import VERTEX_TRAVERSAL
+from goblin.metrics.base import BaseMetricsReporter
+from goblin.metrics.manager import MetricManager
+from goblin.models.cache import MissingCache
+from goblin.tests.base import (BaseMemoryGoblinTestCase, FakeClock,
+                               TestVertexModel, TestVertexModelDouble,
+                               TestEdgeModel)
+
+
+@attr('unit', 'missing_cache')
+class TestMissingCache(BaseMemoryGoblinTestCase):
+
+    def setUp(self):
+        super(TestMissingCache, self).setUp()
+        self.clock = FakeClock()
+        self.cache = connection._missing_cache = MissingCache(
+            maxsize=2, ttl=30, clock=self.clock)
+
+    def tearDown(self):
+        connection._missing_cache = None
+        connection._metric_manager = None
+        super(TestMissingCache, self).tearDown()
+
+    @gen_test
+    def test_get_remembers_missing_ids(self):
+        v = yield TestVertexModel.create(name='v')
+        missing_id = v.id + 1000
+        self.server.reset_stats()
+        for _ in range(2):
+            with self.assertRaises(TestVertexModel.DoesNotExist):
+                yield TestVertexModel.get(missing_id)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.cache.hits, 1)
+        found = yield TestVertexModel.get(v.id)
+        self.assertEqual(found.id, v.id)
+        self.assertEqual(self.server.requests, 2)
+
+    @gen_test
+    def test_all_remembers_missing_ids(self):
+        v = yield TestVertexModel.create(name='v')
+        missing_id = v.id + 1000
+        self.server.reset_stats()
+        for _ in range(2):
+            with self.assertRaises(TestVertexModel.DoesNotExist):
+                stream = yield TestVertexModel.all([missing_id])
+                yield stream.read()
+        self.assertEqual(self.server.requests, 1)
+
+        stream = yield TestVertexModel.all([v.id, missing_id],
+                                           allow_missing=True)
+        results = yield connection.read_all(stream)
+        self.assertEqual([r.id for r in results], [v.id])
+        self.assertEqual(self.server.script_counts['g.V(*eids).hasLabel(x)'],
+                         2)
+        self.assertEqual(self.server.requests, 2)
+
+    @gen_test
+    def test_ids_are_missing_per_label(self):
+        v = yield TestVertexModel.create(name='v')
+        with self.assertRaises(TestVertexModelDouble.DoesNotExist):
+            yield TestVertexModelDouble.get(v.id)
+        found = yield TestVertexModel.get(v.id)
+        self.assertEqual(found.id, v.id)
+
+    @gen_test
+    def test_missing_ids_expire(self):
+        v = yield TestVertexModel.create(name='v')
+        missing_id = v.id + 1000
+        with self.assertRaises(TestVertexModel.DoesNotExist):
+            yield TestVertexModel.get(missing_id)
+        self.clock.now += 31
+        self.server.reset_stats()
+        with self.assertRaises(TestVertexModel.DoesNotExist):
+            yield TestVertexModel.get(missing_id)
+        self.assertEqual(self.server.requests, 1)
+
+    @gen_test
+    def test_saving_forgets_the_id(self):
+        v = yield TestVertexModel.create(name='v')
+        # the memory graph hands out the ids in sequence
+        next_id = v.id + 1
+        with self.assertRaises(TestVertexModel.DoesNotExist):
+            yield TestVertexModel.get(next_id)
+        created = yield TestVertexModel.create(name='w')
+        self.assertEqual(created.id, next_id)
+        found = yield TestVertexModel.get(next_id)
+        self.assertEqual(found.name, 'w')
+
+        self.cache.add(VERTEX_TRAVERSAL, v.id, TestVertexModel.get_label())
+        v.name = 'x'
+        yield v.save()
+        found = yield TestVertexModel.get(v.id)
+        self.assertEqual(found.name, 'x')
+
+    @gen_test
+    def test_saving_an_edge_forgets_the_id(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        next_id = v2.id + 1
+        with self.assertRaises(TestEdgeModel.DoesNotExist):
+            yield TestEdgeModel.get(next_id)
+        e = yield TestEdgeModel.create(v1, v2, test_val=1)
+        self.assertEqual(e.id, next_id)
+        found = yield TestEdgeModel.get(next_id)
+        self.assertEqual(found.test_val, 1)
+
+    def test_cache_is_bounded(self):
+        label = TestVertexModel.get_label()
+        for element_id in range(3):
+            self.cache.add(VERTEX_TRAVERSAL, element_id, label)
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertFalse(self.cache.is_missing(VERTEX_TRAVERSAL, 0, label))
+        self.assertTrue(self.cache.is_missing(VERTEX_TRAVERSAL, 2, label))
+
+    @gen_test
+    def test_metrics(self):
+        manager = MetricManager()
+        reporter = BaseMetricsReporter()
+        manager.setup_reporters(reporter)
+        connection._metric_manager = manager
+        for _ in range(2):
+            with self.assertRaises(TestVertexModel.DoesNotExist):
+                yield TestVertexModel.get(1000)
+        registry = reporter.registry[0]
+        self.assertEqual(
+            registry.counter('goblin.missing_cache.hits').get_count(), 1)
+        self.assertEqual(
+            registry.counter('goblin.missing_cache.misses').get_count(), 1)
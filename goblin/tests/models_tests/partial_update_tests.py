@@ -0,0 +1,115 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado.testing import gen_test
+
+from goblin import properties
+from goblin.exceptions import GoblinQueryError, ValidationError
+from goblin.models import Vertex
+from goblin.tests.base import BaseMemoryGoblinTestCase, TestVertexModel
+
+
+class CounterVertexModel(Vertex):
+    name = properties.String()
+    views = properties.Integer(db_field='view_count')
+    rating = properties.Double()
+
+
+@attr('unit', 'partial_update')
+class TestIncrement(BaseMemoryGoblinTestCase):
+
+    @gen_test
+    def test_increment(self):
+        vertex = yield CounterVertexModel.create(name='v', views=1)
+        value = yield vertex.increment('views')
+        self.assertEqual(value, 2)
+        self.assertEqual(vertex.views, 2)
+        self.assertEqual(vertex._values['views'].previous_value, 2)
+
+        value = yield vertex.increment('rating', 0.5)
+        self.assertEqual(value, 0.5)
+        loaded = yield CounterVertexModel.get(vertex.id)
+        self.assertEqual((loaded.views, loaded.rating), (2, 0.5))
+
+    @gen_test
+    def test_concurrent_increments_are_kept(self):
+        vertex = yield CounterVertexModel.create(name='v', views=0)
+        copies = yield [CounterVertexModel.get(vertex.id) for _ in range(5)]
+        values = yield [copy.increment('views', 2) for copy in copies]
+        self.assertEqual(sorted(values), [2, 4, 6, 8, 10])
+        loaded = yield CounterVertexModel.get(vertex.id)
+        self.assertEqual(loaded.views, 10)
+
+    @gen_test
+    def test_interleaved_increments_are_retried(self):
+        vertex = yield CounterVertexModel.create(name='v', views=0)
+
+        key = CounterVertexModel.get_property_by_name('views')
+
+        def add_ten(graph):
+            counter = graph.vertex(vertex.id)
+            counter.property(key, counter.value(key) + 10)
+
+        # two writes commit while the script runs, each fails its commit
+        self.server.graph.concurrent.extend([add_ten, add_ten])
+        value = yield vertex.increment('views')
+        self.assertEqual(value, 21)
+        loaded = yield CounterVertexModel.get(vertex.id)
+        self.assertEqual(loaded.views, 21)
+
+    @gen_test
+    def test_increment_gives_up_after_attempts(self):
+        vertex = yield CounterVertexModel.create(name='v', views=0)
+
+        key = CounterVertexModel.get_property_by_name('views')
+
+        def add_ten(graph):
+            counter = graph.vertex(vertex.id)
+            counter.property(key, counter.value(key) + 10)
+
+        self.server.graph.concurrent.extend([add_ten] * 3)
+        with self.assertRaises(CounterVertexModel.LockConflict):
+            yield vertex.increment('views', attempts=3)
+        loaded = yield CounterVertexModel.get(vertex.id)
+        self.assertEqual(loaded.views, 30)
+
+    def test_invalid_increments(self):
+        with self.assertRaises(GoblinQueryError):
+            CounterVertexModel(views=1).increment('views')
+        vertex = CounterVertexModel()
+        vertex._id = 1
+        with self.assertRaises(GoblinQueryError):
+            vertex.increment('name')
+        with self.assertRaises(TypeError):
+            vertex.increment('likes')
+        with self.assertRaises(ValidationError):
+            vertex.increment('views', 'a')
+
+
+@attr('unit', 'partial_update')
+class TestUpdateFields(BaseMemoryGoblinTestCase):
+
+    @gen_test
+    def test_only_the_given_fields_are_saved(self):
+        vertex = yield CounterVertexModel.create(name='v', views=1)
+        other = yield CounterVertexModel.get(vertex.id)
+        other.name = 'local'
+        yield vertex.increment('views', 5)
+        self.server.reset_stats()
+        result = yield other.update_fields(rating=4.5)
+        self.assertIs(result, other)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(other._values['rating'].previous_value, 4.5)
+        self.assertEqual(other._values['name'].previous_value, 'v')
+        loaded = yield CounterVertexModel.get(vertex.id)
+        self.assertEqual((loaded.name, loaded.views, loaded.rating),
+                         ('v', 6, 4.5))
+
+    def test_invalid_updates(self):
+        with self.assertRaises(GoblinQueryError):
+            TestVertexModel().update_fields(name='v')
+        vertex = TestVertexModel()
+        vertex._id = 1
+        with self.assertRaises(TypeError):
+            vertex.update_fields(likes=1)
+        with self.assertRaises(ValidationError):
+            vertex.update_fields(test_val='a')
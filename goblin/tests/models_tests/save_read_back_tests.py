@@ -0,0 +1,76 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado.testing import gen_test
+
+from goblin import properties
+from goblin.models import Edge, Vertex
+from goblin.properties.strategy import SaveOnChange
+from goblin.tests.base import (
+    BaseMemoryGoblinTestCase, TestVertexModel, TestEdgeModel)
+
+
+class WriteOnlyVertexModel(Vertex):
+    __read_back__ = False
+
+    name = properties.String(save_strategy=SaveOnChange)
+    count = properties.Integer()
+
+
+class WriteOnlyEdgeModel(Edge):
+    __read_back__ = False
+
+    weight = properties.Integer()
+
+
+@attr('unit', 'read_back')
+class TestSaveWithoutReadBack(BaseMemoryGoblinTestCase):
+
+    @gen_test
+    def test_vertex_is_updated_in_place(self):
+        vertex = TestVertexModel(name='v', test_val=1)
+        result = yield vertex.save(read_back=False)
+        self.assertIs(result, vertex)
+        self.assertIsNotNone(vertex.id)
+        loaded = yield TestVertexModel.get(vertex.id)
+        self.assertEqual((loaded.name, loaded.test_val), ('v', 1))
+
+        vertex.test_val = 2
+        yield vertex.save(read_back=False)
+        loaded = yield TestVertexModel.get(vertex.id)
+        self.assertEqual(loaded.test_val, 2)
+        self.assertEqual(len(self.server.graph.vertices), 1)
+
+    @gen_test
+    def test_model_default(self):
+        vertex = yield WriteOnlyVertexModel.create(name='v', count=1)
+        self.assertIsInstance(vertex, WriteOnlyVertexModel)
+        name = vertex._values['name']
+        self.assertEqual(name.previous_value, 'v')
+        self.assertFalse(name.changed)
+        vertex.name = 'w'
+        self.assertTrue(name.changed)
+        yield vertex.save()
+        self.assertFalse(name.changed)
+        loaded = yield WriteOnlyVertexModel.get(vertex.id)
+        self.assertEqual(loaded.name, 'w')
+
+        # the model default can be overridden per call
+        result = yield vertex.save(read_back=True)
+        self.assertIsNot(result, vertex)
+        self.assertEqual(result.id, vertex.id)
+
+    @gen_test
+    def test_edge_is_updated_in_place(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        edge = WriteOnlyEdgeModel(v1, v2, weight=3)
+        result = yield edge.save()
+        self.assertIs(result, edge)
+        self.assertIsNotNone(edge.id)
+        loaded = yield WriteOnlyEdgeModel.get(edge.id)
+        self.assertEqual(loaded.weight, 3)
+
+        edge = yield TestEdgeModel.create(v1, v2, read_back=False)
+        self.assertIsInstance(edge, TestEdgeModel)
+        self.assertNotIn('read_back', edge._manual_values)
+        self.assertIn(edge.id, self.server.graph.edges)
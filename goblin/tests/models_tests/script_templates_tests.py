@@ -0,0 +1,47 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado.testing import gen_test
+
+from goblin.models import V, GREATER_THAN, WITHIN
+from goblin.tests.base import (BaseMemoryGoblinTestCase, TestVertexModel,
+                               TestEdgeModel)
+
+
+@attr('unit', 'script_templates')
+class TestScriptTemplates(BaseMemoryGoblinTestCase):
+    """ Values never end up in the script text, only in the bindings """
+
+    @gen_test
+    def test_workload_uses_a_fixed_set_of_scripts(self):
+        vertices = []
+        for i in range(4):
+            v = yield TestVertexModel.create(name='v{}'.format(i),
+                                             test_val=i)
+            vertices.append(v)
+        for v1, v2 in zip(vertices, vertices[1:]):
+            yield TestEdgeModel.create(v1, v2, name=v1.name, test_val=v1.id)
+        self.server.reset_stats()
+
+        name = TestVertexModel.get_property_by_name('name')
+        test_val = TestVertexModel.get_property_by_name('test_val')
+        for i, v in enumerate(vertices):
+            ids = [u.id for u in vertices[:i + 1]]
+            stream = yield V(v).has(name, v.name).get()
+            yield stream.read()
+            stream = yield V(v).has(test_val, i, GREATER_THAN).get()
+            yield stream.read()
+            stream = yield V(v).has(test_val, ids, WITHIN).out_step(
+                TestEdgeModel).get()
+            yield stream.read()
+            stream = yield TestVertexModel.all(ids)
+            yield stream.read()
+            stream = yield v.outE()
+            edges = yield stream.read()
+            if edges:
+                stream = yield TestEdgeModel.all([e.id for e in edges])
+                yield stream.read()
+                yield edges[0].inV()
+
+        self.assertEqual(self.server.requests, 26)
+        self.assertEqual(sorted(self.server.script_counts.values()),
+                         [3, 3, 4, 4, 4, 4, 4])
@@ -0,0 +1,97 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado.testing import gen_test
+
+from goblin import properties
+from goblin.exceptions import GoblinException, ValidationError
+from goblin.models import Session, Vertex
+from goblin.properties.strategy import SaveOnChange
+from goblin.tests.base import (
+    BaseMemoryGoblinTestCase, TestVertexModel, TestEdgeModel)
+
+
+class SessionVertexModel(Vertex):
+    name = properties.String(save_strategy=SaveOnChange)
+    location = properties.Point()
+
+
+@attr('unit', 'session')
+class TestSession(BaseMemoryGoblinTestCase):
+
+    @gen_test
+    def test_flush_creates_vertices_and_edges(self):
+        """ Edges are wired to the vertices created by the same flush """
+        session = Session()
+        v1 = TestVertexModel(name='v1', test_val=1)
+        v2 = TestVertexModel(name='v2', test_val=2)
+        e = TestEdgeModel(v1, v2, test_val=3)
+        session.add(v1, v2, e)
+        saved = yield session.flush()
+        self.assertEqual(saved, [v1, v2, e])
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.server.graph.commits, 1)
+        self.assertIsNotNone(v1.id)
+        self.assertIsNotNone(e.id)
+        stream = yield v1.outE()
+        edges = yield stream.read()
+        self.assertEqual([edge.id for edge in edges], [e.id])
+        self.assertEqual(edges[0].test_val, 3)
+        self.assertEqual(edges[0]._inV, v2.id)
+
+    @gen_test
+    def test_flush_adds_the_new_endpoints(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = TestVertexModel(name='v2')
+        session = Session()
+        session.add(TestEdgeModel(v1, v2))
+        saved = yield session.flush()
+        self.assertEqual(saved[0], v2)
+        self.assertIsNotNone(v2.id)
+        self.assertEqual(len(self.server.graph.edges), 1)
+
+    @gen_test
+    def test_flush_only_saves_dirty_elements(self):
+        v1 = yield SessionVertexModel.create(name='v1', location=(0.0, 0.0))
+        v2 = yield SessionVertexModel.create(name='v2', location=(0.0, 0.0))
+        session = Session()
+        session.add(v1, v2)
+        self.assertEqual(session.dirty, [])
+        self.server.reset_stats()
+        saved = yield session.flush()
+        self.assertEqual(saved, [])
+        self.assertEqual(self.server.requests, 0)
+
+        v2.name = 'renamed'
+        v2.location = (37.24, -115.81)
+        self.assertEqual(session.dirty, [v2])
+        yield session.flush()
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(session.dirty, [])
+        vertex = self.server.graph.vertex(v2.id)
+        name = SessionVertexModel.get_property_by_name('name')
+        self.assertEqual(vertex.value(name), 'renamed')
+        loaded = yield SessionVertexModel.get(v2.id)
+        self.assertEqual(str(loaded.location), str(v2.location))
+
+    @gen_test
+    def test_failed_flush_saves_nothing(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        ghost = TestVertexModel(name='ghost')
+        ghost._id = 10000
+        session = Session()
+        new = TestVertexModel(name='new')
+        session.add(new, TestEdgeModel(v1, ghost))
+        vertices = len(self.server.graph.vertices)
+        with self.assertRaises(Exception):
+            yield session.flush()
+        self.assertEqual(len(self.server.graph.vertices), vertices)
+        self.assertEqual(len(self.server.graph.edges), 0)
+        self.assertIsNone(new.id)
+
+    def test_flush_validates(self):
+        session = Session()
+        session.add(TestEdgeModel(None, None))
+        with self.assertRaises(ValidationError):
+            session.flush()
+        with self.assertRaises(GoblinException):
+            session.add('v1')
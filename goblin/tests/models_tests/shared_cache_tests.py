@@ -0,0 +1,203 @@
+from __future__ import unicode_literals
+import os
+import pickle
+import shutil
+import tempfile
+
+import geojson
+from nose.plugins.attrib import attr
+from tornado.testing import gen_test
+
+from goblin import connection
+from goblin import properties
+from goblin.models import Vertex
+from goblin.models.cache import SharedElementCache
+from goblin.models.cache_backends import (MmapCacheBackend, decode_state,
+                                          encode_state)
+from goblin.properties.strategy import SaveOnChange
+from goblin.tests.base import (BaseGoblinTestCase, BaseMemoryGoblinTestCase,
+                               FakeClock, TestVertexModel, TestEdgeModel,
+                               TestEdgeModel2)
+
+
+class StateVertexModel(Vertex):
+    label = 'state_vertex_model'
+
+    name = properties.String(save_strategy=SaveOnChange)
+    location = properties.Point()
+    count = properties.Integer()
+
+
+@attr('unit', 'shared_cache')
+class TestElementState(BaseGoblinTestCase):
+
+    def test_vertex_state_round_trip(self):
+        v = StateVertexModel(id=3, name='v', count=2,
+                             location=geojson.Point((-115.81, 37.24)))
+        # the state doesn't depend on the save strategies
+        state = v.__getstate__()
+        self.assertIn(StateVertexModel.get_property_by_name('name'),
+                      state['properties'])
+        decoded = StateVertexModel.__new__(StateVertexModel)
+        decoded.__setstate__(decode_state(encode_state(state)))
+        for copied in (pickle.loads(pickle.dumps(v)), decoded):
+            self.assertEqual(copied.id, 3)
+            self.assertEqual((copied.name, copied.count), ('v', 2))
+            self.assertEqual(copied.location['coordinates'],
+                             [-115.81, 37.24])
+
+    def test_edge_state_round_trip(self):
+        v = TestVertexModel(id=1)
+        e = TestEdgeModel(v, 2, id='e1', name='e', test_val=3)
+        copied = pickle.loads(pickle.dumps(e))
+        self.assertEqual((copied.id, copied._outV, copied._inV),
+                         ('e1', 1, 2))
+        self.assertEqual((copied.name, copied.test_val), ('e', 3))
+
+    def test_encoding(self):
+        state = {'id': 2 ** 70, 'n': -5, 'f': 0.25, 's': 'caf\xe9',
+                 'b': b'\x00\xff', 'l': [None, True, False],
+                 't': ('point', (1.5, -2.5)), 'm': {1: {}}}
+        data = encode_state(state)
+        self.assertEqual(decode_state(data), state)
+        self.assertLess(len(data), len(pickle.dumps(state, 2)))
+        with self.assertRaises(ValueError):
+            decode_state(data[:-1])
+        with self.assertRaises(TypeError):
+            encode_state({'x': object()})
+
+
+@attr('unit', 'shared_cache')
+class TestMmapCacheBackend(BaseGoblinTestCase):
+
+    def setUp(self):
+        super(TestMmapCacheBackend, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache')
+        self.clock = FakeClock()
+        self.backend = MmapCacheBackend(self.path, slots=8, slot_size=64,
+                                        clock=self.clock)
+
+    def tearDown(self):
+        self.backend.close()
+        shutil.rmtree(self.directory)
+        super(TestMmapCacheBackend, self).tearDown()
+
+    def test_values_are_shared_through_the_file(self):
+        other = MmapCacheBackend(self.path, slots=8, slot_size=64,
+                                 clock=self.clock)
+        try:
+            self.assertEqual(self.backend.set('V:1', b'one'), 0)
+            self.assertEqual(other.get('V:1'), b'one')
+            other.delete('V:1')
+            self.assertIsNone(self.backend.get('V:1'))
+        finally:
+            other.close()
+
+    def test_expiry_and_size(self):
+        self.backend.set('V:1', b'one', expires=1010)
+        self.assertEqual(list(self.backend.keys()), ['V:1'])
+        self.clock.now = 1010
+        self.assertIsNone(self.backend.get('V:1'))
+        self.assertEqual(self.backend.set('V:2', b'x' * 64), 0)
+        self.assertIsNone(self.backend.get('V:2'))
+
+    def test_collisions_evict(self):
+        keys = ['V:{}'.format(i) for i in range(9)]
+        evicted = sum(self.backend.set(key, b'v') for key in keys)
+        self.assertEqual(evicted, 9 - len(list(self.backend.keys())))
+        self.assertTrue(evicted >= 1)
+        self.backend.clear()
+        self.assertEqual(list(self.backend.keys()), [])
+
+    def test_torn_slots_are_missing(self):
+        self.backend.set('V:1', b'one')
+        slot = self.backend._slot('V:1')
+        offset = slot * 64 + MmapCacheBackend._header.size + 3
+        self.backend._mmap[offset:offset + 1] = b'X'
+        self.assertIsNone(self.backend.get('V:1'))
+
+
+@attr('unit', 'shared_cache')
+class TestSharedElementCache(BaseMemoryGoblinTestCase):
+
+    def setUp(self):
+        super(TestSharedElementCache, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache')
+        self.backend = MmapCacheBackend(self.path, slots=64)
+        connection._element_cache = SharedElementCache(self.backend, ttl=60)
+
+    def tearDown(self):
+        connection._element_cache = None
+        self.backend.close()
+        shutil.rmtree(self.directory)
+        super(TestSharedElementCache, self).tearDown()
+
+    @gen_test
+    def test_elements_are_shared(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        e = yield TestEdgeModel.create(v1, v2, name='e')
+        yield TestVertexModel.get(v1.id)
+        yield TestEdgeModel.get(e.id)
+        self.server.reset_stats()
+
+        # another worker opening the same file
+        other = MmapCacheBackend(self.path, slots=64)
+        try:
+            connection._element_cache = SharedElementCache(other, ttl=60)
+            vertex = yield TestVertexModel.get(v1.id)
+            edge = yield TestEdgeModel.get(e.id)
+        finally:
+            other.close()
+        self.assertEqual(self.server.requests, 0)
+        self.assertEqual((vertex.id, vertex.name), (v1.id, 'v1'))
+        self.assertEqual((edge.id, edge.name, edge._outV, edge._inV),
+                         (e.id, 'e', v1.id, v2.id))
+        self.assertEqual(connection._element_cache.hits, 2)
+
+    @gen_test
+    def test_invalidation(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        e = yield TestEdgeModel.create(v1, v2, name='e')
+        yield TestEdgeModel.get(e.id)
+        loaded = yield TestVertexModel.get(v1.id)
+        loaded.name = 'w'
+        yield loaded.save()
+        loaded = yield TestVertexModel.get(v1.id)
+        self.assertEqual(loaded.name, 'w')
+        yield v2.delete()
+        with self.assertRaises(TestEdgeModel.DoesNotExist):
+            yield TestEdgeModel.get(e.id)
+
+    @gen_test
+    def test_edges_are_invalidated_without_scanning(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        e = yield TestEdgeModel.create(v1, v2, name='e')
+        yield TestEdgeModel.get(e.id)
+        cache = connection._element_cache
+        self.assertEqual(len(cache), 1)
+
+        def keys():
+            raise AssertionError("the store was scanned")
+
+        self.backend.keys = keys
+        cache.invalidate_edges(v1.id, [TestEdgeModel2.get_label()])
+        self.server.reset_stats()
+        yield TestEdgeModel.get(e.id)
+        self.assertEqual(self.server.requests, 0)
+
+        # seen by another worker too
+        other = MmapCacheBackend(self.path, slots=64)
+        try:
+            SharedElementCache(other).invalidate_edges(
+                v2.id, [TestEdgeModel.get_label()])
+        finally:
+            other.close()
+        yield TestEdgeModel.get(e.id)
+        self.assertEqual(self.server.requests, 1)
+        yield TestEdgeModel.get(e.id)
+        self.assertEqual(self.server.requests, 1)
@@ -0,0 +1,113 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado.testing import gen_test
+
+from goblin import properties
+from goblin.exceptions import GoblinQueryError
+from goblin.models import Edge, Vertex
+from goblin.tests.base import (
+    BaseMemoryGoblinTestCase, TestVertexModel, TestEdgeModel)
+
+
+class VersionedUpsertModel(Vertex):
+    __versioned__ = True
+
+    key = properties.String()
+    value = properties.Integer()
+
+
+class VersionedUpsertEdgeModel(Edge):
+    __versioned__ = True
+
+    weight = properties.Integer()
+
+
+@attr('unit', 'upsert')
+class TestVertexUpsert(BaseMemoryGoblinTestCase):
+
+    @gen_test
+    def test_get_or_create(self):
+        vertex, created = yield TestVertexModel.get_or_create(
+            {'name': 'v'}, defaults={'test_val': 1})
+        self.assertTrue(created)
+        self.assertIsInstance(vertex, TestVertexModel)
+        self.assertEqual((vertex.name, vertex.test_val), ('v', 1))
+
+        self.server.reset_stats()
+        found, created = yield TestVertexModel.get_or_create(
+            {'name': 'v'}, defaults={'test_val': 2})
+        self.assertFalse(created)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual((found.id, found.test_val), (vertex.id, 1))
+        self.assertEqual(len(self.server.graph.vertices), 1)
+
+    @gen_test
+    def test_upsert(self):
+        other = yield TestVertexModel.create(name='w', test_val=5)
+        vertex = yield TestVertexModel.upsert('name', name='v', test_val=1)
+        self.assertEqual(vertex.test_val, 1)
+        updated = yield TestVertexModel.upsert(['name'], name='v',
+                                               test_val=2)
+        self.assertEqual((updated.id, updated.test_val), (vertex.id, 2))
+        loaded = yield TestVertexModel.get(other.id)
+        self.assertEqual(loaded.test_val, 5)
+        self.assertEqual(len(self.server.graph.vertices), 2)
+
+    @gen_test
+    def test_upsert_versioned(self):
+        vertex = yield VersionedUpsertModel.upsert('key', key='k', value=1)
+        self.assertEqual(vertex.version, 1)
+        vertex = yield VersionedUpsertModel.upsert('key', key='k', value=2)
+        self.assertEqual((vertex.value, vertex.version), (2, 2))
+        vertex, _ = yield VersionedUpsertModel.get_or_create({'key': 'k'})
+        self.assertEqual(vertex.version, 2)
+
+    def test_invalid_upserts(self):
+        with self.assertRaises(GoblinQueryError):
+            TestVertexModel.get_or_create({})
+        with self.assertRaises(GoblinQueryError):
+            TestVertexModel.upsert('name', test_val=1)
+        with self.assertRaises(TypeError):
+            TestVertexModel.upsert('name', name='v', likes=1)
+
+
+@attr('unit', 'upsert')
+class TestEdgeUpsert(BaseMemoryGoblinTestCase):
+
+    @gen_test
+    def test_get_or_create(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        edge, created = yield TestEdgeModel.get_or_create(v1, v2)
+        self.assertTrue(created)
+        self.assertEqual((edge._outV, edge._inV), (v1.id, v2.id))
+        found, created = yield TestEdgeModel.get_or_create(
+            v1, v2, defaults={'test_val': 3})
+        self.assertFalse(created)
+        self.assertEqual(found.id, edge.id)
+
+        # the lookup tells edges between the same vertices apart
+        keyed, created = yield TestEdgeModel.get_or_create(
+            v1, v2, lookup={'name': 'keyed'})
+        self.assertTrue(created)
+        reverse, created = yield TestEdgeModel.get_or_create(v2, v1)
+        self.assertTrue(created)
+        self.assertEqual(len(self.server.graph.edges), 3)
+
+    @gen_test
+    def test_upsert(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        edge = yield TestEdgeModel.upsert(v1, v2, name='e', test_val=1)
+        self.server.reset_stats()
+        updated = yield TestEdgeModel.upsert(v1.id, v2.id, test_val=2)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual((updated.id, updated.name, updated.test_val),
+                         (edge.id, 'e', 2))
+        other = yield TestEdgeModel.upsert(v1, v2, 'name', name='f')
+        self.assertNotEqual(other.id, edge.id)
+        self.assertEqual(len(self.server.graph.edges), 2)
+
+        edge = yield VersionedUpsertEdgeModel.upsert(v1, v2, weight=1)
+        edge = yield VersionedUpsertEdgeModel.upsert(v1, v2, weight=2)
+        self.assertEqual((edge.weight, edge.version), (2, 2))
@@ -0,0 +1,127 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado.testing import gen_test
+
+from goblin import connection, properties
+from goblin.models import Edge, Session, Vertex
+from goblin.tests.base import BaseMemoryGoblinTestCase
+
+
+class VersionedVertexModel(Vertex):
+    __versioned__ = True
+
+    name = properties.String()
+
+
+class CountedVertexModel(Vertex):
+    __versioned__ = True
+
+    name = properties.String()
+    views = properties.Integer()
+
+
+class VersionedEdgeModel(Edge):
+    __versioned__ = True
+
+    weight = properties.Integer()
+
+
+@attr('unit', 'versioning')
+class TestVersioning(BaseMemoryGoblinTestCase):
+
+    def tearDown(self):
+        connection._save_batch_window = None
+        super(TestVersioning, self).tearDown()
+
+    @gen_test
+    def test_saves_increment_the_version(self):
+        self.assertIn('version', VersionedVertexModel._properties)
+        vertex = yield VersionedVertexModel.create(name='v')
+        self.assertEqual(vertex.version, 1)
+        vertex.name = 'w'
+        vertex = yield vertex.save()
+        self.assertEqual(vertex.version, 2)
+        vertex = yield vertex.update_fields(name='x')
+        self.assertEqual(vertex.version, 3)
+        loaded = yield VersionedVertexModel.get(vertex.id)
+        self.assertEqual((loaded.name, loaded.version), ('x', 3))
+
+    @gen_test
+    def test_stale_saves_conflict(self):
+        vertex = yield VersionedVertexModel.create(name='v')
+        first = yield VersionedVertexModel.get(vertex.id)
+        second = yield VersionedVertexModel.get(vertex.id)
+        first.name = 'first'
+        yield first.save()
+        second.name = 'second'
+        with self.assertRaises(VersionedVertexModel.VersionConflict):
+            yield second.save()
+        with self.assertRaises(VersionedVertexModel.VersionConflict):
+            yield second.save(read_back=False)
+        loaded = yield VersionedVertexModel.get(vertex.id)
+        self.assertEqual((loaded.name, loaded.version), ('first', 2))
+
+        # once reloaded, the save goes through
+        second = yield VersionedVertexModel.get(vertex.id)
+        second.name = 'second'
+        second = yield second.save()
+        self.assertEqual(second.version, 3)
+
+    @gen_test
+    def test_increment_conflicts_with_stale_saves(self):
+        vertex = yield CountedVertexModel.create(name='v', views=0)
+        stale = yield CountedVertexModel.get(vertex.id)
+        yield vertex.increment('views', 2)
+        self.assertEqual(vertex.version, 2)
+        stale.name = 'stale'
+        with self.assertRaises(CountedVertexModel.VersionConflict):
+            yield stale.save()
+        loaded = yield CountedVertexModel.get(vertex.id)
+        self.assertEqual((loaded.name, loaded.views, loaded.version),
+                         ('v', 2, 2))
+
+        # a copy at the version before the increment takes the new one
+        vertex.name = 'w'
+        vertex = yield vertex.save()
+        self.assertEqual(vertex.version, 3)
+        # a stale copy doesn't
+        yield stale.increment('views')
+        with self.assertRaises(CountedVertexModel.VersionConflict):
+            yield stale.save()
+
+    @gen_test
+    def test_edges(self):
+        v1 = yield VersionedVertexModel.create(name='v1')
+        v2 = yield VersionedVertexModel.create(name='v2')
+        edge = yield VersionedEdgeModel.create(v1, v2, weight=1)
+        stale = yield VersionedEdgeModel.get(edge.id)
+        edge.weight = 2
+        edge = yield edge.save()
+        self.assertEqual(edge.version, 2)
+        stale.weight = 3
+        with self.assertRaises(VersionedEdgeModel.VersionConflict):
+            yield stale.save()
+
+    @gen_test
+    def test_session_and_group_commit(self):
+        vertex = yield VersionedVertexModel.create(name='v')
+        stale = yield VersionedVertexModel.get(vertex.id)
+        vertex.name = 'w'
+        yield vertex.save()
+
+        session = Session()
+        new = VersionedVertexModel(name='new')
+        stale.name = 'stale'
+        session.add(new, stale)
+        with self.assertRaises(VersionedVertexModel.VersionConflict):
+            yield session.flush()
+        self.assertIsNone(new.id)
+
+        # a conflict only fails its own save
+        connection._save_batch_window = 0
+        future_new, future_stale = new.save(), stale.save()
+        result = yield future_new
+        self.assertIs(result, new)
+        self.assertIsNotNone(new.id)
+        with self.assertRaises(VersionedVertexModel.VersionConflict):
+            yield future_stale
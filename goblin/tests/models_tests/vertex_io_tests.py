@@ -8,7 +8,8 @@ from nose.plugins.attrib import attr
 from goblin import connection
 from goblin.exceptions import GoblinException
 from goblin.tests.base import (
-    BaseGoblinTestCase, TestVertexModel, TestEdgeModel, TestVertexModelDouble)
+    BaseGoblinTestCase, TestVertexModel, TestEdgeModel, TestVertexModelDouble,
+    requires_gremlin_server)
 
 from goblin import gremlin
 from goblin import models
@@ -281,6 +282,7 @@ class TestNestedDeserialization(BaseGoblinTestCase):
     #     self.assertEqual(nested['number'], 5)
     #     yield original.delete()
 
+    @requires_gremlin_server
     @gen_test
     def test_list_deserialization(self):
         """
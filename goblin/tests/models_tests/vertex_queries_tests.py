@@ -28,19 +28,26 @@ class SimpleQueryTest(BaseGoblinTestCase):
 
     def test_has(self):
         result = self.q.has(MockEdge.get_property_by_name("age"), 10)
-        self.assertEqual(result._get(), ".has('mockedge_age', eq(b0))")
-        self.assertEqual(result._bindings['b0'], 10)
+        self.assertEqual(result._get(), ".has(b0, eq(b1))")
+        self.assertEqual(result._bindings['b0'], 'mockedge_age')
+        self.assertEqual(result._bindings['b1'], 10)
 
     def test_has_double_casting(self):
         result = self.q.has(MockEdge.get_property_by_name("fierceness"), 3.3)
-        self.assertEqual(result._get(), ".has('mockedge_fierceness', eq(b0))")
-        self.assertEqual(result._bindings['b0'], 3.3)
+        self.assertEqual(result._get(), ".has(b0, eq(b1))")
+        self.assertEqual(result._bindings['b0'], 'mockedge_fierceness')
+        self.assertEqual(result._bindings['b1'], 3.3)
 
     def test_has_within(self):
         result = self.q.has(
             MockEdge.get_property_by_name("age"), (10, 11), compare="within")
-        self.assertEqual(result._get(), ".has('mockedge_age', within(*b0))")
-        self.assertEqual(result._bindings['b0'], (10, 11))
+        self.assertEqual(result._get(), ".has(b0, within(*b1))")
+        self.assertEqual(result._bindings['b0'], 'mockedge_age')
+        self.assertEqual(result._bindings['b1'], (10, 11))
+
+    def test_has_unknown_comparison(self):
+        with self.assertRaises(GoblinQueryError):
+            self.q.has('age', 10, compare="eq(1)).drop(")
 
     def test_has_label(self):
         result = self.q.has_label("label1", "label2")
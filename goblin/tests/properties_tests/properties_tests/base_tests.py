@@ -1,7 +1,9 @@
 from __future__ import unicode_literals
 
+from unittest import SkipTest
 from tornado import gen
 from goblin.tests import BaseGoblinTestCase
+from goblin.tests.base import MEMORY_POOL
 from goblin.properties import GraphProperty
 from nose.plugins.attrib import attr
 from goblin.exceptions import ValidationError
@@ -12,6 +14,8 @@ from goblin.spec import get_property_key, make_property_key
 
 @gen.coroutine
 def create_key(key, data_type, cardinality=SINGLE):
+    if MEMORY_POOL:
+        raise SkipTest('schema scripts need a Gremlin Server')
     resp = yield get_property_key(key)
     if resp.data[0] is None:
         yield make_property_key(key, data_type, cardinality)
@@ -0,0 +1,92 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado.testing import gen_test
+
+from goblin.constants import IN
+from goblin.exceptions import GoblinRelationshipException
+from goblin.models import Edge, Vertex
+from goblin.properties import String
+from goblin.relationships import Relationship, prefetch_related
+from goblin.tests.base import BaseMemoryGoblinTestCase
+
+
+class FriendEdgeModel(Edge):
+    label = 'friend_edge_model'
+
+
+class WroteEdgeModel(Edge):
+    label = 'wrote_edge_model'
+
+
+class PostVertexModel(Vertex):
+    label = 'post_vertex_model'
+
+    title = String()
+
+    authors = Relationship(
+        WroteEdgeModel,
+        'goblin.tests.relationships_tests.prefetch_tests.PersonVertexModel',
+        IN)
+
+
+class PersonVertexModel(Vertex):
+    label = 'person_vertex_model'
+
+    name = String()
+
+    friends = Relationship(
+        FriendEdgeModel,
+        'goblin.tests.relationships_tests.prefetch_tests.PersonVertexModel',
+        'out')
+    posts = Relationship(WroteEdgeModel, PostVertexModel, 'out')
+
+
+@attr('unit', 'relationship', 'prefetch')
+class TestPrefetch(BaseMemoryGoblinTestCase):
+
+    @gen_test
+    def test_all_with_prefetch(self):
+        people = yield [PersonVertexModel.create(name='p{}'.format(i))
+                        for i in range(10)]
+        for i, person in enumerate(people):
+            for friend in people[i + 1:i + 3]:
+                yield FriendEdgeModel.create(person, friend)
+            yield person.posts.create(vertex_params={'title': person.name})
+
+        self.server.reset_stats()
+        stream = yield PersonVertexModel.all(
+            [p.id for p in people], prefetch=['friends', 'posts'])
+        loaded = yield stream.read()
+        self.assertEqual(self.server.requests, 2)
+        for i, person in enumerate(loaded):
+            self.assertEqual([f.id for f in person.friends.prefetched],
+                             [f.id for f in people[i + 1:i + 3]])
+            self.assertEqual([p.title for p in person.posts.prefetched],
+                             [person.name])
+        self.assertIsNone(loaded[0].friends.prefetched[0].friends.prefetched)
+        # p2 is a friend of p0 and p1, and sent once
+        self.assertIs(loaded[0].friends.prefetched[1],
+                      loaded[1].friends.prefetched[0])
+
+    @gen_test
+    def test_prefetch_related(self):
+        person = yield PersonVertexModel.create(name='p')
+        _, post = yield person.posts.create(vertex_params={'title': 't'})
+        lonely = yield PersonVertexModel.create(name='lonely')
+        self.server.reset_stats()
+        result = yield prefetch_related([], 'authors')
+        self.assertEqual((result, self.server.requests), ([], 0))
+        with self.assertRaises(GoblinRelationshipException):
+            prefetch_related([post, person], 'authors')
+
+        result = yield prefetch_related([post], 'authors')
+        self.assertEqual(result, [post])
+        self.assertEqual(post.authors.prefetched, [person])
+        yield prefetch_related([person, lonely], ['posts'])
+        self.assertEqual(person.posts.prefetched, [post])
+        self.assertEqual(lonely.posts.prefetched, [])
+        self.assertEqual(self.server.requests, 2)
+
+    def test_unsaved_vertices(self):
+        with self.assertRaises(GoblinRelationshipException):
+            prefetch_related([PersonVertexModel(name='p')], ['friends'])
@@ -0,0 +1,116 @@
+from __future__ import unicode_literals
+from nose.plugins.attrib import attr
+from tornado import gen
+from tornado.testing import gen_test
+
+from goblin.exceptions import GoblinRelationshipException
+from goblin.models import Edge, Vertex
+from goblin.properties import Integer, String
+from goblin.relationships.relationship import Relationship
+from goblin.tests.base import BaseMemoryGoblinTestCase
+
+
+class RankedEdgeModel(Edge):
+    label = 'ranked_edge_model'
+
+    rank = Integer()
+
+
+class RankedVertexModel(Vertex):
+    label = 'ranked_vertex_model'
+
+    name = String()
+    score = Integer(db_field='points')
+
+    ranked = Relationship(RankedEdgeModel, 'goblin.tests.relationships_tests'
+                          '.relationship_query_tests.RankedVertexModel', 'out')
+    mixed = Relationship(RankedEdgeModel, [
+        'goblin.tests.relationships_tests.relationship_query_tests'
+        '.RankedVertexModel',
+        'goblin.tests.relationships_tests.relationship_query_tests'
+        '.UnrankedVertexModel'], 'out')
+
+
+class UnrankedVertexModel(Vertex):
+    label = 'unranked_vertex_model'
+
+    name = String()
+
+
+@attr('unit', 'relationship')
+class TestRelationshipQueries(BaseMemoryGoblinTestCase):
+
+    @gen.coroutine
+    def create_root(self):
+        root = yield RankedVertexModel.create(name='root')
+        for score in (3, 1, 4, 2, 5):
+            yield root.ranked.create(
+                edge_params={'rank': 10 - score},
+                vertex_params={'name': str(score), 'score': score})
+        raise gen.Return(root)
+
+    @gen_test
+    def test_limit_offset_and_order(self):
+        root = yield self.create_root()
+        stream = yield root.ranked.vertices(limit=2, order_by='score')
+        vertices = yield stream.read()
+        self.assertEqual([v.score for v in vertices], [1, 2])
+
+        stream = yield root.ranked.vertices(limit=2, offset=1,
+                                                 order_by='-score')
+        vertices = yield stream.read()
+        self.assertEqual([v.score for v in vertices], [4, 3])
+
+        stream = yield root.ranked.vertices(offset=3, order_by='score')
+        vertices = yield stream.read()
+        self.assertEqual([v.score for v in vertices], [4, 5])
+
+        stream = yield root.ranked.edges(limit=3, order_by='rank')
+        edges = yield stream.read()
+        self.assertEqual([e.rank for e in edges], [5, 6, 7])
+
+    @gen_test
+    def test_descending_order(self):
+        root = yield self.create_root()
+        stream = yield root.ranked.vertices(order_by='-score')
+        vertices = yield stream.read()
+        self.assertEqual([v.score for v in vertices], [5, 4, 3, 2, 1])
+
+        stream = yield root.ranked.edges(limit=2, order_by='-rank')
+        edges = yield stream.read()
+        self.assertEqual([e.rank for e in edges], [9, 8])
+
+        # the server can't order the vertices without a score
+        yield root.ranked.create(vertex_params={'name': 'unscored'})
+        stream = yield root.ranked.vertices(order_by='-score')
+        with self.assertRaises(RuntimeError):
+            yield stream.read()
+
+    @gen_test
+    def test_count(self):
+        root = yield self.create_root()
+        count = yield root.ranked.count()
+        self.assertEqual(count, 5)
+        count = yield root.ranked.count(edges=True)
+        self.assertEqual(count, 5)
+        leaf = yield RankedVertexModel.create(name='leaf')
+        count = yield leaf.ranked.count()
+        self.assertEqual(count, 0)
+
+    def test_invalid_queries(self):
+        root = RankedVertexModel()
+        root._id = 1
+        with self.assertRaises(GoblinRelationshipException):
+            root.ranked.vertices(page_size=2, order_by='score')
+        with self.assertRaises(GoblinRelationshipException):
+            root.ranked.edges(page_size=2, offset=1)
+        with self.assertRaises(GoblinRelationshipException):
+            root.ranked.vertices(limit=-1)
+        with self.assertRaises(GoblinRelationshipException):
+            root.ranked.vertices(order_by='rank')
+        # UnrankedVertexModel has no score
+        with self.assertRaises(GoblinRelationshipException):
+            root.mixed.vertices(order_by='-score')
+        # each class stores its name under its own field
+        with self.assertRaises(GoblinRelationshipException):
+            root.mixed.vertices(order_by='name')
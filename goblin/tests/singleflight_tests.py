@@ -0,0 +1,150 @@
+from __future__ import unicode_literals
+import os
+
+from nose.plugins.attrib import attr
+from tornado import gen
+from tornado.testing import gen_test
+
+from goblin import connection, gremlin, singleflight
+from goblin.models import Vertex
+from goblin.tests.base import BaseMemoryGoblinTestCase, TestVertexModel
+
+
+class SharedLookupModel(Vertex):
+    find_shared = gremlin.GremlinMethod(
+        method_name='_find_vertex_by_value', classmethod=True,
+        singleflight=True,
+        path=os.path.join(os.path.dirname(gremlin.__file__), os.pardir,
+                          'models', 'vertex.groovy'))
+
+
+@gen.coroutine
+def read_all(stream):
+    messages = []
+    while True:
+        message = yield stream.read()
+        if message is None:
+            break
+        messages.append(message)
+    raise gen.Return(messages)
+
+
+@attr('unit', 'singleflight')
+class TestSingleflight(BaseMemoryGoblinTestCase):
+
+    def tearDown(self):
+        self.assertEqual(singleflight._in_flight, {})
+        super(TestSingleflight, self).tearDown()
+
+    @gen_test
+    def test_identical_queries_share_a_request(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        self.server.reset_stats()
+        streams = yield [
+            connection.execute_query('g.V(vid)', {'vid': v1.id},
+                                     singleflight=True)
+            for _ in range(3)]
+        results = yield [read_all(stream) for stream in streams]
+        self.assertEqual(self.server.requests, 1)
+        for messages in results:
+            self.assertEqual(len(messages), 1)
+            self.assertEqual(messages[0].data[0]['id'], v1.id)
+
+    @gen_test
+    def test_different_bindings(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        v2 = yield TestVertexModel.create(name='v2')
+        self.server.reset_stats()
+        streams = yield [
+            connection.execute_query('g.V(vid)', {'vid': vid},
+                                     singleflight=True)
+            for vid in (v1.id, v2.id, v1.id)]
+        results = yield [read_all(stream) for stream in streams]
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual([r[0].data[0]['id'] for r in results],
+                         [v1.id, v2.id, v1.id])
+
+    @gen_test
+    def test_opt_in(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        self.server.reset_stats()
+        streams = yield [
+            connection.execute_query('g.V(vid)', {'vid': v1.id})
+            for _ in range(3)]
+        yield [read_all(stream) for stream in streams]
+        self.assertEqual(self.server.requests, 3)
+
+    @gen_test
+    def test_completed_requests_are_not_shared(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        self.server.reset_stats()
+        for _ in range(2):
+            stream = yield connection.execute_query(
+                'g.V(vid)', {'vid': v1.id}, singleflight=True)
+            yield read_all(stream)
+        self.assertEqual(self.server.requests, 2)
+
+    @gen_test
+    def test_handlers_are_per_caller(self):
+        v1 = yield TestVertexModel.create(name='v1')
+        raw, handled = yield [
+            connection.execute_query('g.V(vid)', {'vid': v1.id},
+                                     singleflight=True),
+            connection.execute_query(
+                'g.V(vid)', {'vid': v1.id}, singleflight=True,
+                handler=lambda data: [d['id'] for d in data])]
+        message = yield raw.read()
+        self.assertEqual(message.status_code, 200)
+        ids = yield handled.read()
+        self.assertEqual(ids, [v1.id])
+        self.assertEqual(self.server.script_counts['g.V(vid)'], 1)
+
+    @gen_test
+    def test_multiple_messages(self):
+        self.server.batch_size = 2
+        try:
+            yield TestVertexModel.bulk_create([{'name': 'v'}] * 5)
+            self.server.reset_stats()
+            streams = yield [
+                connection.execute_query('g.V().hasLabel(x)',
+                                         {'x': TestVertexModel.get_label()},
+                                         singleflight=True)
+                for _ in range(2)]
+            results = yield [read_all(stream) for stream in streams]
+        finally:
+            self.server.batch_size = 64
+        self.assertEqual(self.server.requests, 1)
+        for messages in results:
+            self.assertEqual([m.status_code for m in messages],
+                             [206, 206, 200])
+
+    @gen_test
+    def test_errors_are_shared(self):
+        streams = yield [
+            connection.execute_query('g.V(vid).next()', {'vid': -1},
+                                     singleflight=True)
+            for _ in range(2)]
+        for stream in streams:
+            with self.assertRaises(RuntimeError):
+                yield stream.read()
+            message = yield stream.read()
+            self.assertIsNone(message)
+        self.assertEqual(self.server.requests, 1)
+
+    @gen_test
+    def test_gremlin_method(self):
+        yield SharedLookupModel.create()
+        label = SharedLookupModel.get_label()
+        self.server.reset_stats()
+        streams = yield [
+            SharedLookupModel.find_shared(False, label, 'name', 'v1')
+            for _ in range(2)]
+        yield [stream.read() for stream in streams]
+        self.assertEqual(self.server.requests, 1)
+
+        # and per call
+        streams = yield [
+            TestVertexModel.find_by_value('name', 'v1', singleflight=True)
+            for _ in range(2)]
+        yield [stream.read() for stream in streams]
+        self.assertEqual(self.server.requests, 2)
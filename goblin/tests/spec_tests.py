@@ -9,7 +9,7 @@ from tornado import gen
 from tornado.ioloop import IOLoop
 from tornado.testing import gen_test
 
-from .base import BaseGoblinTestCase
+from .base import BaseGoblinTestCase, requires_gremlin_server
 from goblin import connection
 from goblin.models import Vertex, Edge
 from goblin.properties import String
@@ -30,6 +30,7 @@ class TestIndexSpecEdge(Edge):
 
 
 @attr('unit', 'connection')
+@requires_gremlin_server
 class TestSpecSystem(BaseGoblinTestCase):
     """ Test specification system """
 
@@ -1,7 +1,7 @@
 from __future__ import unicode_literals
 from goblin._compat import string_types, PY2
 from nose.plugins.attrib import attr
-from goblin.tests import BaseGoblinTestCase
+from goblin.tests import BaseGoblinTestCase, requires_gremlin_server
 from goblin.models import Vertex, Edge
 from goblin import properties
 from goblin.tools import (ImportStringError, import_string, cached_property,
@@ -70,6 +70,7 @@ class TestFactoryEdgeFactory(Factory):
 
 
 @attr('unit', 'tools', 'factory')
+@requires_gremlin_server
 class TestModelFactory(BaseGoblinTestCase):
 
     def test_vertex_factory(self):
@@ -108,6 +109,7 @@ class BlueprintsWrapperEdge(Edge):
 
 
 @attr('unit', 'tools', 'blueprintswrapper')
+@requires_gremlin_server
 class TestBlueprintsWrapper(BaseGoblinTestCase):
 
     def test_blueprints_wrapper(self):